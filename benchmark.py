@@ -0,0 +1,250 @@
+# benchmark.py - Benchmarks for vs4.py
+# Usage: python3 benchmark.py [--rows N] [--repeat R] [--keep DIR] [--only NAME]
+# Exits with status 1 if a check fails (pathological addresses taking quadratic time).
+import argparse
+import csv
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+VS4 = os.path.join(REPO_DIR, "vs4.py")
+sys.path.insert(0, REPO_DIR)
+
+HEADER = ["customer", "lat", "lon", "address", "city", "state", "zip", "download", "upload",
+          "voip_lines_quantity", "business_customer", "technology"]
+ADDRESSES = ["123 Main St", "456 Oak Ave N", "789 Pine Rd", "12 County Road 45", "55 Farm to Market Road 1960 W",
+             "100 US Hwy 287 S", "7 Maple Lane", "PO Box 12", "RR 2 Box 14", "Main St", "10 Elm Street!", "42 Broadway"]
+CITIES = ["Dallas", "Tulsa", "Austin", "Albany", "Fresno", "Hagatna"]
+STATES = ["TX", "OK", "NY", "CA", "GU", "tx", "XX"]
+ZIPS = ["75201", "74103", "10001", "93650", "96910", "75201-1234", "7520"]
+TECHNOLOGIES = ["fiber", "cable", "dsl", "wireless_licensed", "copper", "Fiber", "5g"]
+
+def generate_subscriber_csv(path, rows, seed=0):
+    """Write a synthetic subscriber file with a realistic mix of valid and invalid values."""
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            writer.writerow([
+                f"C{i}" if rng.random() > 0.01 else f"C{rng.randrange(max(rows, 1))}",
+                f"{rng.uniform(25, 48):.6f}",
+                f"{rng.uniform(-124, -67):.6f}" if rng.random() > 0.02 else "97.1",
+                rng.choice(ADDRESSES),
+                rng.choice(CITIES),
+                rng.choice(STATES),
+                rng.choice(ZIPS),
+                rng.choice(["100", "250", "1000", "0", "5000"]),
+                rng.choice(["20", "50", "100", "-1"]),
+                rng.choice(["0", "1", "2", "1.5"]),
+                rng.choice(["0", "1", "yes"]),
+                rng.choice(TECHNOLOGIES),
+            ])
+
+def time_command(args, repeat, cwd=None):
+    """Median wall time in seconds of running args as a fresh process."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def bench_cold_start(input_csv, workdir, repeat):
+    """Process start-up cost: bare interpreter, importing vs4, and the --check-headers fast path."""
+    return [
+        ("Cold start: python -c pass", time_command([sys.executable, "-c", "pass"], repeat), "s"),
+        ("Cold start: import vs4", time_command([sys.executable, "-c", "import vs4"], repeat, cwd=REPO_DIR), "s"),
+        ("Cold start: vs4.py --check-headers", time_command([sys.executable, VS4, input_csv, "bench_headers", "--check-headers"], repeat, cwd=workdir), "s"),
+    ]
+
+def bench_full_run(input_csv, workdir, repeat):
+    """End-to-end vs4.py run on the generated file."""
+    seconds = time_command([sys.executable, VS4, input_csv, "bench_full"], repeat, cwd=workdir)
+    rows = sum(1 for _ in open(input_csv)) - 1
+    return [
+        ("Full run: vs4.py", seconds, "s"),
+        ("Full run: throughput", rows / seconds if seconds else 0.0, "rows/s"),
+    ]
+
+def bench_categorical(input_csv, workdir, repeat):
+    """
+    Memory of the low-cardinality columns and validate_columns time, str ingest vs category
+    ingest, for the whole plan and for the categorical columns' checks alone (the only ones
+    category ingest changes).
+    """
+    import pandas as pd
+    import vs4
+    from cell_flags import FlaggedCells
+    from rules import CATEGORICAL_COLUMNS, EXPECTED_COLUMNS, get_plan, validate_columns
+
+    plan = get_plan()
+    categorical_plan = {col: plan[col] for col in CATEGORICAL_COLUMNS}
+    results = []
+    for label, dtype in [("str", str), ("category", vs4.ingest_dtypes(vs4.read_header(input_csv)))]:
+        start = time.perf_counter()
+        df = pd.read_csv(input_csv, dtype=dtype)
+        read_seconds = time.perf_counter() - start
+        df.insert(0, "OrigRowNum", range(1, len(df) + 1))
+        memory = df[CATEGORICAL_COLUMNS].memory_usage(deep=True, index=False).sum()
+        results.append((f"pd.read_csv ({label} ingest)", read_seconds, "s"))
+        results.append((f"Categorical columns memory ({label} ingest)", memory / 1e6, "MB"))
+        for name, columns_plan in [("validate_columns", plan), ("Categorical column checks", categorical_plan)]:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                validate_columns(df, [], FlaggedCells(len(df), EXPECTED_COLUMNS), columns_plan)
+                timings.append(time.perf_counter() - start)
+            results.append((f"{name} ({label} ingest)", statistics.median(timings), "s"))
+    return results
+
+def compress_copy(input_csv, codec):
+    """Write a compressed copy of input_csv with the codec's extension and return its path."""
+    import gzip
+    import zipfile
+
+    if codec == "zip":
+        path = os.path.splitext(input_csv)[0] + ".zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.write(input_csv, os.path.basename(input_csv))
+        return path
+    path = input_csv + (".gz" if codec == "gzip" else ".zst")
+    with open(input_csv, "rb") as src:
+        if codec == "gzip":
+            with gzip.open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            import zstandard
+
+            with open(path, "wb") as dst:
+                zstandard.ZstdCompressor().copy_stream(src, dst)
+    return path
+
+def bench_codecs(input_csv, workdir, repeat):
+    """Per-codec input decompression and pd.read_csv throughput, and compressed to_csv output."""
+    import pandas as pd
+    import compressed_io
+
+    results = []
+    size = os.path.getsize(input_csv)
+    start = time.perf_counter()
+    df = pd.read_csv(input_csv, dtype=str)
+    results.append(("plain: pd.read_csv", len(df) / (time.perf_counter() - start), "rows/s"))
+    start = time.perf_counter()
+    df.to_csv(os.path.join(workdir, "bench_output.csv"), index=False)
+    results.append(("plain: to_csv output", len(df) / (time.perf_counter() - start), "rows/s"))
+    for codec in compressed_io.available_codecs():
+        path = compress_copy(input_csv, codec)
+        decompress, parse = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with compressed_io.open_binary(path) as f:
+                while f.read(1 << 20):
+                    pass
+            decompress.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            with compressed_io.open_binary(path) as f:
+                pd.read_csv(f, dtype=str)
+            parse.append(time.perf_counter() - start)
+        results.append((f"{codec}: compression ratio", size / os.path.getsize(path), "x"))
+        results.append((f"{codec}: decompress", size / statistics.median(decompress) / 1e6, "MB/s"))
+        results.append((f"{codec}: pd.read_csv", len(df) / statistics.median(parse), "rows/s"))
+        if codec in compressed_io.OUTPUT_EXTENSIONS:
+            output = compressed_io.output_path(os.path.join(workdir, "bench_output.csv"), codec)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                df.to_csv(output, index=False)
+                timings.append(time.perf_counter() - start)
+            results.append((f"{codec}: to_csv output", len(df) / statistics.median(timings), "rows/s"))
+    return results
+
+# Adversarial addresses for the street format rule, by length in characters
+# 4x the characters takes about 4x the time when matching is linear and 11-16x when re
+# backtracks quadratically. "repeated endings + newline" reads about 5x: every ending still
+# scans once to the newline before its tail fails, but no longer retries each shorter tail.
+PATHOLOGICAL_LENGTHS = (1000, 4000)
+MAX_PATHOLOGICAL_GROWTH = 8.0
+CHECK_FAILURES = []  # Failed checks, reported by main()
+
+PATHOLOGICAL_ADDRESSES = {
+    "whitespace run": lambda n: "1" + " " * n + "x",
+    "ending + whitespace run": lambda n: "1 St" + " " * n + "!",
+    "whitespace run + ending": lambda n: "1 Texas" + " " * n + "Hwy",
+    "repeated endings + newline": lambda n: "1" + " St" * (n // 3) + "\nx",
+    "long word run": lambda n: "1 " + "Main " * (n // 5) + "x",
+}
+
+def bench_pathological_addresses(input_csv, workdir, repeat):
+    """
+    Worst per-row time of address.street_format on adversarial input, per regex backend.
+    The growth figure is the time at 4,000 characters over the time at 1,000; growth above
+    MAX_PATHOLOGICAL_GROWTH is recorded in CHECK_FAILURES.
+    """
+    import regex_backend
+    from rules import build_street_format
+
+    results = []
+    for backend in regex_backend.available_backends():
+        regex_backend.set_backend(backend)
+        evaluate = build_street_format({})["evaluate"]
+        worst, growth = 0.0, 0.0
+        for name, make in PATHOLOGICAL_ADDRESSES.items():
+            timings = []
+            number = None
+            for length in PATHOLOGICAL_LENGTHS:
+                value = make(length)
+                timer = timeit.Timer(lambda: evaluate(value, 0, {}))
+                if number is None:
+                    number, _ = timer.autorange()  # Calls per run at the short length, so runs last 0.2s or more
+                # The least disturbed run; a single call is too short to time reliably
+                timings.append(min(timer.repeat(repeat=max(repeat, 3), number=number)) / number)
+            short, long = timings
+            worst = max(worst, long)
+            growth = max(growth, long / short)
+            if long / short > MAX_PATHOLOGICAL_GROWTH:
+                CHECK_FAILURES.append(f"Pathological address {name!r} ({backend}): time grew {long / short:.1f}x "
+                                      f"for 4x the characters; matching is no longer linear")
+        results.append((f"Pathological address, worst row ({backend})", worst, "s"))
+        results.append((f"Pathological address, 4k/1k growth ({backend})", growth, "x"))
+    regex_backend.set_backend("re")
+    return results
+
+BENCHMARKS = [bench_cold_start, bench_full_run, bench_categorical, bench_codecs, bench_pathological_addresses]
+
+def main():
+    parser = argparse.ArgumentParser(usage="python3 benchmark.py [--rows N] [--repeat R] [--keep DIR] [--only NAME]")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows in the generated input file")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per timing; the median is reported")
+    parser.add_argument("--keep", metavar="DIR", help="Work in DIR and keep the generated files")
+    parser.add_argument("--only", metavar="NAME", help="Run only the benchmarks whose function name contains NAME")
+    args = parser.parse_args()
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="vs4_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    input_csv = os.path.join(workdir, f"bench_{args.rows}.csv")
+    try:
+        generate_subscriber_csv(input_csv, args.rows)
+        print(f"Benchmark input: {input_csv} ({args.rows} rows)")
+        for benchmark in BENCHMARKS:
+            if args.only and args.only not in benchmark.__name__:
+                continue
+            for name, value, unit in benchmark(input_csv, workdir, args.repeat):
+                print(f"{name:<50} {value:>14.4f} {unit}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    for failure in CHECK_FAILURES:
+        print(f"FAILED: {failure}")
+    if CHECK_FAILURES:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
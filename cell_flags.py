@@ -0,0 +1,121 @@
+# cell_flags.py - Flagged cells as a packed bit matrix instead of a dict of (row, col) keys
+# One bit per cell, packed along the row (12 columns take 2 bytes per row), says whether
+# the cell is highlighted; failed rows are the rows with any bit set. Which message flagged
+# a cell is kept as a small integer code per cell in an array per column, allocated when
+# the column is first flagged, with the message text looked up in a shared list. Codes are
+# the narrowest unsigned type that holds every message seen so far and widen as messages
+# are added. Flagging a cell again overwrites its code, so the last rule to flag a cell
+# is the one reported, as with the dict this replaces. At 10M rows the bits take 20 MB and
+# each flagged column 10-20 MB, where the dict took over 100 bytes per flagged cell.
+# numpy is imported inside the methods, so importing this module stays cheap.
+
+# Set bits per byte value, for counting flagged cells without unpacking the matrix
+BIT_COUNTS = [bin(value).count("1") for value in range(256)]
+ITEM_ROWS = 65536  # Rows unpacked at a time by items()
+
+class FlaggedCells:
+    """
+    Flags for rows x columns cells, addressed by 0-based row position and column name.
+    Reads like the {(row_idx, col_name): error_message} dict it replaces: len() is the
+    flagged cell count, iteration gives (row_idx, col_name) keys and items() adds the
+    messages, in row order.
+    """
+
+    def __init__(self, rows, columns):
+        import numpy as np
+
+        self.rows = rows
+        self.columns = list(columns)
+        self.column_index = {col: i for i, col in enumerate(self.columns)}
+        self.bits = np.zeros((rows, (len(self.columns) + 7) // 8), dtype=np.uint8)
+        self.codes = {}  # col -> message code per row; 0 is not flagged
+        self.messages = [None]
+        self.message_codes = {}
+        self.dtype = np.uint8
+
+    @classmethod
+    def from_errors(cls, errors, rows, columns):
+        """Flags for errors whose "Row" is an OrigRowNum counted from 1; file-level errors ("N/A") are skipped."""
+        by_column = {}
+        for error in errors:
+            if error["Row"] != "N/A":
+                positions, messages = by_column.setdefault(error["Column"], ([], []))
+                positions.append(error["Row"] - 1)
+                messages.append(error["Error"])
+        flagged_cells = cls(rows, columns)
+        for col, (positions, messages) in by_column.items():
+            flagged_cells.add(col, positions, messages)
+        return flagged_cells
+
+    def message_code(self, message):
+        import numpy as np
+
+        code = self.message_codes.get(message)
+        if code is None:
+            code = self.message_codes[message] = len(self.messages)
+            self.messages.append(message)
+            if code > np.iinfo(self.dtype).max:
+                self.dtype = np.min_scalar_type(code)
+                self.codes = {col: codes.astype(self.dtype) for col, codes in self.codes.items()}
+        return code
+
+    def add(self, col, positions, messages):
+        """Flag col at the row positions, each with its message; a cell flagged again keeps the later message."""
+        if not len(positions):
+            return
+        import numpy as np
+        import pandas as pd
+
+        positions = np.asarray(positions, dtype=np.int64)
+        # Only the distinct messages of the call are looked up
+        message_index, distinct = pd.factorize(pd.Series(messages, dtype=object))
+        codes = np.array([self.message_code(message) for message in distinct], dtype=np.int64)[message_index]
+        i = self.column_index[col]
+        column_bits = self.bits[:, i // 8]
+        column_bits[positions] |= np.uint8(0x80 >> (i % 8))
+        if col not in self.codes:
+            self.codes[col] = np.zeros(self.rows, dtype=self.dtype)
+        # Within one call the last message for a position wins, as in a dict
+        self.codes[col][positions] = codes.astype(self.dtype)
+
+    def matrix(self, start=0, stop=None):
+        """Boolean (rows, columns) flags for rows start to stop, unpacked for that slice only."""
+        import numpy as np
+
+        return np.unpackbits(self.bits[start:stop], axis=1, count=len(self.columns)).view(bool)
+
+    def failed_row_mask(self):
+        return self.bits.any(axis=1)
+
+    def failed_rows(self):
+        """Rows with at least one flagged cell."""
+        import numpy as np
+
+        return int(np.count_nonzero(self.failed_row_mask()))
+
+    def __len__(self):
+        import numpy as np
+
+        return int(np.array(BIT_COUNTS, dtype=np.uint8)[self.bits].sum(dtype=np.int64))
+
+    def __contains__(self, cell):
+        row_idx, col = cell
+        return col in self.codes and bool(self.codes[col][row_idx])
+
+    def __getitem__(self, cell):
+        if cell not in self:
+            raise KeyError(cell)
+        row_idx, col = cell
+        return self.messages[self.codes[col][row_idx]]
+
+    def items(self):
+        """((row_idx, col_name), message) for every flagged cell, by row then column."""
+        import numpy as np
+
+        for start in range(0, self.rows, ITEM_ROWS):
+            for row_idx, i in zip(*np.nonzero(self.matrix(start, start + ITEM_ROWS))):
+                col = self.columns[i]
+                yield (start + int(row_idx), col), self.messages[self.codes[col][start + row_idx]]
+
+    def __iter__(self):
+        return (cell for cell, _ in self.items())
@@ -0,0 +1,98 @@
+# checkpoint.py - Checkpoints that let an interrupted vs4.py run resume
+# A full run started with --checkpoint (or --resume) keeps <company_id>/_Checkpoint.json up to date;
+# other runs write no checkpoint, so they do not pay for it. The manifest holds the run's fingerprint
+# (input file size and mtime, rule ids and options), its start time, the columns validated
+# so far and the output files finished so far with their sizes. Each validated column's
+# hits (row position and message per check, in rule order) and report sections are
+# written to <company_id>/_checkpoint/<column>.json before the manifest lists the column.
+# Every file is written to a temp file and renamed into place, so a run killed at any
+# point leaves the last completed step intact. With --resume, vs4.py keeps the directory,
+# replays the finished columns instead of validating them again and skips output files
+# whose recorded size still matches; the checkpoint is removed once the run completes.
+# json is imported where it is used, so importing this module adds nothing to vs4.py's startup.
+import os
+import shutil
+import threading
+
+MANIFEST_NAME = "_Checkpoint.json"
+FRAGMENT_DIR = "_checkpoint"
+
+def input_fingerprint(input_csv, options):
+    """What a resumed run must share with the interrupted one; options must be JSON-serializable."""
+    import json
+
+    stat = os.stat(input_csv)
+    fingerprint = {"Input": os.path.abspath(input_csv), "Size": stat.st_size, "Modified": stat.st_mtime_ns, "Options": options}
+    return json.loads(json.dumps(fingerprint))  # Same types as a fingerprint read back from the manifest
+
+def write_json_atomic(path, data):
+    import json
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class Checkpoint:
+    def __init__(self, company_id, fingerprint, start_time):
+        self.path = os.path.join(company_id, MANIFEST_NAME)
+        self.fragment_dir = os.path.join(company_id, FRAGMENT_DIR)
+        self.manifest = {"Fingerprint": fingerprint, "Start Time": start_time, "Columns": [], "Artifacts": {}}
+        self.lock = threading.Lock()  # Output files finish on the artifact writer threads
+
+    @classmethod
+    def load(cls, company_id, fingerprint):
+        """The checkpoint an interrupted run left in company_id, or None if there is none or it has another fingerprint."""
+        import json
+
+        try:
+            with open(os.path.join(company_id, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("Fingerprint") != fingerprint:
+            return None
+        checkpoint = cls(company_id, fingerprint, manifest["Start Time"])
+        checkpoint.manifest = manifest
+        return checkpoint
+
+    def start(self):
+        os.makedirs(self.fragment_dir, exist_ok=True)
+        write_json_atomic(self.path, self.manifest)
+
+    def fragment_path(self, col):
+        return os.path.join(self.fragment_dir, f"{col}.json")
+
+    def load_column(self, col):
+        """(hits per check, report sections) of a column validated before, or None."""
+        import json
+
+        if col not in self.manifest["Columns"]:
+            return None
+        with open(self.fragment_path(col)) as f:
+            fragment = json.load(f)
+        return fragment["Hits"], fragment["Sections"]
+
+    def save_column(self, col, hits, sections):
+        write_json_atomic(self.fragment_path(col), {"Hits": hits, "Sections": sections})
+        with self.lock:
+            self.manifest["Columns"].append(col)
+            write_json_atomic(self.path, self.manifest)
+
+    def artifact_done(self, path):
+        """True if path was finished before and still has the size it had then."""
+        size = self.manifest["Artifacts"].get(os.path.basename(path))
+        return size is not None and os.path.isfile(path) and os.path.getsize(path) == size
+
+    def save_artifact(self, path):
+        with self.lock:
+            self.manifest["Artifacts"][os.path.basename(path)] = os.path.getsize(path)
+            write_json_atomic(self.path, self.manifest)
+
+    def remove(self):
+        shutil.rmtree(self.fragment_dir, ignore_errors=True)
+        for path in (self.path, f"{self.path}.tmp"):  # A killed run can leave the temp file
+            if os.path.exists(path):
+                os.remove(path)
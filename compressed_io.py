@@ -0,0 +1,67 @@
+# compressed_io.py - Transparent compressed input and output for vs4.py
+# Inputs ending in .gz, .zip or .zst are decompressed while they are streamed; a .zip is
+# read from its first CSV member. zstd needs the optional zstandard package. Outputs are
+# compressed by adding the codec's extension to the file name (pandas infers the codec
+# from it for to_csv; open_output_text() does the same for other text files).
+import gzip
+import io
+import os
+import zipfile
+
+INPUT_CODECS = {".gz": "gzip", ".zip": "zip", ".zst": "zstd", ".zstd": "zstd"}
+OUTPUT_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+def codec_of(path):
+    """Codec name for a compressed file name, or None for a plain file."""
+    return INPUT_CODECS.get(os.path.splitext(path)[1].lower())
+
+def available_codecs():
+    from importlib.util import find_spec
+
+    return ["gzip", "zip"] + (["zstd"] if find_spec("zstandard") else [])
+
+def base_name(path):
+    """File name without directories, compression extension or .csv: "a/b.csv.gz" -> "b"."""
+    name = os.path.basename(path)
+    if codec_of(name):
+        name = os.path.splitext(name)[0]
+    return os.path.splitext(name)[0]
+
+def open_binary(path):
+    """Open path for reading as a binary stream of its decompressed content."""
+    codec = codec_of(path)
+    if codec is None:
+        return open(path, "rb")
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "zip":
+        archive = zipfile.ZipFile(path)
+        members = [info for info in archive.infolist() if not info.is_dir() and not info.filename.startswith("__MACOSX/")]
+        csv_members = [info for info in members if info.filename.lower().endswith(".csv")] or members
+        if not csv_members:
+            raise ValueError(f"No files found in {path}")
+        return archive.open(csv_members[0])  # The member keeps the archive open until it is closed
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(f"Reading {path} needs the zstandard package") from None
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+def open_text(path):
+    """Open path for reading as text the way the csv module expects (BOM dropped, newline="")."""
+    return io.TextIOWrapper(open_binary(path), encoding="utf-8-sig", newline="")
+
+def output_path(path, codec=None):
+    """path with the codec's extension added ("x_Errors.csv" -> "x_Errors.csv.gz")."""
+    return path + OUTPUT_EXTENSIONS[codec] if codec else path
+
+def open_output_text(path):
+    """Open path for writing text, compressed when it ends in a codec extension."""
+    codec = codec_of(path)
+    if codec == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8")
+    if codec == "zstd":
+        import zstandard
+
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True), encoding="utf-8")
+    return open(path, "w")
@@ -0,0 +1,106 @@
+# dedupe.py - Fuzzy duplicate-location detection for the address.duplicate_location rule
+# Rows are blocked on house number + 5-digit ZIP + first street-name token, so only rows in
+# the same block are ever compared. Inside a block, distinct addresses are compared with a
+# normalized string similarity and joined into clusters; a cluster is reported when its rows
+# carry more than one customer ID.
+import difflib
+import re
+
+from standardize import DIRECTIONAL_ABBREVIATIONS, standardize_address
+
+SIMILARITY_THRESHOLD = 0.88  # difflib ratio between comparison keys
+MAX_PAIRWISE = 40  # Blocks with more distinct addresses are compared over a sorted window
+WINDOW = 5
+NON_WORD = re.compile(r"[^\w\s]")
+DIGITS = re.compile(r"\d+")
+ZIP5 = re.compile(r"^\d{5}")
+
+def location_key(address):
+    """Comparison form of an address: standardized, upper case, punctuation removed."""
+    return " ".join(NON_WORD.sub(" ", standardize_address(address)).upper().split())
+
+def block_key(key):
+    """House number and first street-name token (letters sorted) of a comparison key, or None."""
+    tokens = key.split()
+    if len(tokens) < 2 or not tokens[0].isdigit():
+        return None
+    street = tokens[1]
+    if street in DIRECTIONAL_ABBREVIATIONS and len(tokens) > 2:
+        street = tokens[2]
+    # Sorted letters keep transposition typos ("MIAN" for "MAIN") in the same block
+    return f"{tokens[0]} {''.join(sorted(street))}"
+
+def similar(a, b):
+    # Unit and route numbers must agree exactly; "Apt 1" and "Apt 2" are different places
+    if DIGITS.findall(a) != DIGITS.findall(b):
+        return False
+    return difflib.SequenceMatcher(None, a, b).ratio() >= SIMILARITY_THRESHOLD
+
+def cluster_keys(keys):
+    """Union-find over a block's distinct comparison keys; returns a root index per key."""
+    parent = list(range(len(keys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if len(keys) <= MAX_PAIRWISE:
+        pairs = ((i, j) for i in range(len(keys)) for j in range(i + 1, len(keys)))
+    else:
+        pairs = ((i, j) for i in range(len(keys)) for j in range(i + 1, min(i + 1 + WINDOW, len(keys))))
+    for i, j in pairs:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j and similar(keys[i], keys[j]):
+            parent[root_j] = root_i
+    return [find(i) for i in range(len(keys))]
+
+def find_duplicate_locations(addresses, zips, customers):
+    """
+    addresses, zips and customers are normalized Series of the same length. Returns
+    (row_idx, cluster_id) for every row in a likely-duplicate location cluster, in row
+    order; cluster IDs count from 1 in order of each cluster's first row.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Blocking keys are computed once per distinct address and per distinct ZIP
+    address_codes, address_uniques = pd.factorize(addresses)
+    comparison_keys = [location_key(str(address)) for address in address_uniques]
+    unique_blocks = [block_key(key) for key in comparison_keys]
+    block_codes, _ = pd.factorize(pd.Series(unique_blocks, dtype=object))
+    block_codes = np.append(block_codes, -1)[address_codes]
+    zip_codes, zip_uniques = pd.factorize(zips)
+    zip5_codes, _ = pd.factorize(pd.Series([z[:5] if ZIP5.match(z) else None for z in zip_uniques], dtype=object))
+    zip5_codes = np.append(zip5_codes, -1)[zip_codes]
+
+    valid = np.flatnonzero((block_codes >= 0) & (zip5_codes >= 0))
+    combined = block_codes[valid].astype(np.int64) * (int(zip5_codes.max()) + 1) + zip5_codes[valid]
+    order = np.argsort(combined, kind="stable")
+    rows, combined = valid[order], combined[order]
+    starts = np.flatnonzero(np.r_[True, combined[1:] != combined[:-1]])
+    ends = np.r_[starts[1:], len(rows)]
+
+    customer_values = customers.to_numpy(dtype=object)
+    clusters = []  # Lists of row indexes
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if end - start < 2:
+            continue
+        block_rows = rows[start:end]
+        if len(set(customer_values[block_rows])) < 2:
+            continue
+        by_key = {}
+        for row in block_rows.tolist():
+            by_key.setdefault(comparison_keys[address_codes[row]], []).append(row)
+        keys = sorted(by_key)
+        members = {}
+        for key, root in zip(keys, cluster_keys(keys)):
+            members.setdefault(root, []).extend(by_key[key])
+        for cluster_rows in members.values():
+            if len(cluster_rows) > 1 and len(set(customer_values[cluster_rows])) > 1:
+                clusters.append(sorted(cluster_rows))
+
+    clusters.sort(key=lambda cluster_rows: cluster_rows[0])
+    hits = [(row, cluster_id) for cluster_id, cluster_rows in enumerate(clusters, start=1) for row in cluster_rows]
+    return sorted(hits)
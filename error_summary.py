@@ -0,0 +1,117 @@
+# error_summary.py - Aggregate validation errors into one entry per distinct problem
+# Errors are grouped by (column, error message, normalized value): the value stripped,
+# whitespace collapsed and case-folded, so " Fiber" and "FIBER" are one problem. A message
+# seen with more than MAX_VALUES distinct values in a column (out-of-range coordinates,
+# duplicate customer IDs) is one problem whatever the value, so its values share a single
+# "(various)" group. Each group reports its count, first and last OrigRowNum, the runs of
+# consecutive rows it covers and a few exemplar rows, both bounded so a group's entry stays
+# small however many rows it has. Errors are reduced to integer codes once and everything
+# after that is vectorized; a report written from the summary grows with the number of
+# groups rather than the number of errors.
+
+EXEMPLAR_ROWS = 5  # OrigRowNums listed per group
+MAX_RANGES = 10  # Runs of consecutive rows listed per group
+MAX_VALUES = 25  # Distinct values of one column and message before they share a group
+VARIOUS = "(various)"
+
+SUMMARY_COLUMNS = ["Column", "Error", "Value", "Distinct Values", "Count", "First Row", "Last Row", "Range Count",
+                   "Row Ranges", "Exemplar Rows"]
+
+def summarize_errors(errors, exemplars=EXEMPLAR_ROWS, max_ranges=MAX_RANGES, max_values=MAX_VALUES):
+    """
+    DataFrame of SUMMARY_COLUMNS, one row per group, largest groups first (ties in order of
+    first appearance). "Distinct Values" is above 1 only for a VARIOUS group. "Row Ranges"
+    holds up to max_ranges [first, last] runs out of "Range Count"; "Exemplar Rows" the
+    first `exemplars` rows. File-level errors (Row "N/A") are counted but have no rows.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not errors:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    column_codes, column_names = pd.factorize(pd.Series([error["Column"] for error in errors], dtype=object))
+    message_codes, messages = pd.factorize(pd.Series([error["Error"] for error in errors], dtype=object))
+    raw_codes, raw_values = pd.factorize(pd.Series([error["Value"] for error in errors], dtype=object))
+    rows = pd.to_numeric(pd.Series([error["Row"] for error in errors], dtype=object), errors="coerce").to_numpy()
+    # Only the distinct values are normalized
+    value_codes, values = pd.factorize(pd.Index(raw_values, dtype=object).astype(str).str.strip()
+                                       .str.replace(r"\s+", " ", regex=True).str.casefold())
+    value_codes = value_codes[raw_codes]
+
+    # (column, message) pairs with too many distinct values get the VARIOUS value code
+    pair_codes, pairs = pd.factorize(column_codes.astype(np.int64) * len(messages) + message_codes)
+    pair_values = pd.unique(pair_codes.astype(np.int64) * len(values) + value_codes)
+    distinct = np.bincount(pair_values // len(values), minlength=len(pairs))
+    various = len(values)
+    key_codes = np.where(distinct[pair_codes] > max_values, various, value_codes)
+    codes, keys = pd.factorize(pair_codes.astype(np.int64) * (various + 1) + key_codes)
+    groups = len(keys)
+    key_pair, key_value = keys // (various + 1), keys % (various + 1)
+    summary = pd.DataFrame({
+        "Column": column_names[pairs[key_pair] // len(messages)],
+        "Error": messages[pairs[key_pair] % len(messages)],
+        "Value": np.append(np.asarray(values, dtype=object), VARIOUS)[key_value],
+        "Distinct Values": np.where(key_value == various, distinct[key_pair], 1),
+        "Count": np.bincount(codes, minlength=groups),
+    })
+
+    def starts(array):
+        # True where a new value begins in a sorted array
+        return np.r_[True, array[1:] != array[:-1]] if len(array) else np.zeros(0, dtype=bool)
+
+    def rank_in_group(group_starts):
+        # Position of each entry within its group, entries sorted by group
+        first = np.flatnonzero(group_starts)
+        return np.arange(len(group_starts)) - np.repeat(first, np.diff(np.r_[first, len(group_starts)]))
+
+    # Rows of each group in order, without repeats
+    numeric = ~np.isnan(rows)
+    group_of, row = codes[numeric], rows[numeric].astype(np.int64)
+    order = np.lexsort((row, group_of))
+    group_of, row = group_of[order], row[order]
+    keep = starts(group_of) | starts(row)
+    group_of, row = group_of[keep], row[keep]
+    group_start = starts(group_of)
+    group_end = np.r_[group_start[1:], True][:len(row)]
+    first_row = np.full(groups, None, dtype=object)
+    last_row = np.full(groups, None, dtype=object)
+    first_row[group_of[group_start]] = row[group_start].tolist()
+    last_row[group_of[group_end]] = row[group_end].tolist()
+
+    # Runs of consecutive rows: a run starts at a new group or after a gap
+    run_start = group_start | np.r_[True, row[1:] != row[:-1] + 1][:len(row)]
+    run_end = np.r_[run_start[1:], True][:len(row)]
+    run_group = group_of[run_start]
+    listed = rank_in_group(starts(run_group)) < max_ranges
+    ranges = [[] for _ in range(groups)]
+    for group, first, last in zip(run_group[listed].tolist(), row[run_start][listed].tolist(), row[run_end][listed].tolist()):
+        ranges[group].append([first, last])
+
+    examples = [[] for _ in range(groups)]
+    shown = rank_in_group(group_start) < exemplars
+    for group, example in zip(group_of[shown].tolist(), row[shown].tolist()):
+        examples[group].append(example)
+
+    summary["First Row"] = first_row
+    summary["Last Row"] = last_row
+    summary["Range Count"] = np.bincount(run_group, minlength=groups)
+    summary["Row Ranges"] = ranges
+    summary["Exemplar Rows"] = examples
+    return summary.sort_values("Count", ascending=False, kind="stable").reset_index(drop=True)[SUMMARY_COLUMNS]
+
+def format_ranges(ranges, range_count):
+    text = ", ".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+    if range_count > len(ranges):
+        text += f", ... (+{range_count - len(ranges)} more)"
+    return text
+
+def summary_table(summary):
+    """The summary with ranges and exemplars as text, as written to _Error_Summary.csv and the Error Summary sheet."""
+    return summary.assign(**{
+        "Row Ranges": [format_ranges(ranges, count) for ranges, count in zip(summary["Row Ranges"], summary["Range Count"])],
+        "Exemplar Rows": [", ".join(map(str, rows)) for rows in summary["Exemplar Rows"]],
+    })
+
+def summary_records(summary):
+    """The summary as JSON-ready dicts for _VR.json."""
+    return [dict(zip(SUMMARY_COLUMNS, record)) for record in summary.itertuples(index=False, name=None)]
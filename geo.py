@@ -0,0 +1,227 @@
+# geo.py - Point-in-state lookup for subscriber coordinates
+# Boundaries are read from a local GeoJSON FeatureCollection of state (Multi)Polygons and
+# compiled once into a grid index, cached next to the boundary file as <file>.idx.npz.
+# Grid cells that lie wholly inside one state answer directly; points in cells crossed by a
+# boundary are resolved with a vectorized even-odd ray test against only the edges of the
+# candidate states that overlap the point's latitude band.
+import json
+import os
+
+from rules import VALID_STATES
+
+DEFAULT_CELL_SIZE = 0.25  # Degrees
+INDEX_VERSION = 1
+# Feature properties checked, in order, for the state's postal code
+STATE_CODE_PROPERTIES = ("STUSPS", "STATE_ABBR", "state_code", "postal", "abbr", "state", "STATE")
+OUTSIDE = -1  # Grid owner: no state
+BOUNDARY = -2  # Grid owner: crossed by a boundary, test candidates exactly
+MAX_PAIRS = 2_000_000  # Point x edge comparisons per vectorized block
+
+def load_boundaries(path):
+    """
+    Read a GeoJSON FeatureCollection and return {state_code: [ring, ...]} where each ring
+    is an (n, 2) array of lon/lat vertices. Exteriors and holes are kept together; the
+    even-odd test treats holes correctly.
+    """
+    import numpy as np
+
+    with open(path) as f:
+        collection = json.load(f)
+    regions = {}
+    for feature in collection.get("features", []):
+        properties = feature.get("properties") or {}
+        code = next((str(properties[key]).strip().upper() for key in STATE_CODE_PROPERTIES
+                     if str(properties.get(key, "")).strip().upper() in VALID_STATES), None)
+        geometry = feature.get("geometry") or {}
+        if code is None or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            continue
+        polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+        for polygon in polygons:
+            for ring in polygon:
+                ring = np.asarray(ring, dtype=float)[:, :2]
+                if len(ring) < 3:
+                    continue
+                if not np.array_equal(ring[0], ring[-1]):
+                    ring = np.vstack([ring, ring[:1]])
+                regions.setdefault(code, []).append(ring)
+    if not regions:
+        raise ValueError(f"No state polygons found in {path}")
+    return regions
+
+def build_index(regions, cell_size=DEFAULT_CELL_SIZE):
+    """Compile {state_code: rings} into the grid index (a dict of NumPy arrays)."""
+    import numpy as np
+
+    codes = sorted(regions)
+    x1, y1, x2, y2, owner_region = [], [], [], [], []
+    for region_id, code in enumerate(codes):
+        for ring in regions[code]:
+            x1.append(ring[:-1, 0])
+            y1.append(ring[:-1, 1])
+            x2.append(ring[1:, 0])
+            y2.append(ring[1:, 1])
+            owner_region.append(np.full(len(ring) - 1, region_id))
+    x1, y1, x2, y2 = (np.concatenate(a) for a in (x1, y1, x2, y2))
+    edge_region = np.concatenate(owner_region)
+
+    lon0 = np.floor(min(x1.min(), x2.min()) / cell_size) * cell_size
+    lat0 = np.floor(min(y1.min(), y2.min()) / cell_size) * cell_size
+    nx = int(np.ceil((max(x1.max(), x2.max()) - lon0) / cell_size)) + 1
+    ny = int(np.ceil((max(y1.max(), y2.max()) - lat0) / cell_size)) + 1
+    n_regions = len(codes)
+
+    # Edges bucketed by every latitude band their y-range touches (CSR by region * ny + band)
+    band_lo = np.floor((np.minimum(y1, y2) - lat0) / cell_size).astype(np.int64)
+    band_hi = np.floor((np.maximum(y1, y2) - lat0) / cell_size).astype(np.int64)
+    edge_ids, bands = expand_ranges(band_lo, band_hi)
+    keys = edge_region[edge_ids] * ny + bands
+    order = np.argsort(keys, kind="stable")
+    band_edges = edge_ids[order]
+    band_offsets = np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=n_regions * ny))])
+
+    index = {
+        "codes": np.array(codes), "cell_size": np.float64(cell_size), "lon0": np.float64(lon0), "lat0": np.float64(lat0),
+        "nx": np.int64(nx), "ny": np.int64(ny), "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+        "band_edges": band_edges, "band_offsets": band_offsets,
+    }
+
+    # Cells touched by each region's boundary: split edges into pieces no longer than a cell,
+    # so each piece's bounding box covers at most 2 x 2 cells
+    lengths = np.hypot(x2 - x1, y2 - y1)
+    pieces = np.maximum(1, np.ceil(lengths / cell_size)).astype(np.int64)
+    piece_edge, piece_num = expand_ranges(np.zeros(len(pieces), dtype=np.int64), pieces - 1)
+    t0 = piece_num / pieces[piece_edge]
+    t1 = (piece_num + 1) / pieces[piece_edge]
+    px0 = x1[piece_edge] + (x2 - x1)[piece_edge] * t0
+    px1 = x1[piece_edge] + (x2 - x1)[piece_edge] * t1
+    py0 = y1[piece_edge] + (y2 - y1)[piece_edge] * t0
+    py1 = y1[piece_edge] + (y2 - y1)[piece_edge] * t1
+    touched = []
+    for ix in (np.minimum(px0, px1), np.maximum(px0, px1)):
+        for iy in (np.minimum(py0, py1), np.maximum(py0, py1)):
+            cell = (np.floor((iy - lat0) / cell_size).astype(np.int64) * nx
+                    + np.floor((ix - lon0) / cell_size).astype(np.int64))
+            touched.append(edge_region[piece_edge] * (nx * ny) + cell)
+    touched = np.unique(np.concatenate(touched))
+    boundary_region, boundary_cell = np.divmod(touched, nx * ny)
+
+    # Cells no boundary passes through are wholly inside one state or outside all of them;
+    # classify each by testing its center against the states whose bounding box holds it
+    grid = np.full(nx * ny, OUTSIDE, dtype=np.int16)
+    is_boundary = np.zeros(nx * ny, dtype=bool)
+    is_boundary[boundary_cell] = True
+    for region_id in range(n_regions):
+        mask = edge_region == region_id
+        cx_lo = int(np.floor((min(x1[mask].min(), x2[mask].min()) - lon0) / cell_size))
+        cx_hi = int(np.floor((max(x1[mask].max(), x2[mask].max()) - lon0) / cell_size))
+        cy_lo = int(np.floor((min(y1[mask].min(), y2[mask].min()) - lat0) / cell_size))
+        cy_hi = int(np.floor((max(y1[mask].max(), y2[mask].max()) - lat0) / cell_size))
+        cy, cx = np.mgrid[cy_lo:cy_hi + 1, cx_lo:cx_hi + 1]
+        cells = (cy * nx + cx).ravel()
+        cells = cells[~is_boundary[cells] & (grid[cells] == OUTSIDE)]
+        centers_x = lon0 + (cells % nx + 0.5) * cell_size
+        centers_y = lat0 + (cells // nx + 0.5) * cell_size
+        grid[cells[points_in_region(index, region_id, centers_x, centers_y)]] = region_id
+    grid[boundary_cell] = BOUNDARY
+
+    # Candidate states for boundary cells (CSR keyed by sorted cell id)
+    order = np.lexsort((boundary_region, boundary_cell))
+    boundary_cell, boundary_region = boundary_cell[order], boundary_region[order]
+    cells, counts = np.unique(boundary_cell, return_counts=True)
+    index.update({
+        "grid": grid, "candidate_cells": cells,
+        "candidate_offsets": np.concatenate([[0], np.cumsum(counts)]),
+        "candidate_regions": boundary_region.astype(np.int16),
+    })
+    return index
+
+def expand_ranges(lo, hi):
+    """For inclusive ranges [lo[i], hi[i]], return (i, value) for every value in every range."""
+    import numpy as np
+
+    counts = hi - lo + 1
+    owners = np.repeat(np.arange(len(lo)), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, lo[owners] + (np.arange(counts.sum()) - starts)
+
+def points_in_region(index, region_id, px, py):
+    """Exact even-odd test of points (px, py) against one region, a latitude band at a time."""
+    import numpy as np
+
+    inside = np.zeros(len(px), dtype=bool)
+    if not len(px):
+        return inside
+    ny = int(index["ny"])
+    bands = np.floor((py - index["lat0"]) / index["cell_size"]).astype(np.int64)
+    valid = (bands >= 0) & (bands < ny)
+    for band in np.unique(bands[valid]):
+        key = region_id * ny + band
+        edges = index["band_edges"][index["band_offsets"][key]:index["band_offsets"][key + 1]]
+        if not len(edges):
+            continue
+        x1, y1 = index["x1"][edges], index["y1"][edges]
+        x2, y2 = index["x2"][edges], index["y2"][edges]
+        dy = np.where(y2 == y1, 1.0, y2 - y1)
+        points = np.flatnonzero(bands == band)
+        step = max(1, MAX_PAIRS // len(edges))
+        for start in range(0, len(points), step):
+            chunk = points[start:start + step]
+            qx, qy = px[chunk, None], py[chunk, None]
+            crosses = ((y1 > qy) != (y2 > qy)) & (qx < (x2 - x1) * (qy - y1) / dy + x1)
+            inside[chunk] = np.count_nonzero(crosses, axis=1) % 2 == 1
+    return inside
+
+def locate_points(index, lat, lon):
+    """Return the containing region id (index into index["codes"]) for each point, or -1."""
+    import numpy as np
+
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    nx, ny, cell_size = int(index["nx"]), int(index["ny"]), index["cell_size"]
+    result = np.full(len(lat), OUTSIDE, dtype=np.int64)
+    with np.errstate(invalid="ignore"):
+        ix = np.floor((lon - index["lon0"]) / cell_size)
+        iy = np.floor((lat - index["lat0"]) / cell_size)
+    in_grid = np.flatnonzero(np.isfinite(ix) & np.isfinite(iy) & (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny))
+    cells = iy[in_grid].astype(np.int64) * nx + ix[in_grid].astype(np.int64)
+    owners = index["grid"][cells]
+    result[in_grid] = np.where(owners == BOUNDARY, OUTSIDE, owners)
+
+    boundary = owners == BOUNDARY
+    points, cells = in_grid[boundary], cells[boundary]
+    position = np.searchsorted(index["candidate_cells"], cells)
+    first = index["candidate_offsets"][position]
+    count = index["candidate_offsets"][position + 1] - first
+    for k in range(int(count.max()) if len(count) else 0):
+        pending = (count > k) & (result[points] == OUTSIDE)
+        regions = index["candidate_regions"][first[pending] + k]
+        pending = np.flatnonzero(pending)
+        for region_id in np.unique(regions):
+            chosen = points[pending[regions == region_id]]
+            found = points_in_region(index, int(region_id), lon[chosen], lat[chosen])
+            result[chosen[found]] = region_id
+    return result
+
+def load_index(path, cell_size=DEFAULT_CELL_SIZE):
+    """
+    Return the grid index for the boundary file at path, reusing <path>.idx.npz when it
+    was built from the same file (size and mtime) with the same cell size.
+    """
+    import numpy as np
+
+    stat = os.stat(path)
+    signature = np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns, cell_size], dtype=float)
+    cache_path = f"{path}.idx.npz"
+    if os.path.isfile(cache_path):
+        try:
+            with np.load(cache_path) as cached:
+                if np.array_equal(cached["signature"], signature):
+                    return {key: cached[key] for key in cached.files if key != "signature"}
+        except Exception:
+            pass  # Rebuild a stale or unreadable cache
+    index = build_index(load_boundaries(path), cell_size)
+    try:
+        np.savez(cache_path, signature=signature, **index)
+    except OSError:
+        pass  # Read-only location; the index is just rebuilt next run
+    return index
@@ -0,0 +1,295 @@
+# mapreduce.py - Split/validate/merge validation of one large file across processes or hosts
+# Usage:
+#   python3 mapreduce.py split <input_csv> <work_dir> [--parts N] [--exact]
+#   python3 mapreduce.py validate <work_dir> <part> [<part> ...]
+#   python3 mapreduce.py merge <work_dir> <company_id>
+#   python3 mapreduce.py run <input_csv> <company_id> [--parts N] [--workers W] [--work-dir DIR] [--exact]
+# split cuts the input into byte ranges that start on record boundaries (quote-aware, see
+# row_index.py) and writes <work_dir>/manifest.json with each range's first OrigRowNum.
+# validate runs the row-local rules on the given ranges; any host that sees the input and
+# work_dir through a shared filesystem can run any part. Each part writes its slice of
+# _Mod_1.csv and a results file holding its errors per rule plus the key columns the
+# cross_row rules need. merge runs the cross_row rules (duplicate customer IDs, duplicate
+# and stacked locations) once over the key columns of the whole file, then assembles
+# <company_id>/_Mod_1.csv, _Errors.csv, _Error_Summary.csv and _VR.json exactly as vs4.py would write them.
+# run does all three locally, with worker processes standing in for hosts.
+# Only uncompressed inputs can be split; optional rules and vs4.py's other options
+# (boundaries, standardization, subscriber index) are not supported here.
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+MANIFEST_NAME = "manifest.json"
+
+def part_path(work_dir, part, suffix):
+    return os.path.join(work_dir, f"part_{part:05d}{suffix}")
+
+def write_json_atomic(path, data):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, default=json_default)
+    os.replace(temp_path, path)
+
+def json_default(value):
+    # NumPy scalars, as in vs4.py
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+class RangeReader:
+    """Read-only binary stream of the header bytes followed by one byte range of a file."""
+
+    def __init__(self, path, header_end, start, end):
+        self.file = open(path, "rb")
+        self.pieces = [(0, header_end), (start, end)]
+
+    def read(self, size=-1):
+        chunks = []
+        while self.pieces and size != 0:
+            start, end = self.pieces[0]
+            count = end - start if size < 0 else min(size, end - start)
+            self.file.seek(start)
+            chunk = self.file.read(count)
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+            if start + len(chunk) >= end or not chunk:
+                self.pieces.pop(0)
+            else:
+                self.pieces[0] = (start + len(chunk), end)
+        return b"".join(chunks)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def split(input_csv, work_dir, parts=8, exact=False):
+    """
+    Write work_dir/manifest.json describing `parts` byte ranges of input_csv of about equal
+    size. exact uses the csv module to find record boundaries instead of quote parity;
+    use it if a validate step reports a row-count mismatch (stray quotes in the file).
+    """
+    import numpy as np
+    import pandas as pd
+
+    import compressed_io
+    import row_index
+    from vs4 import check_header_columns
+
+    if compressed_io.codec_of(input_csv):
+        raise ValueError(f"{input_csv} is compressed; byte ranges need an uncompressed input")
+    offsets = (row_index.exact_offsets if exact else row_index.record_offsets)(input_csv)
+    header_end, data_starts, size = int(offsets[1]) if len(offsets) > 1 else 0, offsets[1:-1], int(offsets[-1])
+    columns = pd.read_csv(input_csv, nrows=0).columns.tolist()
+    header_errors, missing_columns = check_header_columns(["OrigRowNum"] + columns)
+    if missing_columns:
+        raise ValueError(header_errors[-1]["Error"])
+
+    # Each range starts at the first record at or after its share of the file
+    targets = [header_end + (size - header_end) * i // parts for i in range(parts)]
+    first_records = sorted(set(np.searchsorted(data_starts, np.array(targets, dtype=np.uint64)).tolist()))
+    first_records = [first for first in first_records if first < len(data_starts)] or [0]
+    ranges = []
+    for i, first in enumerate(first_records):
+        last = first_records[i + 1] if i + 1 < len(first_records) else len(data_starts)
+        ranges.append({
+            "Start": int(data_starts[first]) if len(data_starts) else header_end,
+            "End": int(data_starts[last]) if last < len(data_starts) else size,
+            "First Row": first + 1,  # OrigRowNum of the range's first record
+            "Rows": last - first,
+        })
+
+    os.makedirs(work_dir, exist_ok=True)
+    write_json_atomic(os.path.join(work_dir, MANIFEST_NAME), {
+        "Input": os.path.abspath(input_csv),
+        "Size": size,
+        "Start Time": time.time(),  # The reports time the run from the split
+        "Header End": header_end,
+        "Header Errors": header_errors,
+        "Rows": len(data_starts),
+        "Parts": ranges,
+    })
+    return len(ranges)
+
+def read_manifest(work_dir):
+    with open(os.path.join(work_dir, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+def validate_part(work_dir, part):
+    """Validate one range with the row-local rules and write its results to work_dir."""
+    import pandas as pd
+
+    from cell_flags import FlaggedCells
+    from rules import EXPECTED_COLUMNS, RULES, compile_plan, rule_columns, validate_columns
+    from vs4 import ingest_dtypes, read_header
+
+    manifest = read_manifest(work_dir)
+    byte_range = manifest["Parts"][part]
+    input_csv = manifest["Input"]
+    if os.path.getsize(input_csv) != manifest["Size"]:
+        raise ValueError(f"{input_csv} changed since it was split")
+    with RangeReader(input_csv, manifest["Header End"], byte_range["Start"], byte_range["End"]) as f:
+        df = pd.read_csv(f, dtype=ingest_dtypes(read_header(input_csv)))
+    if len(df) != byte_range["Rows"]:
+        raise ValueError(f"Part {part} holds {len(df)} rows, not {byte_range['Rows']}; split again with --exact")
+    df.insert(0, "OrigRowNum", range(byte_range["First Row"], byte_range["First Row"] + len(df)))
+
+    # Steps 6 and 7 of vs4.py on this range
+    output_columns = ["OrigRowNum"] + EXPECTED_COLUMNS
+    column_mapping = {col: col.lower() for col in df.columns if col.lower() in EXPECTED_COLUMNS}
+    column_mapping["OrigRowNum"] = "OrigRowNum"
+    cleaned_df = df[list(column_mapping.keys())].rename(columns=column_mapping)[output_columns]
+    plan = compile_plan([rule for rule in RULES if not rule.get("cross_row")])
+    errors, hits = [], {}
+    validate_columns(cleaned_df, errors, FlaggedCells(len(cleaned_df), EXPECTED_COLUMNS), plan, {}, hits_out=hits)
+
+    # validate_columns emits each column's errors check by check; regroup them by rule id
+    errors_by_rule = {}
+    position = 0
+    for col in cleaned_df.columns:
+        for check, check_hits in zip(plan.get(col, []), hits.get(col, [])):
+            errors_by_rule[check["id"]] = [[error["Row"], error["Error"], error["Value"]]
+                                           for error in errors[position:position + len(check_hits)]]
+            position += len(check_hits)
+
+    cleaned_df.to_csv(part_path(work_dir, part, "_Mod_1.csv"), index=False, header=part == 0)
+    keys = {col: cleaned_df[col].astype(object).fillna("").astype(str).str.strip().tolist()
+            for col in rule_columns([rule for rule in RULES if rule.get("cross_row")])}
+    write_json_atomic(part_path(work_dir, part, "_results.json"), {"Rows": len(cleaned_df), "Errors": errors_by_rule, "Keys": keys})
+    return len(cleaned_df)
+
+def merge(work_dir, company_id):
+    """Combine the parts' results into <company_id>/_Mod_1.csv, _Errors.csv and _VR.json."""
+    import pandas as pd
+
+    import compressed_io
+    from cell_flags import FlaggedCells
+    from error_summary import summarize_errors, summary_table
+    from rules import EXPECTED_COLUMNS, RULES, compile_plan, get_plan, rule_columns, validate_columns
+    from vs4 import report_summary, sorted_errors_df, write_json_report
+
+    manifest = read_manifest(work_dir)
+    results = []
+    for part in range(len(manifest["Parts"])):
+        path = part_path(work_dir, part, "_results.json")
+        if not os.path.isfile(path):
+            raise ValueError(f"Part {part} has not been validated ({path} is missing)")
+        with open(path) as f:
+            results.append(json.load(f))
+
+    # cross_row rules over the key columns of the whole file
+    key_columns = rule_columns([rule for rule in RULES if rule.get("cross_row")])
+    keys_df = pd.DataFrame({"OrigRowNum": range(1, manifest["Rows"] + 1),
+                            **{col: [value for result in results for value in result["Keys"][col]] for col in key_columns}})
+    cross_plan = compile_plan([rule for rule in RULES if rule.get("cross_row")])
+    cross_errors, cross_hits, details = [], {}, {}
+    validate_columns(keys_df, cross_errors, FlaggedCells(len(keys_df), EXPECTED_COLUMNS), cross_plan, details, hits_out=cross_hits)
+    cross_by_rule = {}
+    position = 0
+    for col in keys_df.columns:
+        for check, check_hits in zip(cross_plan.get(col, []), cross_hits.get(col, [])):
+            cross_by_rule[check["id"]] = cross_errors[position:position + len(check_hits)]
+            position += len(check_hits)
+
+    # Errors in the order a single run emits them: header errors, then column by column
+    # and rule by rule, each rule's errors in row order
+    errors = list(manifest["Header Errors"])
+    rule_errors = []
+    plan = get_plan()
+    for col in EXPECTED_COLUMNS:
+        for check in plan.get(col, []):
+            count = len(errors)
+            if check["id"] in cross_by_rule:
+                errors.extend(cross_by_rule[check["id"]])
+            else:
+                errors.extend({"Row": row, "Column": col, "Error": message, "Value": value}
+                              for result in results for row, message, value in result["Errors"].get(check["id"], []))
+            rule_errors.append({"Rule": check["id"], "Column": col, "Errors": len(errors) - count})
+    flagged_cells = FlaggedCells.from_errors(errors, len(keys_df), EXPECTED_COLUMNS)
+
+    os.makedirs(company_id, exist_ok=True)
+    base_filename = compressed_io.base_name(manifest["Input"])
+    mod_path = os.path.join(company_id, f"{base_filename}_Mod_1.csv")
+    with open(mod_path, "wb") as out:
+        for part in range(len(manifest["Parts"])):
+            with open(part_path(work_dir, part, "_Mod_1.csv"), "rb") as f:
+                shutil.copyfileobj(f, out)
+    errors_csv_path = os.path.join(company_id, f"{base_filename}_Errors.csv")
+    sorted_errors_df(errors).to_csv(errors_csv_path, index=False)
+    error_summary = summarize_errors(errors)
+    error_summary_csv_path = os.path.join(company_id, f"{base_filename}_Error_Summary.csv")
+    summary_table(error_summary).to_csv(error_summary_csv_path, index=False)
+    json_path = os.path.join(company_id, f"{base_filename}_VR.json")
+    summary_data = report_summary(manifest["Start Time"], time.time(), errors, flagged_cells, keys_df, manifest["Input"], company_id)
+    write_json_report(json_path, summary_data, details, errors, error_summary, rule_errors)
+    return summary_data, [mod_path, errors_csv_path, error_summary_csv_path, json_path]
+
+def run(input_csv, company_id, parts=8, workers=None, work_dir=None, exact=False):
+    """split, validate every part in a local process pool, then merge."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    work_dir = work_dir or os.path.join(company_id, "_parts")
+    if os.path.exists(company_id):
+        shutil.rmtree(company_id)
+    start = time.perf_counter()
+    parts = split(input_csv, work_dir, parts, exact)
+    print(f"Split {input_csv} into {parts} parts ({time.perf_counter() - start:.2f}s)")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or min(parts, os.cpu_count() or 1)) as pool:
+        rows = list(pool.map(validate_part, [work_dir] * parts, range(parts)))
+    print(f"Validated {sum(rows)} rows in {parts} parts ({time.perf_counter() - start:.2f}s)")
+    start = time.perf_counter()
+    summary_data, paths = merge(work_dir, company_id)
+    shutil.rmtree(work_dir)
+    print(f"Merged ({time.perf_counter() - start:.2f}s): {', '.join(paths)}")
+    print(f"Total rows: {summary_data['Total Rows']}, Failed rows: {summary_data['Failed Rows']}, "
+          f"Flagged cells: {summary_data['Flagged Cells']}")
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(usage="python3 mapreduce.py {split,validate,merge,run} ...")
+    commands = parser.add_subparsers(dest="command", required=True)
+    split_parser = commands.add_parser("split", help="Cut the input into byte ranges")
+    split_parser.add_argument("input_csv")
+    split_parser.add_argument("work_dir")
+    split_parser.add_argument("--parts", type=int, default=8, help="Number of byte ranges (default 8)")
+    split_parser.add_argument("--exact", action="store_true", help="Find record boundaries with the csv module")
+    validate_parser = commands.add_parser("validate", help="Validate parts of a split input")
+    validate_parser.add_argument("work_dir")
+    validate_parser.add_argument("parts", type=int, nargs="+")
+    merge_parser = commands.add_parser("merge", help="Combine validated parts into the reports")
+    merge_parser.add_argument("work_dir")
+    merge_parser.add_argument("company_id")
+    run_parser = commands.add_parser("run", help="split, validate and merge on this machine")
+    run_parser.add_argument("input_csv")
+    run_parser.add_argument("company_id")
+    run_parser.add_argument("--parts", type=int, default=8, help="Number of byte ranges (default 8)")
+    run_parser.add_argument("--workers", type=int, help="Worker processes (default: one per part, up to the CPU count)")
+    run_parser.add_argument("--work-dir", metavar="DIR", help="Directory for the parts (default <company_id>/_parts)")
+    run_parser.add_argument("--exact", action="store_true", help="Find record boundaries with the csv module")
+    args = parser.parse_args()
+
+    if getattr(args, "parts", None) is not None and args.command in ("split", "run") and args.parts <= 0:
+        parser.error("--parts must be a positive integer")
+    try:
+        if args.command == "split":
+            print(f"Split {args.input_csv} into {split(args.input_csv, args.work_dir, args.parts, args.exact)} parts in {args.work_dir}")
+        elif args.command == "validate":
+            for part in args.parts:
+                print(f"Part {part}: {validate_part(args.work_dir, part)} rows validated")
+        elif args.command == "merge":
+            summary_data, paths = merge(args.work_dir, args.company_id)
+            print(f"Merged: {', '.join(paths)}")
+        else:
+            run(args.input_csv, args.company_id, args.parts, args.workers, args.work_dir, args.exact)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
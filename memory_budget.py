@@ -0,0 +1,169 @@
+# memory_budget.py - Keep a vs4.py run under a memory budget
+# Before the input is read, vs4.py reads and validates its first SAMPLE_ROWS rows under
+# tracemalloc; the traced peak per row, times the row count estimated from the file's line
+# count, projects the memory the data and its errors will hold. MemoryBudget.plan() then
+# picks the settings that decide the rest of the peak: whether _VR.xlsx is built in memory
+# (about EXCEL_CELL_BYTES per cell) or streamed, how many output files are written at once
+# (as many as the spare memory holds writers formatting at least a MIN_CHUNK_ROWS chunk each),
+# and how many rows each writer formats per chunk. While the run goes, a background
+# thread samples the RSS; chunk_rows() halves the chunk size whenever the RSS is above
+# SHRINK_AT of the budget. report() gives the estimate, the choices and the observed peak
+# for _VR.json. Reading the input in chunks was measured to leave the peak unchanged (the
+# parsed frame dominates), so the input is still read whole.
+import resource
+import sys
+import threading
+
+from progress import rss_bytes
+
+SAMPLE_ROWS = 5000  # Rows read and validated to estimate bytes per row
+EXCEL_CELL_BYTES = 400  # Memory per cell of an in-memory openpyxl workbook
+TARGET = 0.85  # Share of the budget the plan may use
+SHRINK_AT = 0.9  # Share of the budget above which chunks are halved
+MIN_CHUNK_ROWS = 1000
+MAX_CHUNK_ROWS = 100000
+SAMPLE_INTERVAL = 0.1  # Seconds between RSS samples
+CGROUP_LIMITS = ["/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"]
+UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+def format_size(size):
+    """size in bytes as MiB, the unit parse_size reads "M" in."""
+    return f"{size / UNITS['M']:,.0f} MiB"
+
+def parse_size(text):
+    """Bytes in "512M", "4G", "1.5GB" or a plain byte count; "auto" is the cgroup memory limit."""
+    text = text.strip().upper()
+    if text == "AUTO":
+        limit = cgroup_limit()
+        if limit is None:
+            raise ValueError("no cgroup memory limit found")
+        return limit
+    number = text.rstrip("BIKMGT")
+    unit = text[len(number):].rstrip("B").rstrip("I")
+    try:
+        return int(float(number) * UNITS[unit])
+    except (KeyError, ValueError):
+        raise ValueError(f"invalid size {text!r}; use e.g. 512M, 4G or a byte count") from None
+
+def cgroup_limit():
+    """The memory limit of this process's cgroup (v2, then v1), or None if there is none."""
+    for path in CGROUP_LIMITS:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:  # v1 reports "no limit" as a huge number
+            return int(value)
+    return None
+
+def count_rows(input_csv):
+    """Data rows estimated from the line count (quoted line breaks count as extra rows)."""
+    import compressed_io
+
+    lines = 0
+    last = b"\n"
+    with compressed_io.open_binary(input_csv) as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    return max(0, lines + (last != b"\n") - 1)
+
+def peak_rss_bytes():
+    """Peak RSS of the process so far, from getrusage."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class MemoryBudget:
+    """
+    Use as a context manager around a run so the RSS is sampled; call plan() once the
+    sample has been measured.
+    """
+
+    def __init__(self, budget, interval=SAMPLE_INTERVAL):
+        self.budget = budget
+        self.interval = interval
+        self.rss = self.peak = rss_bytes()
+        self.chunk = MAX_CHUNK_ROWS
+        self.shrinks = 0
+        self.workers = None  # Output files written at once; None leaves the default
+        self.workers_reason = None
+        self.stream_excel = False
+        self.estimate = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.sample_loop, name="memory-budget", daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample_loop(self):
+        while not self.stopped.wait(self.interval):
+            self.rss = rss_bytes()
+            self.peak = max(self.peak, self.rss)
+
+    def plan(self, rows, columns, sample_rows, sample_peak, sample_errors, max_workers, summary_only=False):
+        """
+        Choose the Excel mode, writer count (at most max_workers) and chunk size for rows x
+        columns of data, from the tracemalloc peak (bytes) and error count of validating
+        sample_rows rows.
+        """
+        bytes_per_row = sample_peak / max(sample_rows, 1)
+        errors_per_row = sample_errors / max(sample_rows, 1)
+        baseline = rss_bytes()
+        projected = baseline + rows * bytes_per_row
+        excel_cells = rows * columns + (0 if summary_only else rows * errors_per_row * 4)
+        excel_bytes = excel_cells * EXCEL_CELL_BYTES
+        spare = self.budget * TARGET - projected
+        self.stream_excel = excel_bytes > spare
+        if not self.stream_excel:
+            spare -= excel_bytes
+        # Each writer formats one chunk at a time, so as many writers run as the spare memory
+        # holds chunks of at least MIN_CHUNK_ROWS rows; the chunks share what is left
+        writer_bytes = MIN_CHUNK_ROWS * max(bytes_per_row, 1)
+        fitting = int(spare // writer_bytes) if spare > 0 else 0
+        self.workers = max(1, min(max_workers, fitting))
+        if fitting == 0:
+            self.workers_reason = f"no spare memory for a {MIN_CHUNK_ROWS:,}-row chunk, so 1 writer"
+        elif fitting > max_workers:
+            self.workers_reason = (f"{format_size(spare)} spare holds {fitting:,} writers of {format_size(writer_bytes)}; "
+                                   f"capped at {max_workers} output files")
+        else:
+            self.workers_reason = f"{format_size(spare)} spare holds {fitting} writers of {format_size(writer_bytes)}"
+        chunk = int(spare / self.workers / max(bytes_per_row, 1)) if spare > 0 else 0
+        self.chunk = min(MAX_CHUNK_ROWS, max(MIN_CHUNK_ROWS, chunk))
+        self.estimate = {
+            "Sample Rows": sample_rows,
+            "Sample Peak Traced Bytes": sample_peak,
+            "Estimated Bytes Per Row": round(bytes_per_row),
+            "Estimated Rows": rows,
+            "Estimated Peak Bytes": round(projected + (0 if self.stream_excel else excel_bytes)),
+        }
+        return projected <= self.budget * TARGET
+
+    def chunk_rows(self):
+        """Rows for the next chunk, halved while the RSS is above SHRINK_AT of the budget."""
+        if self.rss > self.budget * SHRINK_AT and self.chunk > MIN_CHUNK_ROWS:
+            self.chunk = max(MIN_CHUNK_ROWS, self.chunk // 2)
+            self.shrinks += 1
+        return self.chunk
+
+    def report(self):
+        """The budget, plan and observed peak, as written to _VR.json."""
+        peak = max(self.peak, rss_bytes(), peak_rss_bytes())
+        return {
+            "Budget Bytes": self.budget,
+            **self.estimate,
+            "Streamed Excel": self.stream_excel,
+            "Artifact Workers": self.workers,
+            "Artifact Workers Reason": self.workers_reason,
+            "Chunk Rows": self.chunk,
+            "Chunk Shrinks": self.shrinks,
+            "Peak RSS Bytes": peak,
+            "Peak Within Budget": peak <= self.budget,
+        }
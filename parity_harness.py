@@ -0,0 +1,220 @@
+# parity_harness.py - Differential parity check of the optimized validation against the reference
+# Usage: python3 parity_harness.py [files...] [--rows N] [--generated-files G] [--fuzz-files K] [--seed S] [--keep DIR]
+# Builds a corpus of generated subscriber files (benchmark.py's generator) and fuzzed files
+# (random edge-case values and mutations), plus any files given, and validates each one
+# with the frozen reference (reference_validator.py) and with rules.validate_columns. It
+# diffs the _Errors.csv content, the flagged-cell map (which message won each cell) and the
+# summary counts, and prints both paths' throughput side by side. Exits 1 on any difference;
+# with --keep the corpus is kept so a failing file can be replayed.
+# Rules added after the reference was frozen have no reference counterpart and are left out
+# of the optimized plan here (UNREFERENCED_RULES).
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+from benchmark import HEADER, generate_subscriber_csv
+
+UNREFERENCED_RULES = ["lat.stacked_location", "address.duplicate_location", "zip.state"]
+MAX_DIFFS_SHOWN = 5
+
+# Edge-case values per column for the fuzzed files
+FUZZ_VALUES = {
+    "customer": ["C1", "C1", "C,2", " C3 ", "", "c1", "C 4"],
+    "lat": ["90", "-90", "90.000001", "-90.0001", "nan", "NaN", "inf", "-inf", "1e1", " 35.5 ", "35,5", "abc", "", "0x1A", "1_0"],
+    "lon": ["-97.5", "97.5", "144.8", "145.5", "-0", "0", "nan", "-inf", "-1e2", "", " -100 ", "--100", "-124.409591", "-66.949895"],
+    "address": [
+        "123 Main St", "123 Main St.", "123 Main St N", "123 Main St Apt 4", "Main St", "12 County Road 45",
+        "12 County Rd 5 N", "55 Farm to Market Road 1960 W", "100 US Hwy 287 S", "3 FM 1960 Rd", "5 I-35",
+        "9 TX-130", "12 Kamehameha Hwy", "1 Co Rd 12 Apt 4", "10 St St", "7 Route 66", "8 Route AB", "42 Broadway",
+        "PO Box 12", "P.O. Box 7", "Post Office Box 9", "po box 3", "RR 2 Box 14", "RR 2 Box 14 #3", "Rural Route 1 Box 2",
+        "HC 3 Box 44", "R.R. 4 Box 1", "void _Diamond", "12 void  _upload St", "10 Elm Street!", "10 Elm <Street>",
+        "1 Oak Ave, Unit 2", "1 Oak Ave\nUnit 2", "1 Élm St", "1 Elm St", "1\tElm St", "", "   ",
+        "1 " + " " * 40 + "St", "1 Main St" + " " * 20 + "x", "12 County Road 45 Ste 100", "Private Road 7",
+    ],
+    "city": ["Dallas", "Dallas 2", "", "St. Louis", "O'Fallon", "  Tulsa  ", "Él Paso"],
+    "state": ["TX", "tx", " Tx ", "GU", "MP", "XX", "", "T X", "Texas"],
+    "zip": ["75201", "75201-1234", "7520", "752011", "75201-", "00000", "", " 75201 ", "75201-12345", "abcde"],
+    "download": ["100", "0", "-1", "3000", "3000.0001", "1e3", "nan", "inf", "", " 50 ", "fast", "+5", "0.0"],
+    "upload": ["20", "0", "-0", "3001", "1e4", "NaN", "", "1,000", "20 "],
+    "voip_lines_quantity": ["0", "1", "-1", "1.0", "1.5", "1e2", "", " 2 ", "+3", "two", "-0"],
+    "business_customer": ["0", "1", "2", "01", " 1", "yes", "", "1.0"],
+    "technology": ["fiber", "FIBER", "Cable", "wireless_unlicensed", "wireless_unlicensed ", "5g", "", "dsl\n"],
+}
+FUZZ_CHARS = list("!@#$%^&*()+={}[]|\"'?/:;<,>-.,0123456789 \t") + ["é", "\u00a0", "\u200b", "\n"]
+
+def fuzz_value(rng, value):
+    """Randomly mutate one field value."""
+    choice = rng.random()
+    if choice < 0.3:
+        position = rng.randrange(len(value) + 1)
+        return value[:position] + rng.choice(FUZZ_CHARS) + value[position:]
+    if choice < 0.45:
+        return value.swapcase()
+    if choice < 0.6:
+        return rng.choice([" ", "\t", "  "]) + value + rng.choice(["", " ", "  "])
+    if choice < 0.75 and value:
+        return value[:rng.randrange(len(value))]
+    if choice < 0.9:
+        return value * 2
+    return ""
+
+def generate_fuzzed_csv(path, rows, seed=0):
+    """Write a subscriber file mixing edge-case values and random mutations of them."""
+    import csv
+
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            row = []
+            for col in HEADER:
+                value = rng.choice(FUZZ_VALUES[col]) if rng.random() < 0.6 else generated_value(rng, col, i)
+                if rng.random() < 0.15:
+                    value = fuzz_value(rng, value)
+                row.append(value)
+            writer.writerow(row)
+
+def generated_value(rng, col, i):
+    if col == "customer":
+        return f"F{i}"
+    if col in ("lat", "lon"):
+        return f"{rng.uniform(25, 48):.6f}" if col == "lat" else f"{rng.uniform(-124, -67):.6f}"
+    return rng.choice(FUZZ_VALUES[col])
+
+def read_cleaned(path, dtype):
+    """pd.read_csv with dtype, OrigRowNum inserted and columns mapped as vs4.py does (Steps 3-6)."""
+    import pandas as pd
+
+    df = pd.read_csv(path, dtype=dtype)
+    df.insert(0, "OrigRowNum", range(1, len(df) + 1))
+    column_mapping = {col: col.lower() for col in df.columns if col.lower() in HEADER}
+    column_mapping["OrigRowNum"] = "OrigRowNum"
+    return df[list(column_mapping.keys())].rename(columns=column_mapping)[["OrigRowNum"] + HEADER]
+
+def summary_counts(errors, flagged_cells):
+    counts = {
+        "Total Errors": len(errors),
+        "Failed Rows": len(set(row_idx for (row_idx, col_name) in flagged_cells)),
+        "Flagged Cells": len(flagged_cells),
+    }
+    for error in errors:
+        key = f"Errors in {error['Column']}"
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+def diff_results(reference, optimized):
+    """Differences between two (errors, flagged_cells) results, as readable lines."""
+    from vs4 import sorted_errors_df
+
+    diffs = []
+    (ref_errors, ref_flagged), (opt_errors, opt_flagged) = reference, optimized
+    ref_csv = sorted_errors_df(ref_errors).to_csv(index=False).splitlines()
+    opt_csv = sorted_errors_df(opt_errors).to_csv(index=False).splitlines()
+    if ref_csv != opt_csv:
+        from collections import Counter
+
+        # Compare lines as multisets: one missing error reorders many lines after the sort
+        only_ref = list((Counter(ref_csv) - Counter(opt_csv)).elements())
+        only_opt = list((Counter(opt_csv) - Counter(ref_csv)).elements())
+        if only_ref or only_opt:
+            diffs.append(f"_Errors.csv differs: {len(only_ref)} lines only in reference, {len(only_opt)} only in optimized")
+            diffs += [f"  - {line}" for line in only_ref[:MAX_DIFFS_SHOWN]]
+            diffs += [f"  + {line}" for line in only_opt[:MAX_DIFFS_SHOWN]]
+        else:
+            diffs.append("_Errors.csv has the same lines in a different order")
+    ref_cells = {(int(row_idx), col): message for (row_idx, col), message in ref_flagged.items()}
+    opt_cells = {(int(row_idx), col): message for (row_idx, col), message in opt_flagged.items()}
+    if ref_cells != opt_cells:
+        cells = sorted(set(ref_cells) | set(opt_cells), key=lambda cell: (cell[0], HEADER.index(cell[1])))
+        changed = [cell for cell in cells if ref_cells.get(cell) != opt_cells.get(cell)]
+        diffs.append(f"Flagged cells differ ({len(changed)} cells)")
+        diffs += [f"  row {row_idx} {col}: reference {ref_cells.get((row_idx, col))!r}, optimized {opt_cells.get((row_idx, col))!r}"
+                  for row_idx, col in changed[:MAX_DIFFS_SHOWN]]
+    ref_counts, opt_counts = summary_counts(*reference), summary_counts(*optimized)
+    for key in sorted(set(ref_counts) | set(opt_counts)):
+        if ref_counts.get(key, 0) != opt_counts.get(key, 0):
+            diffs.append(f"Summary {key}: reference {ref_counts.get(key, 0)}, optimized {opt_counts.get(key, 0)}")
+    return diffs
+
+def check_file(path, plan):
+    """Validate path both ways; returns (rows, reference seconds, optimized seconds, diffs)."""
+    from cell_flags import FlaggedCells
+    from reference_validator import reference_validate
+    from rules import validate_columns
+    from vs4 import ingest_dtypes, read_header
+
+    # Blank cells go to the reference as "" rather than NaN. Its lon check calls .strip() on
+    # the raw state cell and raised on a blank state; every other check fills NaN with "".
+    ref_df = read_cleaned(path, str).fillna("")
+    ref_errors = []
+    start = time.perf_counter()
+    ref_flagged = reference_validate(ref_df, ref_errors)
+    ref_seconds = time.perf_counter() - start
+
+    opt_df = read_cleaned(path, ingest_dtypes(read_header(path)))
+    opt_errors, opt_flagged = [], FlaggedCells(len(opt_df), HEADER)
+    start = time.perf_counter()
+    validate_columns(opt_df, opt_errors, opt_flagged, plan, {})
+    opt_seconds = time.perf_counter() - start
+
+    return len(ref_df), ref_seconds, opt_seconds, diff_results((ref_errors, ref_flagged), (opt_errors, opt_flagged))
+
+def main():
+    parser = argparse.ArgumentParser(usage="python3 parity_harness.py [files...] [options]")
+    parser.add_argument("files", nargs="*", help="Extra subscriber CSVs to check")
+    parser.add_argument("--rows", type=int, default=20000, help="Rows per generated and fuzzed file (default 20000)")
+    parser.add_argument("--generated-files", type=int, default=2, help="Generated files in the corpus (default 2)")
+    parser.add_argument("--fuzz-files", type=int, default=4, help="Fuzzed files in the corpus (default 4)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first corpus file")
+    parser.add_argument("--keep", metavar="DIR", help="Write the corpus to DIR and keep it")
+    args = parser.parse_args()
+
+    import warnings
+
+    from rules import RULES, compile_plan
+
+    # The reference's str.contains patterns have capture groups, which pandas warns about
+    warnings.filterwarnings("ignore", "This pattern is interpreted as a regular expression")
+    plan = compile_plan([rule for rule in RULES if rule["id"] not in UNREFERENCED_RULES])
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="vs4_parity_")
+    os.makedirs(workdir, exist_ok=True)
+    corpus = list(args.files)
+    try:
+        for i in range(args.generated_files):
+            path = os.path.join(workdir, f"generated_{args.seed + i}.csv")
+            generate_subscriber_csv(path, args.rows, seed=args.seed + i)
+            corpus.append(path)
+        for i in range(args.fuzz_files):
+            path = os.path.join(workdir, f"fuzzed_{args.seed + i}.csv")
+            generate_fuzzed_csv(path, args.rows, seed=args.seed + i)
+            corpus.append(path)
+
+        print(f"{'File':<32} {'Rows':>9} {'Reference rows/s':>17} {'Optimized rows/s':>17} {'Speedup':>8}  Parity")
+        total_rows = total_ref = total_opt = 0
+        failed = 0
+        for path in corpus:
+            rows, ref_seconds, opt_seconds, diffs = check_file(path, plan)
+            total_rows, total_ref, total_opt = total_rows + rows, total_ref + ref_seconds, total_opt + opt_seconds
+            failed += bool(diffs)
+            print(f"{os.path.basename(path):<32} {rows:>9} {rows / ref_seconds:>17,.0f} {rows / opt_seconds:>17,.0f} "
+                  f"{ref_seconds / opt_seconds:>7.1f}x  {'DIFF' if diffs else 'OK'}")
+            for line in diffs:
+                print(f"    {line}")
+        print(f"{'Total':<32} {total_rows:>9} {total_rows / total_ref:>17,.0f} {total_rows / total_opt:>17,.0f} "
+              f"{total_ref / total_opt:>7.1f}x  {f'{failed} of {len(corpus)} files differ' if failed else 'OK'}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# progress.py - Progress and throughput telemetry for long validation runs
+# The run tells a Progress object its phase, the column being validated and how many rows
+# of it are done; those calls only set attributes. A background thread wakes every
+# `interval` seconds to print one status line to stderr (phase/column, rows, rows/s, ETA,
+# running error counts per rule, RSS) and, when a metrics path is given, to rewrite a
+# Prometheus text-exposition file that a local scraper can read. Row loops report once per
+# BLOCK_ROWS rows, so the cost to the run is far below 1%.
+import os
+import sys
+import threading
+import time
+
+BLOCK_ROWS = 65536  # Rows between progress updates in row loops
+METRICS_INTERVAL = 10.0  # Seconds between metrics file updates when status lines are off
+
+def rss_bytes():
+    """Current resident set size (Linux /proc), else the peak RSS from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Progress:
+    """
+    Use as a context manager around a run. interval is the seconds between stderr status
+    lines, 0 for none; with metrics_path the metrics file is still rewritten every
+    METRICS_INTERVAL seconds.
+    """
+
+    def __init__(self, interval=10.0, metrics_path=None, company_id="", stream=None):
+        self.print_lines = bool(interval)
+        self.interval = interval or (METRICS_INTERVAL if metrics_path else 0)
+        self.metrics_path = metrics_path
+        self.company_id = company_id
+        self.stream = stream or sys.stderr
+        self.started = self.phase_started = time.monotonic()
+        self.phase = "start"
+        self.column = None
+        self.total_rows = 0
+        self.columns = 0  # Columns to validate
+        self.columns_done = 0
+        self.rows_done = 0  # Rows done in the current column
+        self.validated_rows = 0  # Rows validated once validation has finished
+        self.rule_errors = {}  # Rule id -> errors found so far
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        if self.interval:
+            self.thread = threading.Thread(target=self.report_loop, name="progress", daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.set_phase("done" if exc_info[0] is None else "stopped")
+            self.emit()
+
+    def report_loop(self):
+        while not self.stopped.wait(self.interval):
+            self.emit()
+
+    def set_phase(self, phase, total_rows=None, columns=None):
+        if self.phase == "validate":
+            self.validated_rows = self.total_rows
+        if total_rows is not None:
+            self.total_rows = total_rows
+        if columns is not None:
+            self.columns = columns
+        self.columns_done = 0
+        self.rows_done = 0
+        self.column = None
+        self.phase_started = time.monotonic()
+        self.phase = phase
+
+    def start_column(self, column):
+        if self.column is not None:
+            self.columns_done += 1
+        self.rows_done = 0
+        self.column = column
+
+    def advance(self, rows_done):
+        """rows_done rows of the current column are finished."""
+        self.rows_done = rows_done
+
+    def add_errors(self, rule_id, count):
+        if count:
+            self.rule_errors[rule_id] = self.rule_errors.get(rule_id, 0) + count
+
+    def snapshot(self):
+        """
+        Current figures. While validating, rows done and rows/s count row-column work in
+        whole-file passes (all columns of a row = one row), so the ETA covers every column.
+        """
+        now = time.monotonic()
+        elapsed = now - self.phase_started
+        rows_done, rows_per_second, eta = self.validated_rows, 0.0, None
+        if self.phase == "validate" and self.columns:
+            work_done = self.columns_done * self.total_rows + self.rows_done
+            total_work = self.columns * self.total_rows
+            rows_done = work_done // self.columns
+            if elapsed > 0:
+                rows_per_second = work_done / self.columns / elapsed
+            if work_done and total_work > work_done:
+                eta = (total_work - work_done) * elapsed / work_done
+        rule_errors = dict(self.rule_errors)  # The run may add rules while this thread reads
+        return {
+            "phase": self.phase,
+            "column": self.column,
+            "rows_done": rows_done,
+            "rows_per_second": rows_per_second,
+            "eta_seconds": eta,
+            "rule_errors": rule_errors,
+            "errors": sum(rule_errors.values()),
+            "rss_bytes": rss_bytes(),
+            "elapsed_seconds": now - self.started,
+        }
+
+    def status_line(self, stats):
+        where = stats["phase"]
+        if stats["column"] is not None:
+            where += f" {stats['column']} ({self.columns_done + 1}/{self.columns} columns)"
+        line = f"[vs4 {format_duration(stats['elapsed_seconds'])}] {where}: "
+        if stats["phase"] == "validate":
+            line += f"{stats['rows_done']:,}/{self.total_rows:,} rows validated"
+        else:
+            line += f"{self.total_rows:,} rows" if self.total_rows else "reading rows"
+        if stats["rows_per_second"]:
+            line += f", {stats['rows_per_second']:,.0f} rows/s"
+        if stats["eta_seconds"] is not None:
+            line += f", ETA {format_duration(stats['eta_seconds'])}"
+        line += f", {stats['errors']:,} errors"
+        top = sorted(stats["rule_errors"].items(), key=lambda item: -item[1])[:3]
+        if top:
+            line += " (" + ", ".join(f"{rule_id} {count:,}" for rule_id, count in top) + ")"
+        return line + f", RSS {stats['rss_bytes'] / 1e6:,.0f} MB"
+
+    def emit(self):
+        stats = self.snapshot()
+        if self.print_lines:
+            print(self.status_line(stats), file=self.stream, flush=True)
+        if self.metrics_path:
+            self.write_metrics(stats)
+
+    def write_metrics(self, stats):
+        """Atomically rewrite metrics_path in Prometheus text exposition format."""
+        labels = f'company_id="{escape_label(self.company_id)}"'
+        lines = [
+            "# HELP vs4_phase_info Current phase and column of the run (value is always 1).",
+            "# TYPE vs4_phase_info gauge",
+            f'vs4_phase_info{{{labels},phase="{escape_label(stats["phase"])}",column="{escape_label(stats["column"] or "")}"}} 1',
+        ]
+        gauges = [
+            ("vs4_rows_total", "Data rows in the input file.", self.total_rows),
+            ("vs4_rows_done", "Rows validated so far, in whole-file passes.", stats["rows_done"]),
+            ("vs4_rows_per_second", "Validation throughput.", stats["rows_per_second"]),
+            ("vs4_eta_seconds", "Estimated seconds until validation finishes, -1 when unknown.",
+             -1 if stats["eta_seconds"] is None else stats["eta_seconds"]),
+            ("vs4_resident_memory_bytes", "Resident set size of the process.", stats["rss_bytes"]),
+            ("vs4_elapsed_seconds", "Seconds since the run started.", stats["elapsed_seconds"]),
+        ]
+        for name, help_text, value in gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name}{{{labels}}} {value}"]
+        lines += ["# HELP vs4_rule_errors_total Errors found so far per rule.", "# TYPE vs4_rule_errors_total counter"]
+        for rule_id, count in sorted(stats["rule_errors"].items()):
+            lines.append(f'vs4_rule_errors_total{{{labels},rule="{escape_label(rule_id)}"}} {count}')
+        temp_path = f"{self.metrics_path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.metrics_path)
@@ -0,0 +1,94 @@
+# regex_backend.py - Pluggable regex engine for the address rules
+# "re" (the standard library) is the default; "re2" is Google's linear-time RE2 engine
+# (pip install google-re2), selected with set_backend() or $VS4_REGEX_BACKEND when it is
+# installed. compile() returns an object with the search/match/finditer methods the rules
+# use, whichever engine runs underneath.
+#
+# Compatibility layer for RE2:
+# - atomic() groups and the (?<!\s) run anchor only stop re from backtracking; the address
+#   patterns use them where the plain form matches the same text, so RE2 is given the
+#   plain form.
+# - Patterns that still need backtracking features (lookaround, backreferences) stay on re.
+# - RE2 treats \s, \d, \w and \b as ASCII and $ as the very end of the text. Values holding
+#   non-ASCII characters, newlines or the separators Python counts as whitespace (\v,
+#   \x1c-\x1f) are matched with re, so every value gets exactly the result re would give.
+import os
+import re
+
+BACKENDS = ("re", "re2")
+PRUNING_REWRITES = [(r"(?<!\s)", "")]
+ATOMIC_GROUP = re.compile(r"\(\?=\(\?P<(\w+)>(.*?)\)\)\(\?-i:\(\?P=\1\)\)")  # What atomic() returns
+RE2_UNSUPPORTED = re.compile(r"\(\?[=!]|\(\?<[=!]|\\[1-9]|\(\?P=")
+RE2_UNSAFE_TEXT = re.compile(r"[^\x00-\x7f]|[\n\x0b\x1c-\x1f]")
+
+_backend = None
+
+def available_backends():
+    from importlib.util import find_spec
+
+    return ["re"] + (["re2"] if find_spec("re2") else [])
+
+def set_backend(name):
+    """Select the engine for patterns compiled from now on ("re" or "re2")."""
+    global _backend
+    if name not in available_backends():
+        raise ValueError(f"Regex backend {name!r} is not available; choose from {available_backends()}")
+    _backend = name
+
+def get_backend():
+    """The selected engine: set_backend(), else $VS4_REGEX_BACKEND, else "re"."""
+    if _backend is None:
+        set_backend(os.environ.get("VS4_REGEX_BACKEND") or "re")
+    return _backend
+
+class DualPattern:
+    """An RE2 pattern with its re equivalent for the values RE2 would treat differently."""
+
+    def __init__(self, fast, exact):
+        self.fast = fast
+        self.exact = exact
+        self.pattern = exact.pattern
+
+    def engine(self, text):
+        return self.exact if RE2_UNSAFE_TEXT.search(text) else self.fast
+
+    def search(self, text):
+        return self.engine(text).search(text)
+
+    def match(self, text):
+        return self.engine(text).match(text)
+
+    def finditer(self, text):
+        return self.engine(text).finditer(text)
+
+def atomic(name, pattern):
+    """
+    pattern as an atomic group that re runs on Python 3.8 (the (?>...) syntax needs 3.11):
+    the lookahead captures what pattern matches first and the backreference consumes
+    exactly that, so a later failure never backtracks into it. The backreference compares
+    case-sensitively, which is exact (it repeats the captured text) and much faster under
+    re.IGNORECASE. name must be unique within the enclosing pattern; the group it adds is
+    numbered after any group before it.
+    """
+    return f"(?=(?P<{name}>{pattern}))(?-i:(?P={name}))"
+
+def re2_form(pattern):
+    """pattern rewritten for RE2, or None when it needs a feature RE2 does not have."""
+    pattern = ATOMIC_GROUP.sub(r"(?:\2)", pattern)
+    for construct, plain in PRUNING_REWRITES:
+        pattern = pattern.replace(construct, plain)
+    return None if RE2_UNSUPPORTED.search(pattern) else pattern
+
+def compile(pattern, flags=0):
+    """Compile pattern on the selected backend. Only re.IGNORECASE is supported with re2."""
+    exact = re.compile(pattern, flags)
+    if get_backend() == "re" or flags & ~re.IGNORECASE:
+        return exact
+    translated = re2_form(pattern)
+    if translated is None:
+        return exact
+    import re2
+
+    if flags & re.IGNORECASE:
+        translated = f"(?i){translated}"
+    return DualPattern(re2.compile(translated), exact)
@@ -0,0 +1,104 @@
+# row_index.py - OrigRowNum -> byte offset index into the preserved copy of an input file
+# The index is a uint64 .npy array: entry i - 1 is the offset of data row i (OrigRowNum i)
+# and the last entry is the file size, so a raw line is a slice of a memory-mapped file.
+# Offsets are found with NumPy over fixed-size binary chunks: a newline ends a record when
+# an even number of quote characters precede it. A stray quote inside an unquoted field
+# breaks that rule, as do files whose lines end in a bare "\r", so when the row count
+# disagrees with pandas the index is rebuilt with the csv module, which splits records
+# exactly as pd.read_csv does.
+import csv
+import mmap
+import os
+
+CHUNK_SIZE = 16 * 1024 * 1024  # Bytes per NumPy pass
+
+def record_offsets(path):
+    """Start offset of every non-blank record (header first), then the file size; quote-aware."""
+    import numpy as np
+
+    starts = []
+    parity = 0  # Quote characters seen so far, mod 2
+    position = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            data = np.frombuffer(chunk, dtype=np.uint8)
+            # uint8 cumsum wraps at 256, which keeps the parity bit
+            quotes = np.cumsum(data == ord('"'), dtype=np.uint8) + np.uint8(parity)
+            newlines = np.flatnonzero((data == ord("\n")) & (quotes % 2 == 0))
+            starts.append(newlines.astype(np.uint64) + np.uint64(position + 1))
+            parity = int(quotes[-1]) % 2
+            position += len(chunk)
+    starts = np.concatenate([np.zeros(1, dtype=np.uint64)] + starts)
+    ends = np.append(starts[1:], np.uint64(position))
+    return drop_blank(path, starts, ends, position)
+
+def drop_blank(path, starts, ends, size):
+    """Keep records that hold more than a line ending (pd.read_csv skips blank lines)."""
+    import numpy as np
+
+    with open(path, "rb") as f:
+        if size == 0:
+            return np.zeros(1, dtype=np.uint64)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lengths = (ends - starts).astype(np.int64)
+            short = np.flatnonzero(lengths <= 2)  # Only these can be "\n" or "\r\n"
+            blank = np.zeros(len(starts), dtype=bool)
+            for i in short.tolist():
+                blank[i] = not mm[int(starts[i]):int(ends[i])].strip(b"\r\n")
+    return np.append(starts[~blank], np.uint64(size))
+
+def exact_offsets(path):
+    """record_offsets() using the csv module to split records; slower but exact."""
+    import numpy as np
+
+    starts = []
+    pending = []  # Offset of the first line of the record being read
+
+    # Lines end at "\n", "\r\n" or a bare "\r", as for pd.read_csv. Latin-1 maps each byte
+    # to one character, so line lengths are byte counts; UTF-8 text splits the same way.
+    with open(path, encoding="latin-1", newline="") as f:
+        def lines():
+            position = 0
+            for line in f:
+                if not pending:
+                    pending.append(position)
+                position += len(line)
+                yield line
+
+        for record in csv.reader(lines()):
+            if record:
+                starts.append(pending[0])
+            pending.clear()
+    return np.array(starts + [os.path.getsize(path)], dtype=np.uint64)
+
+def build_row_index(path, index_path, expected_rows=None):
+    """
+    Write the row index for the CSV at path to index_path (.npy) and return the number of
+    data rows it holds. expected_rows is the row count pandas read; on a mismatch the exact
+    csv-module pass is used instead.
+    """
+    import numpy as np
+
+    offsets = record_offsets(path)[1:]  # Drop the header record
+    if expected_rows is not None and len(offsets) - 1 != expected_rows:
+        offsets = exact_offsets(path)[1:]
+    np.save(index_path, offsets)
+    return len(offsets) - 1
+
+def raw_lines(path, index_path, rows):
+    """
+    Raw text of the given OrigRowNums (1-based) from the file at path, without line endings.
+    Each row is one index lookup and one slice of the memory-mapped file.
+    """
+    import numpy as np
+
+    offsets = np.load(index_path, mmap_mode="r")
+    lines = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for row in rows:
+            start, end = int(offsets[row - 1]), int(offsets[row])
+            lines.append(mm[start:end].rstrip(b"\r\n").decode("utf-8", errors="replace"))
+    return lines
@@ -0,0 +1,691 @@
+# rules.py - Shared column rules for vs4.py and vs_part3.py
+# Rules are declared as data in RULES and compiled once into a per-column execution
+# plan. Every row-level check on a column runs in a single pass over that column's
+# normalized values, and errors are emitted in rule order so reports are unchanged.
+import re
+
+import regex_backend
+
+# Configuration from validate_subscribers.py
+VALID_STATES = ["AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "FL", "GA", "HI", "ID", "IL", "IN", "IA", "KS", "KY", "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY", "NC", "ND", "OH", "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY", "DC", "PR", "VI", "GU", "AS", "MP"]
+VALID_TECHNOLOGIES = ["fiber", "cable", "dsl", "wireless_licensed", "wireless_unlicensed", "copper"]
+EXPECTED_COLUMNS = ["customer", "lat", "lon", "address", "city", "state", "zip", "download", "upload", "voip_lines_quantity", "business_customer", "technology"]
+# Low-cardinality columns loaded as pandas "category" to save memory; their value-only checks run once
+# per distinct value
+CATEGORICAL_COLUMNS = ["city", "state", "zip", "business_customer", "technology"]
+
+# Street endings and patterns
+MULTI_WORD_ENDINGS = (
+    r"\bUS Highway\b|\bUS Hwy\b|\bPrivate Road\b|\bCounty Road\b|\bCounty Rd\b|\bCo Rd\b|\bState Route\b|"
+    r"\bFarm to Market\b|\bCounty Hwy \d+\b|\bCounty FM \d+\b|\bFM Road \d+\b|"
+    r"\bFire District \d+ Rd\b|\bState Hwy \d+\b|\bKamehameha Hwy\b|\bMamalahoa Hwy\b|"
+    r"\bRoute C-\d+\b|\bRoute [A-Z]{2}\b|\b[A-Z]{2} Road\b|\bRS \d+\b|\bKY RS \d+\b"
+)
+SINGLE_WORD_ENDINGS = (
+    r"\bAlley\b|\bALY\b|\bAvenue\b|\bAve\b|\bAv\b|\bBoulevard\b|\bBlvd\b|\bCircle\b|\bCir\b|\bCr\b|"
+    r"\bCourt\b|\bCt\b|\bDrive\b|\bDr\b|\bExpressway\b|\bExpy\b|\bFM\b|\bHighway\b|\bHwy\b|"
+    r"\bLane\b|\bLn\b|\bLoop\b|\bParkway\b|\bPkwy\b|\bPlace\b|\bPl\b|\bRoad\b|\bRd\b|\bRoute\b|\bRte\b|\bRt\b|\bSquare\b|"
+    r"\bSq\b|\bStreet\b|\bSt\b|\bTerrace\b|\bTer\b|\bTrail\b|\bTrl\b|\bTurnpike\b|\bTpke\b|\bWay\b|\bWy\b|"
+    r"\bCR\b|\bSR\b|\bFM\b|\bUS\b|\bInterstate\b|\bI-\b|"
+    r"\bAZ-\d+\b|\bCA-\d+\b|\bCT-\d+\b|\bDE-\d+\b|\bFL-\d+\b|\bGA-\d+\b|\bID-\d+\b|"
+    r"\bIL-\d+\b|\bIN-\d+\b|\bK-\d+\b|\bME-\d+\b|\bMD-\d+\b|\bMA-\d+\b|\bM-\d+\b|"
+    r"\bMN-\d+\b|\bMS-\d+\b|\bNH-\d+\b|\bNJ-\d+\b|\bNM-\d+\b|\bNY-\d+\b|\bNC-\d+\b|"
+    r"\bOH-\d+\b|\bOK-\d+\b|\bOR-\d+\b|\bPA-\d+\b|\bRI-\d+\b|\bSC-\d+\b|\bTN-\d+\b|"
+    r"\bUT-\d+\b|\bVT-\d+\b|\bVA-\d+\b|\bWA-\d+\b|\bWV-\d+\b|\bWI-\d+\b|\bWY-\d+\b|"
+    r"\bSH-\d+\b|\bC-\d+\b|\bCarr \d+\b|\bRoute \d+\b|\bCH \d+\b"
+)
+SPECIFIC_ROAD_PATTERN = r"(?i)(?:\d+\s+)?(?:County\s*(?:Road|Rd|CR)|Private\s*Road|Us\s*Hwy|Farm\s*to\s*Market|Farm\s*Road|Farm\s*to\s*Market\s*Road|FM\s*Rd|State\s*(?:Road|Rd|Route)|Old\s*State\s*(?:Road|Rd)|" \
+                        r"(?:AL|AK|AZ|AR|CA|CO|CT|DE|FL|GA|HI|ID|IL|IN|IA|KS|KY|LA|ME|MD|MA|MI|MN|MS|MO|MT|NE|NV|NH|NJ|NM|NY|NC|ND|OH|OK|OR|PA|RI|SC|SD|TN|TX|UT|VT|VA|WA|WV|WI|WY|DC|PR|VI|GU|AS|MP)-\d+|" \
+                        r"(?:Alabama|Alaska|Arizona|Arkansas|California|Colorado|Connecticut|Delaware|Florida|Georgia|Hawaii|Idaho|Illinois|Indiana|Iowa|Kansas|Kentucky|Louisiana|Maine|Maryland|Massachusetts|Michigan|Minnesota|Mississippi|Missouri|Montana|Nebraska|Nevada|New\sHampshire|New\sJersey|New\sMexico|New\sYork|North\sCarolina|North\sDakota|Ohio|Oklahoma|Oregon|Pennsylvania|Rhode\sIsland|South\sCarolina|South\sDakota|Tennessee|Texas|Utah|Vermont|Virginia|Washington|West\sVirginia|Wisconsin|Wyoming|District\sof\sColumbia|Puerto\sRico|Virgin\sIslands|Guam|American\sSamoa|Northern\sMariana\sIslands)\s*(?:Hwy|Highway|Route|Rte|Rt)\s*\d+)\s*(?:\d+(?:\s*(?:North|South|East|West|Northeast|Northwest|Southeast|Southwest|N|S|E|W|NE|NW|SE|SW))?)?\b"
+STREET_ENDINGS = f"({MULTI_WORD_ENDINGS})|({SINGLE_WORD_ENDINGS})"
+PO_BOX = r"\bPO Box\b|\bP\.O\. Box\b|\bPost Office Box\b"
+RURAL_ROUTES = r"\bRR \d+ Box \d+\b|\bRural Route \d+ Box \d+\b|\bR\.R\. \d+ Box \d+\b|\bHC \d+ Box \d+\b"
+FORBIDDEN_CHARS = r'[!@#$%^&*()+={}[\]|\"\'?/:;<,>]'
+
+STATE_LON_RANGES = {
+    "AL": (-88.473227, -84.889080), "AK": (-179.148909, 179.778470), "AZ": (-114.816510, -109.045223),
+    "AR": (-94.617919, -89.644395), "CA": (-124.409591, -114.131211), "CO": (-109.060253, -102.041524),
+    "CT": (-73.727775, -71.786994), "DE": (-75.788658, -75.048939), "FL": (-87.634896, -80.031056),
+    "GA": (-85.605165, -80.840141), "HI": (-178.334698, -154.806773), "ID": (-117.243027, -111.043564),
+    "IL": (-91.513079, -87.494756), "IN": (-88.097892, -84.787981), "IA": (-96.639704, -90.140061),
+    "KS": (-102.051744, -94.588413), "KY": (-89.571510, -81.964971), "LA": (-94.043147, -88.817017),
+    "ME": (-71.083924, -66.949895), "MD": (-79.487651, -75.048939), "MA": (-73.508142, -69.928393),
+    "MI": (-90.418136, -82.413474), "MN": (-97.239209, -89.483385), "MS": (-91.655009, -88.097892),
+    "MO": (-95.774704, -89.098843), "MT": (-116.050002, -104.039138), "NE": (-104.053514, -95.308290),
+    "NV": (-120.005746, -114.039648), "NH": (-72.557247, -70.610621), "NJ": (-75.559614, -73.893979),
+    "NM": (-109.050173, -103.001964), "NY": (-79.762152, -71.856214), "NC": (-84.321869, -75.460621),
+    "ND": (-104.048900, -96.554507), "OH": (-84.820159, -80.518693), "OK": (-103.002455, -94.430662),
+    "OR": (-124.566244, -116.463262), "PA": (-80.519891, -74.689516), "RI": (-71.886819, -71.120557),
+    "SC": (-83.353910, -78.541138), "SD": (-104.057698, -96.436589), "TN": (-90.310298, -81.646900),
+    "TX": (-106.645646, -93.508292), "UT": (-114.052998, -109.041058), "VT": (-73.437740, -71.464555),
+    "VA": (-83.675395, -75.242266), "WA": (-124.763068, -116.915989), "WV": (-82.644739, -77.719519),
+    "WI": (-92.889433, -86.763983), "WY": (-111.056888, -104.052160), "DC": (-77.119759, -76.909393),
+    "PR": (-67.945404, -65.220703), "VI": (-65.013029, -64.564907), "GU": (144.618068, 144.956706),
+    "AS": (-170.841600, -169.406622), "MP": (145.128345, 145.853700)
+}
+VOID_DIAMOND = r"void\s+_upload|void\s+_Diamond"
+ZIP_FORMAT = r"^\d{5}(-\d{4})?$"
+
+# Endings that may be followed by a route number or other component (see check_street_format)
+SPECIAL_ENDINGS = ["highway", "hwy", "county road", "county rd", "co rd", "state route", "sr",
+                   "interstate", "i-", "farm to market", "farm road", "fm", "us", "us hwy", "pvt", "private road",
+                   "county hwy", "ch", "county fm", "fm road", "fire district", "road", "rd",
+                   "route c-", "c-", "route", "rs", "ky rs", "state hwy",
+                   "az-", "ca-", "ct-", "de-", "fl-", "ga-", "id-", "il-", "in-", "k-",
+                   "me-", "md-", "ma-", "m-", "mn-", "ms-", "nh-", "nj-", "nm-", "ny-",
+                   "nc-", "oh-", "ok-", "or-", "pa-", "ri-", "sc-", "tn-", "ut-", "vt-",
+                   "va-", "wa-", "wv-", "wi-", "wy-", "sh-", "carr", "pr", "cr"]
+SPECIAL_ENDING_PREFIXES = ("route ", "county hwy ", "county fm ", "fm road ", "fire district ", "state hwy ", "ky rs ")
+SPECIAL_ENDING_EXTRA = (
+    r"^(?:[0-9]+(?:\s+(?:N|S|E|W|NE|NW|SE|SW|North|South|East|West|Northeast|Northwest|Southeast|Southwest))?$|^[0-9]+$|"
+    r"[A-Za-z0-9\-]+(?:\s+(?:N|S|E|W|NE|NW|SE|SW|North|South|East|West|Northeast|Northwest|Southeast|Southwest))?|"
+    r"[A-Za-z0-9\-]+[NSEW]{1,2}|"
+    r"(?:Avenue|Ave|Av|Boulevard|Blvd|Circle|Cir|Cr|Court|Ct|Drive|Dr|Expressway|Expy|"
+    r"Highway|Hwy|Lane|Ln|Parkway|Pkwy|Place|Pl|Road|Rd|Square|Sq|Street|St|Terrace|Ter|"
+    r"Trail|Trl|Way|Wy|CR|SR|FM|US|Interstate|I-))$"
+)
+DIRECTIONAL_EXTRA = r"^(?:N|S|E|W|NE|NW|SE|SW|North|South|East|West|Northeast|Northwest|Southeast|Southwest|(?:N|S|E|W)\s+(?:N|S|E|W))$"
+
+BLANK_MESSAGE = "Blank or whitespace-only value"
+
+# Declarative rule table. Rules run per column in this order; when two rules flag the
+# same cell, the later rule's message is the one kept in flagged_cells (cell_flags.py).
+# "check" names a builder in CHECKS; the remaining keys are that builder's parameters.
+# "cross_row" marks rules whose result for a row depends on other rows; mapreduce.py runs
+# them once over the whole file instead of per byte range. "sections" names the report
+# sections a rule adds to details, so a partial run (select_rules) can replace them.
+RULES = [
+    {"id": "customer.comma", "column": "customer", "check": "search", "pattern": ",",
+     "message": "Customer ID contains a comma"},
+    {"id": "customer.duplicate", "column": "customer", "check": "duplicate", "cross_row": True,
+     "message": "Duplicate customer ID"},
+    {"id": "lat.coordinate", "column": "lat", "check": "coordinate"},
+    {"id": "lat.stacked_location", "column": "lat", "check": "stacked_location", "depends": ["lon", "address"],
+     "cross_row": True, "sections": ["Stacked Locations"], "cell_size": 0.0001, "threshold": 25, "top": 20},
+    {"id": "lon.coordinate", "column": "lon", "check": "coordinate", "depends": ["state"]},
+    {"id": "address.blank", "column": "address", "check": "blank", "message": BLANK_MESSAGE},
+    {"id": "address.po_box", "column": "address", "check": "address_screen", "category": "po_box",
+     "message": "Address must be a physical address, PO Boxes are not allowed"},
+    {"id": "address.rural_route", "column": "address", "check": "address_screen", "category": "rural_route"},
+    {"id": "address.forbidden_chars", "column": "address", "check": "address_screen", "category": "forbidden_chars"},
+    {"id": "address.void_diamond", "column": "address", "check": "address_screen", "category": "void_diamond",
+     "message": "Contains invalid void/_Diamond code block"},
+    {"id": "address.street_format", "column": "address", "check": "street_format"},
+    {"id": "address.duplicate_location", "column": "address", "check": "duplicate_location",
+     "depends": ["zip", "customer"], "cross_row": True},
+    {"id": "city.blank", "column": "city", "check": "blank", "message": BLANK_MESSAGE},
+    {"id": "city.digits", "column": "city", "check": "search", "pattern": r"[0-9]",
+     "message": "City name contains digits"},
+    {"id": "state.blank", "column": "state", "check": "blank", "message": BLANK_MESSAGE},
+    {"id": "state.valid", "column": "state", "check": "choices", "choices": VALID_STATES, "case": "upper", "skip_blank": False,
+     "message": f"Invalid state. Must be one of {VALID_STATES}"},
+    {"id": "zip.blank", "column": "zip", "check": "blank", "message": BLANK_MESSAGE},
+    {"id": "zip.format", "column": "zip", "check": "match", "pattern": ZIP_FORMAT,
+     "message": "Invalid ZIP code format. Must be 12345 or 12345-6789"},
+    {"id": "zip.state", "column": "zip", "check": "zip_state", "depends": ["state"]},
+    {"id": "download.blank", "column": "download", "check": "blank", "message": BLANK_MESSAGE},
+    {"id": "download.speed", "column": "download", "check": "speed"},
+    {"id": "upload.blank", "column": "upload", "check": "blank", "message": BLANK_MESSAGE},
+    {"id": "upload.speed", "column": "upload", "check": "speed"},
+    {"id": "voip_lines_quantity.blank", "column": "voip_lines_quantity", "check": "blank", "message": BLANK_MESSAGE},
+    {"id": "voip_lines_quantity.count", "column": "voip_lines_quantity", "check": "count"},
+    {"id": "business_customer.blank", "column": "business_customer", "check": "blank", "message": BLANK_MESSAGE},
+    {"id": "business_customer.valid", "column": "business_customer", "check": "choices", "choices": ["0", "1"],
+     "message": "Business customer must be 0 or 1"},
+    {"id": "technology.blank", "column": "technology", "check": "blank", "message": BLANK_MESSAGE},
+    {"id": "technology.valid", "column": "technology", "check": "choices", "choices": VALID_TECHNOLOGIES, "case": "lower",
+     "message": f"Invalid technology. Must be one of {VALID_TECHNOLOGIES}"},
+]
+
+def is_float(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+def is_integer(value):
+    try:
+        int(value)
+        return float(value).is_integer()
+    except ValueError:
+        return False
+
+# Check builders. Each takes a rule and returns either {"evaluate": f(val, idx, columns)},
+# called once per row with the normalized value and returning an error message or None,
+# or {"evaluate_column": f(values, columns, details)}, called with the whole normalized
+# Series and returning (row_idx, message) pairs. columns maps each dependency to its
+# normalized values: a list for "evaluate", a Series for "evaluate_column". details is a
+# per-run dict where column checks may leave extra report sections (see validate_columns).
+
+def build_blank(rule):
+    message = rule["message"]
+    return {"evaluate": lambda val, idx, columns: message if val == "" else None}
+
+def build_search(rule):
+    pattern = re.compile(rule["pattern"], re.IGNORECASE if rule.get("ignore_case") else 0)
+    message = rule["message"]
+    return {"evaluate": lambda val, idx, columns: message if pattern.search(val) else None}
+
+def build_match(rule):
+    pattern = re.compile(rule["pattern"])
+    message = rule["message"]
+    return {"evaluate": lambda val, idx, columns: message if val and not pattern.match(val) else None}
+
+def build_choices(rule):
+    choices = set(rule["choices"])
+    case = rule.get("case")
+    skip_blank = rule.get("skip_blank", True)
+    message = rule["message"]
+
+    def evaluate(val, idx, columns):
+        if skip_blank and not val:
+            return None
+        key = val.upper() if case == "upper" else val.lower() if case == "lower" else val
+        return None if key in choices else message
+    return {"evaluate": evaluate}
+
+def build_duplicate(rule):
+    message = rule["message"]
+
+    def evaluate_column(values, columns, details):
+        import pandas as pd
+        # Group duplicated values by first appearance, rows in file order within a group
+        positions = values.duplicated(keep=False).to_numpy().nonzero()[0]
+        codes, _ = pd.factorize(values.to_numpy()[positions])
+        return [(int(idx), message) for idx in positions[codes.argsort(kind="stable")]]
+    return {"evaluate_column": evaluate_column}
+
+def build_coordinate(rule):
+    col = rule["column"]
+
+    def evaluate(val, idx, columns):
+        if not val:
+            return None
+        if not is_float(val):
+            return f"{col.capitalize()} must be a number or blank"
+        float_val = float(val)
+        if col == "lat":
+            if not (-90 <= float_val <= 90):
+                return "Latitude must be between -90 and 90"
+            return None
+        state = columns["state"][idx].upper() if "state" in columns else ""
+        if state in STATE_LON_RANGES:
+            lon_min, lon_max = STATE_LON_RANGES[state]
+            if state in ["GU", "MP"]:
+                if not (lon_min <= float_val <= lon_max):
+                    return f"Longitude for {state} must be between {lon_min} and {lon_max}"
+            elif float_val > 0:
+                return f"Longitude for {state} must be negative"
+            elif not (lon_min <= float_val <= lon_max):
+                return f"Longitude for {state} must be between {lon_min} and {lon_max}"
+        return None
+    return {"evaluate": evaluate}
+
+# One scan screens an address for every category below. Each category is a lookahead, so
+# finditer reports the start of every category's matches without one consuming another's text.
+SCREEN_CATEGORIES = {"po_box": PO_BOX, "rural_route": RURAL_ROUTES, "void_diamond": VOID_DIAMOND}
+SCREEN_PATTERN = "|".join([f"(?=(?P<{name}>{pattern}))" for name, pattern in SCREEN_CATEGORIES.items()]
+                          + [f"(?P<forbidden_chars>{FORBIDDEN_CHARS})"])
+# Every screened category needs one of these; addresses without any are skipped
+SCREEN_PRECHECK = rf"{FORBIDDEN_CHARS}|box|void"
+SCREEN = re.compile(SCREEN_PATTERN, re.IGNORECASE)
+
+_screen_cache = (None, None)  # (weakref to the last screened column, its screening result)
+
+def screen_address(val):
+    """Every screening hit in one address as (category, position, matched text), in position order."""
+    return [(match.lastgroup, match.start(), match.group(match.lastgroup)) for match in SCREEN.finditer(val)]
+
+def screen_column(values):
+    """
+    Screen a normalized address column once per distinct value. Returns {category: {row_idx:
+    matched text}} holding the first hit of each category per row; the result is reused by
+    all the screening checks on the same column.
+    """
+    import weakref
+
+    import numpy as np
+    import pandas as pd
+
+    global _screen_cache
+    cached_values, cached_hits = _screen_cache
+    if cached_values is not None and cached_values() is values:
+        return cached_hits
+    codes, uniques = pd.factorize(values)
+    unique_hits = {category: {} for category in list(SCREEN_CATEGORIES) + ["forbidden_chars"]}
+    candidates = np.flatnonzero(pd.Series(uniques, dtype=object).str.contains(SCREEN_PRECHECK, case=False, regex=True).to_numpy(dtype=bool))
+    for code in candidates.tolist():
+        for category, _, text in screen_address(uniques[code]):
+            unique_hits[category].setdefault(code, text)
+    hits = {}
+    for category, by_code in unique_hits.items():
+        found = np.zeros(len(uniques) + 1, dtype=bool)  # Trailing False for NaN (code -1)
+        found[list(by_code)] = True
+        hits[category] = {idx: by_code[codes[idx]] for idx in np.flatnonzero(found[codes]).tolist()}
+    _screen_cache = (weakref.ref(values), hits)
+    return hits
+
+def build_address_screen(rule):
+    # address.po_box, address.rural_route, address.forbidden_chars and address.void_diamond
+    # share one screening pass. Rural route addresses are screened for forbidden characters
+    # as well as by address.forbidden_chars, so such rows report the character twice.
+    category = rule["category"]
+    message = rule.get("message")
+
+    def evaluate_column(values, columns, details):
+        hits = screen_column(values)
+        if category == "rural_route":
+            forbidden = hits["forbidden_chars"]
+            return [(idx, f"Address contains forbidden character: {forbidden[idx]}")
+                    for idx in hits["rural_route"] if idx in forbidden]
+        if category == "forbidden_chars":
+            return [(idx, f"Address contains forbidden character: {text}") for idx, text in hits[category].items()]
+        return [(idx, message) for idx in hits[category]]
+    return {"evaluate_column": evaluate_column}
+
+# Street ending patterns are "<whitespace><ending><tail>". Every ending starts with a word
+# character, so a match always starts where a whitespace run starts and takes all of it:
+# (?<!\s) keeps re from retrying every position of a long whitespace run, and giving back
+# part of the run fails at once. The tail can only match as its greedy first try, so it is
+# atomic and a failed $ (a newline inside the value) is not retried at every shorter tail
+# (quadratic on adversarial input). Its group is numbered after the ending's groups.
+ENDING_HEAD = r"(?<!\s)\s+"
+ENDING_TAIL = regex_backend.atomic("tail", r"\.?\s*(?:\S.*)?") + "$"
+
+def build_street_format(rule):
+    specific_road = regex_backend.compile(SPECIFIC_ROAD_PATTERN, re.IGNORECASE)
+    street_ending = regex_backend.compile(rf"{ENDING_HEAD}(?:{STREET_ENDINGS}){ENDING_TAIL}", re.IGNORECASE)
+    multi_word = [regex_backend.compile(rf"{ENDING_HEAD}({ending}){ENDING_TAIL}", re.IGNORECASE) for ending in MULTI_WORD_ENDINGS.split("|")]
+    single_word = [regex_backend.compile(rf"{ENDING_HEAD}({ending}){ENDING_TAIL}", re.IGNORECASE) for ending in SINGLE_WORD_ENDINGS.split("|")]
+    house_number = re.compile(r"^\d+")
+    special_extra = regex_backend.compile(SPECIAL_ENDING_EXTRA, re.IGNORECASE)
+    directional_extra = regex_backend.compile(DIRECTIONAL_EXTRA, re.IGNORECASE)
+
+    def evaluate(val, idx, columns):
+        if specific_road.search(val):
+            return None
+        street_ending_match = street_ending.search(val)
+        if not street_ending_match:
+            return "Address does not match expected road or street format"
+        ending = None
+        for pattern in multi_word:
+            match = pattern.search(val)
+            if match:
+                ending = match.group(1)
+                break
+        if not ending:
+            for pattern in single_word:
+                match = pattern.search(val)
+                if match:
+                    ending = match.group(1)
+                    break
+        if not house_number.search(val.split(ending)[0].strip()):
+            return f"Address must include a house number before ending: {ending}"
+        # group(1) is the multi-word ending alternative of STREET_ENDINGS, if that is what matched
+        extra = street_ending_match.group(1).strip() if street_ending_match.group(1) else ""
+        if extra:
+            is_special_ending = (
+                ending.lower() in SPECIAL_ENDINGS or
+                ending.lower().startswith(SPECIAL_ENDING_PREFIXES) or
+                ending == "CR"
+            )
+            allowed = special_extra if is_special_ending else directional_extra
+            if not allowed.match(extra):
+                return f"Address may contain non-standard components after ending: {extra}"
+        return None
+    return {"evaluate": evaluate}
+
+def build_duplicate_location(rule):
+    def evaluate_column(values, columns, details):
+        import dedupe
+
+        return [(idx, f"Possible duplicate location (cluster {cluster_id}) filed under another customer ID")
+                for idx, cluster_id in dedupe.find_duplicate_locations(values, columns["zip"], columns["customer"])]
+    return {"evaluate_column": evaluate_column}
+
+def build_stacked_location(rule):
+    # Coordinates are snapped to a cell_size-degree grid; a cell holding more than threshold
+    # subscribers at more than one address is a stacked or defaulted geocode
+    cell_size = rule["cell_size"]
+    threshold = rule["threshold"]
+    top = rule["top"]
+
+    def evaluate_column(values, columns, details):
+        import numpy as np
+        import pandas as pd
+
+        lat = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+        lon = pd.to_numeric(columns["lon"], errors="coerce").to_numpy(dtype=float)
+        with np.errstate(invalid="ignore"):
+            rows = np.flatnonzero((np.abs(lat) <= 90) & (np.abs(lon) <= 180))
+        cell_x = np.floor((lon[rows] + 180) / cell_size).astype(np.int64)
+        cell_y = np.floor((lat[rows] + 90) / cell_size).astype(np.int64)
+        # Hash-based factorize and bincount keep the whole rule linear in the row count
+        cells, _ = pd.factorize(cell_y * (int(360 / cell_size) + 2) + cell_x)
+        counts = np.bincount(cells) if len(cells) else np.zeros(0, dtype=np.int64)
+        crowded = np.flatnonzero(counts > threshold)
+        if not len(crowded):
+            return []
+        in_crowded = np.isin(cells, crowded)
+        address_codes, _ = pd.factorize(columns["address"].to_numpy(dtype=object)[rows[in_crowded]])
+        pairs, pair_values = pd.factorize(cells[in_crowded].astype(np.int64) * (int(address_codes.max()) + 2) + address_codes)
+        pair_cell = np.empty(len(pair_values), dtype=np.int64)
+        pair_cell[pairs] = cells[in_crowded]
+        distinct = np.bincount(pair_cell, minlength=len(counts))
+        stacked = crowded[distinct[crowded] > 1]
+        if not len(stacked):
+            return []
+
+        stacked_rows = in_crowded & np.isin(cells, stacked)
+        first_row = {}
+        for row, cell in zip(rows[stacked_rows].tolist(), cells[stacked_rows].tolist()):
+            first_row.setdefault(cell, row)
+        details["Stacked Locations"] = [{
+            "Lat": float(lat[first_row[cell]]),
+            "Lon": float(lon[first_row[cell]]),
+            "Subscribers": int(counts[cell]),
+            "Distinct Addresses": int(distinct[cell]),
+            "Example Address": columns["address"].iat[first_row[cell]]
+        } for cell in sorted(stacked.tolist(), key=lambda cell: counts[cell], reverse=True)[:top]]
+        return [(row, f"Coordinate shared by {counts[cell]} subscribers at {distinct[cell]} different addresses (stacked or default geocode)")
+                for row, cell in zip(rows[stacked_rows].tolist(), cells[stacked_rows].tolist())]
+    return {"evaluate_column": evaluate_column}
+
+def build_point_in_state(rule):
+    import geo
+
+    index = geo.load_index(rule["boundaries"])
+    codes = index["codes"].tolist()
+
+    def evaluate_column(values, columns, details):
+        import numpy as np
+        import pandas as pd
+
+        lon = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+        lat = pd.to_numeric(columns["lat"], errors="coerce").to_numpy(dtype=float)
+        states = columns["state"].str.upper().to_numpy(dtype=object)
+        found = np.array(codes + [""], dtype=object)[geo.locate_points(index, lat, lon)]  # -1 selects ""
+        with np.errstate(invalid="ignore"):
+            checked = np.isin(states, codes) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        hits = []
+        for idx in np.flatnonzero(checked & (found != states)).tolist():
+            if found[idx]:
+                hits.append((idx, f"Coordinate falls in {found[idx]}, not in state {states[idx]}"))
+            else:
+                hits.append((idx, f"Coordinate is not inside {states[idx]} or any other state boundary"))
+        return hits
+    return {"evaluate_column": evaluate_column}
+
+def build_cross_submission(rule):
+    import subscriber_index
+
+    def evaluate_column(values, columns, details):
+        keys = subscriber_index.subscriber_keys(columns["customer"], values, columns["lat"], columns["lon"])
+        matches = subscriber_index.find_matches(rule["index"], rule["company_id"], keys)
+        companies = {}
+        hits = []
+        for idx in sorted(matches):
+            for other_company in {other_company for other_company, _ in matches[idx]}:
+                companies[other_company] = companies.get(other_company, 0) + 1
+            reported = ", ".join(f"{other_company} (customer {customer})" if customer else other_company
+                                 for other_company, customer in matches[idx][:3])
+            more = f" and {len(matches[idx]) - 3} more" if len(matches[idx]) > 3 else ""
+            hits.append((idx, f"Location also reported by {reported}{more}"))
+        if companies:
+            details["Cross-Submission Matches"] = companies
+        return hits
+    return {"evaluate_column": evaluate_column}
+
+def build_zip_state(rule):
+    import zip_prefixes
+
+    zip_format = re.compile(ZIP_FORMAT)
+    state_bits = {state: i for i, state in enumerate(VALID_STATES)}
+
+    def evaluate_column(values, columns, details):
+        import numpy as np
+        import pandas as pd
+
+        # Prefixes and state bits are worked out per distinct value, then broadcast to rows
+        table = zip_prefixes.zip3_table()
+        zip_codes, zip_uniques = pd.factorize(values)
+        prefixes = np.array([int(z[:3]) if zip_format.match(z) else -1 for z in zip_uniques] + [-1], dtype=np.int64)
+        state_codes, state_uniques = pd.factorize(columns["state"].str.upper())
+        bits = np.array([state_bits.get(state, -1) for state in state_uniques] + [-1], dtype=np.int64)
+        row_prefix, row_bit = prefixes[zip_codes], bits[state_codes]
+        masks = table[np.where(row_prefix >= 0, row_prefix, 0)]
+        allowed = (masks >> np.maximum(row_bit, 0).astype(np.uint64)) & np.uint64(1)
+        wrong = np.flatnonzero((row_prefix >= 0) & (row_bit >= 0) & (masks != 0) & (allowed == 0))
+
+        # One message per distinct (zip, state) pair, built from the pair's first row
+        pair_codes, _ = pd.factorize(zip_codes[wrong].astype(np.int64) * (len(state_uniques) + 1) + state_codes[wrong])
+        first_rows = wrong[np.unique(pair_codes, return_index=True)[1]].tolist()
+        state_values = columns["state"].to_numpy(dtype=object)
+        messages = [f"ZIP code prefix {values.iat[idx][:3]} is not valid for state {state_values[idx].upper()}. "
+                    f"Expected {', '.join(zip_prefixes.expected_states(masks[idx]))}" for idx in first_rows]
+        return [(idx, messages[code]) for idx, code in zip(wrong.tolist(), pair_codes.tolist())]
+    return {"evaluate_column": evaluate_column}
+
+def build_speed(rule):
+    col = rule["column"]
+
+    def evaluate(val, idx, columns):
+        if not val:
+            return None
+        if not is_float(val):
+            return f"{col.capitalize()} speed must be a number"
+        speed = float(val)
+        if speed <= 0:
+            return f"{col.capitalize()} speed must be greater than 0"
+        if speed > 3000:
+            return f"{col.capitalize()} speed cannot exceed 3000 Mbps"
+        return None
+    return {"evaluate": evaluate}
+
+def build_count(rule):
+    def evaluate(val, idx, columns):
+        if not val:
+            return None
+        if not is_integer(val):
+            return "VOIP lines quantity must be an integer"
+        if int(val) < 0:
+            return "VOIP lines quantity must be non-negative"
+        return None
+    return {"evaluate": evaluate}
+
+CHECKS = {
+    "blank": build_blank,
+    "search": build_search,
+    "match": build_match,
+    "choices": build_choices,
+    "duplicate": build_duplicate,
+    "coordinate": build_coordinate,
+    "address_screen": build_address_screen,
+    "street_format": build_street_format,
+    "duplicate_location": build_duplicate_location,
+    "stacked_location": build_stacked_location,
+    "point_in_state": build_point_in_state,
+    "cross_submission": build_cross_submission,
+    "zip_state": build_zip_state,
+    "speed": build_speed,
+    "count": build_count,
+}
+
+def point_in_state_rule(boundaries):
+    """
+    Optional geo stage: flag lon when (lat, lon) is not inside the polygon of the row's
+    state, naming the state it does fall in. boundaries is a GeoJSON file (see geo.py).
+    """
+    return {"id": "lon.point_in_state", "column": "lon", "check": "point_in_state",
+            "depends": ["lat", "state"], "boundaries": boundaries}
+
+def cross_submission_rule(index, company_id):
+    """
+    Optional stage: flag address when the same location (address and coordinate cell) is
+    already recorded under another company_id in the SQLite subscriber index (see
+    subscriber_index.py).
+    """
+    return {"id": "address.cross_submission", "column": "address", "check": "cross_submission",
+            "depends": ["customer", "lat", "lon"], "sections": ["Cross-Submission Matches"], "index": index,
+            "company_id": company_id}
+
+def with_options(rules, options):
+    """Copy of rules with parameters overridden; options maps rule id -> {parameter: value}."""
+    return [{**rule, **options.get(rule["id"], {})} for rule in rules]
+
+def select_rules(rules, patterns=None, columns=None):
+    """
+    The rules whose id matches one of the shell-style patterns (e.g. "address.*") and whose
+    column is in columns; a None selector matches every rule.
+    """
+    from fnmatch import fnmatchcase
+
+    return [rule for rule in rules
+            if (patterns is None or any(fnmatchcase(rule["id"], pattern) for pattern in patterns))
+            and (columns is None or rule["column"] in columns)]
+
+def rule_columns(rules):
+    """Columns the rules read (their own and their depends), in EXPECTED_COLUMNS order."""
+    needed = {col for rule in rules for col in [rule["column"]] + rule.get("depends", [])}
+    return [col for col in EXPECTED_COLUMNS if col in needed]
+
+def compile_plan(rules=RULES):
+    """
+    Compile rules into an execution plan: {column: [check, ...]} in rule order, where
+    each check is the builder output plus "id", "column", "depends" and "cross_row".
+    """
+    plan = {}
+    for rule in rules:
+        check = CHECKS[rule["check"]](rule)
+        check.update({"id": rule["id"], "column": rule["column"], "depends": rule.get("depends", []),
+                      "cross_row": rule.get("cross_row", False)})
+        plan.setdefault(rule["column"], []).append(check)
+    return plan
+
+_default_plan = None
+
+def get_plan():
+    """The compiled plan for RULES, built on first use so importing this module stays cheap."""
+    global _default_plan
+    if _default_plan is None:
+        _default_plan = compile_plan()
+    return _default_plan
+
+def validate_columns(cleaned_df, errors, flagged_cells, plan=None, details=None, progress=None, checkpoint=None,
+                     hits_out=None):
+    """
+    Run the plan over cleaned_df, appending to errors and recording highlighted cells
+    and their messages in flagged_cells, a cell_flags.FlaggedCells over cleaned_df's rows.
+    Row positions are 0-based; the "Row" reported in each error is OrigRowNum. Extra report
+    sections produced by column checks (e.g. "Stacked Locations") are added to details
+    when it is given.
+    Categorical columns whose checks only look at the value are evaluated once per
+    category and broadcast to rows through the category codes; column-level checks such
+    as zip.state work per distinct value themselves. This only speeds up those columns:
+    address, which is not categorical, takes most of the time on a typical file.
+    progress (a progress.Progress) is told the column and rows done as the run goes.
+    With a checkpoint (checkpoint.Checkpoint), each column's results are saved once it is
+    done, and columns saved by an interrupted run are replayed instead of validated again.
+    hits_out, when given, receives {col: hits per check in plan order}; each check's hits
+    are its (row position, message) pairs, so errors can be traced back to their rule.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from progress import BLOCK_ROWS
+
+    if plan is None:
+        plan = get_plan()
+    if details is None:
+        details = {}
+    orig_rows = cleaned_df["OrigRowNum"].tolist()
+    normalized = {}  # Shared .fillna("").astype(str).str.strip() per column
+    dictionaries = {}  # Categorical columns: (normalized categories + "" for NaN, codes)
+
+    def column_dictionary(col):
+        if col not in dictionaries:
+            series = cleaned_df[col]
+            categories = series.cat.categories.astype(str).str.strip().tolist()
+            # NaN has code -1, which indexes the trailing "" entry
+            dictionaries[col] = (np.array(categories + [""], dtype=object), series.cat.codes.to_numpy())
+        return dictionaries[col]
+
+    def column_values(col):
+        if col not in normalized:
+            if isinstance(cleaned_df[col].dtype, pd.CategoricalDtype):
+                dictionary, codes = column_dictionary(col)
+                normalized[col] = pd.Series(dictionary[codes], index=cleaned_df.index, dtype=object)
+            else:
+                normalized[col] = cleaned_df[col].fillna("").astype(str).str.strip()
+        return normalized[col]
+
+    planned = [col for col in cleaned_df.columns if col != "OrigRowNum" and col in plan]
+    if progress:
+        progress.set_phase("validate", total_rows=len(cleaned_df), columns=len(planned))
+
+    for col in planned:
+        checks = plan[col]
+        if progress:
+            progress.start_column(col)
+        hits = [[] for _ in checks]
+        by_dictionary = (isinstance(cleaned_df[col].dtype, pd.CategoricalDtype)
+                         and not any(check["depends"] for check in checks if "evaluate" in check))
+
+        saved = checkpoint.load_column(col) if checkpoint else None
+        if saved is not None:
+            # Validated before the run was interrupted: replay its hits and report sections
+            hits, sections = saved
+            details.update(sections)
+            value_list = column_values(col).tolist()
+        elif by_dictionary:
+            # Evaluate each check on the distinct values, then map hits back to rows
+            dictionary, codes = column_dictionary(col)
+            for i, check in enumerate(checks):
+                if "evaluate" in check:
+                    messages = [check["evaluate"](val, None, {}) for val in dictionary]
+                    hit = np.array([bool(message) for message in messages])
+                    hits[i] = [(idx, messages[codes[idx]]) for idx in np.flatnonzero(hit[codes]).tolist()]
+            value_list = dictionary[codes]
+        else:
+            values = column_values(col)
+            value_list = values.tolist()
+            columns = {dep: column_values(dep).tolist() for check in checks for dep in check["depends"] if dep in cleaned_df}
+
+            # One pass over the column for all row-level checks; hits are kept per check
+            row_checks = [(hits[i], check["evaluate"]) for i, check in enumerate(checks) if "evaluate" in check]
+            if row_checks:
+                # Rows go in blocks so progress is checked once per block, not per row
+                for start in range(0, len(value_list), BLOCK_ROWS):
+                    for idx, val in enumerate(value_list[start:start + BLOCK_ROWS], start):
+                        for check_hits, evaluate in row_checks:
+                            message = evaluate(val, idx, columns)
+                            if message:
+                                check_hits.append((idx, message))
+                    if progress:
+                        progress.advance(min(start + BLOCK_ROWS, len(value_list)))
+        if saved is None:
+            sections_before = set(details)
+            for i, check in enumerate(checks):
+                if "evaluate_column" in check:
+                    dependencies = {dep: column_values(dep) for dep in check["depends"] if dep in cleaned_df}
+                    hits[i] = check["evaluate_column"](column_values(col), dependencies, details)
+            if checkpoint:
+                checkpoint.save_column(col, hits, {key: details[key] for key in details if key not in sections_before})
+        if progress:
+            for check, check_hits in zip(checks, hits):
+                progress.add_errors(check["id"], len(check_hits))
+            progress.advance(len(value_list))
+
+        if hits_out is not None:
+            hits_out[col] = hits
+        for check_hits in hits:
+            for idx, message in check_hits:
+                errors.append({
+                    "Row": orig_rows[idx],
+                    "Column": col,
+                    "Error": message,
+                    "Value": value_list[idx]
+                })
+            # Checks are flagged in plan order, so a later check's message overwrites an earlier one's
+            flagged_cells.add(col, [idx for idx, _ in check_hits], [message for _, message in check_hits])
@@ -0,0 +1,73 @@
+# standardize.py - Opt-in USPS-style address standardization
+# Addresses are tokenized on whitespace and street suffixes / directionals are rewritten by
+# dict lookup on the upper-cased token. Work is done once per distinct address and the
+# result is returned as a pandas Categorical, so later rules also see only distinct values.
+
+# Street suffix spellings (upper case, trailing period removed) -> canonical abbreviation.
+# Covers the long and short forms in SINGLE_WORD_ENDINGS; route-style words (Route, FM, CR)
+# are left alone because the road rules treat them specially.
+SUFFIX_ABBREVIATIONS = {
+    "ALLEY": "Aly", "ALY": "Aly", "AVENUE": "Ave", "AVE": "Ave", "AV": "Ave",
+    "BOULEVARD": "Blvd", "BLVD": "Blvd", "CIRCLE": "Cir", "CIR": "Cir",
+    "COURT": "Ct", "CT": "Ct", "DRIVE": "Dr", "DR": "Dr", "EXPRESSWAY": "Expy", "EXPY": "Expy",
+    "HIGHWAY": "Hwy", "HWY": "Hwy", "LANE": "Ln", "LN": "Ln", "LOOP": "Loop",
+    "PARKWAY": "Pkwy", "PKWY": "Pkwy", "PLACE": "Pl", "PL": "Pl", "ROAD": "Rd", "RD": "Rd",
+    "SQUARE": "Sq", "SQ": "Sq", "STREET": "St", "ST": "St", "TERRACE": "Ter", "TER": "Ter",
+    "TRAIL": "Trl", "TRL": "Trl", "TURNPIKE": "Tpke", "TPKE": "Tpke", "WAY": "Way", "WY": "Way",
+}
+DIRECTIONAL_ABBREVIATIONS = {
+    "NORTH": "N", "N": "N", "SOUTH": "S", "S": "S", "EAST": "E", "E": "E", "WEST": "W", "W": "W",
+    "NORTHEAST": "NE", "NE": "NE", "NORTHWEST": "NW", "NW": "NW",
+    "SOUTHEAST": "SE", "SE": "SE", "SOUTHWEST": "SW", "SW": "SW",
+}
+
+def lookup_key(token):
+    return token.upper().rstrip(".")
+
+def standardize_address(address):
+    """
+    Canonical form of one address: single spaces, the last street suffix abbreviated,
+    and leading (after the house number) / trailing directionals abbreviated.
+    Tokens that are not recognized keep their original spelling and case.
+    """
+    tokens = address.split()
+    if not tokens:
+        return ""
+    keys = [lookup_key(token) for token in tokens]
+
+    # Street suffix: the last suffix word that is not the first token
+    suffix_at = next((i for i in range(len(tokens) - 1, 0, -1) if keys[i] in SUFFIX_ABBREVIATIONS), None)
+    if suffix_at is not None:
+        tokens[suffix_at] = SUFFIX_ABBREVIATIONS[keys[suffix_at]]
+
+    # Post-directionals: trailing directional words after the suffix
+    i = len(tokens) - 1
+    while suffix_at is not None and i > suffix_at and keys[i] in DIRECTIONAL_ABBREVIATIONS:
+        tokens[i] = DIRECTIONAL_ABBREVIATIONS[keys[i]]
+        i -= 1
+
+    # Pre-directional: right after the house number, unless it is itself the street name
+    # (e.g. "12 North St")
+    pre_at = 1 if keys[0][:1].isdigit() else 0
+    if (pre_at < len(tokens) - 1 and keys[pre_at] in DIRECTIONAL_ABBREVIATIONS
+            and pre_at + 1 != suffix_at):
+        tokens[pre_at] = DIRECTIONAL_ABBREVIATIONS[keys[pre_at]]
+    return " ".join(tokens)
+
+def standardize_column(series):
+    """
+    Standardize a Series of addresses one distinct value at a time.
+    Returns (corrected, changed): corrected is a Categorical over the standardized
+    vocabulary (NaN stays NaN) and changed is a boolean array of rows whose value changed.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series)
+    standardized = [standardize_address(str(value)) for value in uniques]
+    # Several raw spellings can standardize to the same address; share one category for them
+    vocabulary_codes, vocabulary = pd.factorize(pd.Series(standardized, dtype=object))
+    vocabulary_codes = np.append(vocabulary_codes, -1)  # Code -1 (NaN) stays -1
+    corrected = pd.Categorical.from_codes(vocabulary_codes[codes], categories=pd.Index(vocabulary, dtype=object))
+    unique_changed = np.array([new != str(old) for old, new in zip(uniques, standardized)] + [False])
+    return corrected, unique_changed[codes]
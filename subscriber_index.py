@@ -0,0 +1,87 @@
+# subscriber_index.py - Persistent cross-submission subscriber index
+# Every full run can record its subscribers in a local SQLite file keyed by
+# (address key, lat/lon cell), so a later file from another company_id (another provider or
+# another filing period) can be checked for the same subscriber location. Lookups load the
+# incoming keys into a temporary table and join it against the (address_key, cell) index,
+# so each file costs one B-tree probe per row rather than a scan of the index.
+import sqlite3
+
+from dedupe import location_key
+
+CELL_SIZE = 0.001  # Degrees (about 100 m)
+BATCH_SIZE = 50000  # Rows per executemany call
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    company_id TEXT NOT NULL,
+    customer TEXT NOT NULL,
+    address_key TEXT NOT NULL,
+    cell INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS subscribers_location ON subscribers (address_key, cell);
+CREATE INDEX IF NOT EXISTS subscribers_company ON subscribers (company_id);
+"""
+
+def open_index(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+def subscriber_keys(customers, addresses, lat, lon):
+    """
+    customers, addresses, lat and lon are normalized Series of the same length. Returns
+    (row_idx, customer, address_key, cell) for every row with an address and a usable
+    coordinate. Address keys are computed once per distinct address.
+    """
+    import numpy as np
+    import pandas as pd
+
+    address_codes, address_uniques = pd.factorize(addresses)
+    address_keys = np.array([location_key(str(address)) for address in address_uniques] + [""], dtype=object)[address_codes]
+    lat = pd.to_numeric(lat, errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(lon, errors="coerce").to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        usable = (address_keys != "") & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    rows = np.flatnonzero(usable)
+    lat_cells = np.floor(lat[rows] / CELL_SIZE).astype(np.int64) + 100000
+    lon_cells = np.floor(lon[rows] / CELL_SIZE).astype(np.int64) + 200000
+    cells = lat_cells * 400001 + lon_cells
+    customer_values = customers.to_numpy(dtype=object)
+    return list(zip(rows.tolist(), customer_values[rows].tolist(), address_keys[rows].tolist(), cells.tolist()))
+
+def find_matches(path, company_id, keys):
+    """
+    Return {row_idx: [(company_id, customer), ...]} for keys whose location is already in
+    the index under a different company_id.
+    """
+    connection = open_index(path)
+    try:
+        connection.execute("CREATE TEMP TABLE incoming (row INTEGER, address_key TEXT, cell INTEGER)")
+        for start in range(0, len(keys), BATCH_SIZE):
+            connection.executemany("INSERT INTO incoming VALUES (?, ?, ?)",
+                                   [(row, address_key, cell) for row, _, address_key, cell in keys[start:start + BATCH_SIZE]])
+        matches = {}
+        query = """
+            SELECT incoming.row, subscribers.company_id, subscribers.customer
+            FROM incoming JOIN subscribers INDEXED BY subscribers_location
+              ON subscribers.address_key = incoming.address_key AND subscribers.cell = incoming.cell
+            WHERE subscribers.company_id != ?
+            ORDER BY incoming.row, subscribers.company_id, subscribers.customer
+        """
+        for row, other_company, customer in connection.execute(query, (company_id,)):
+            matches.setdefault(row, []).append((other_company, customer))
+        return matches
+    finally:
+        connection.close()
+
+def update_index(path, company_id, keys):
+    """Replace the subscribers recorded for company_id with keys, in one transaction."""
+    connection = open_index(path)
+    try:
+        with connection:
+            connection.execute("DELETE FROM subscribers WHERE company_id = ?", (company_id,))
+            for start in range(0, len(keys), BATCH_SIZE):
+                connection.executemany("INSERT INTO subscribers VALUES (?, ?, ?, ?)",
+                                       [(company_id, customer, address_key, cell)
+                                        for _, customer, address_key, cell in keys[start:start + BATCH_SIZE]])
+    finally:
+        connection.close()
@@ -1,90 +1,41 @@
 # vs4.py - Version 1.1.1
-import pandas as pd
+# pandas, openpyxl and json are imported inside the functions that use them so that
+# startup and the --check-headers fast path only pay for the standard library.
 import os
 import shutil
 import sys
-import re
-import openpyxl
-from openpyxl.styles import PatternFill
 from datetime import datetime
 import time  # Added for tracking start/stop times
-import json  # Added for JSON report generation
-
-# Configuration from validate_subscribers.py
-VALID_STATES = ["AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "FL", "GA", "HI", "ID", "IL", "IN", "IA", "KS", "KY", "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY", "NC", "ND", "OH", "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY", "DC", "PR", "VI", "GU", "AS", "MP"]
-VALID_TECHNOLOGIES = ["fiber", "cable", "dsl", "wireless_licensed", "wireless_unlicensed", "copper"]
-EXPECTED_COLUMNS = ["customer", "lat", "lon", "address", "city", "state", "zip", "download", "upload", "voip_lines_quantity", "business_customer", "technology"]
-
-# Street endings and patterns
-MULTI_WORD_ENDINGS = (
-    r"\bUS Highway\b|\bUS Hwy\b|\bPrivate Road\b|\bCounty Road\b|\bCounty Rd\b|\bCo Rd\b|\bState Route\b|"
-    r"\bFarm to Market\b|\bCounty Hwy \d+\b|\bCounty FM \d+\b|\bFM Road \d+\b|"
-    r"\bFire District \d+ Rd\b|\bState Hwy \d+\b|\bKamehameha Hwy\b|\bMamalahoa Hwy\b|"
-    r"\bRoute C-\d+\b|\bRoute [A-Z]{2}\b|\b[A-Z]{2} Road\b|\bRS \d+\b|\bKY RS \d+\b"
-)
-SINGLE_WORD_ENDINGS = (
-    r"\bAlley\b|\bALY\b|\bAvenue\b|\bAve\b|\bAv\b|\bBoulevard\b|\bBlvd\b|\bCircle\b|\bCir\b|\bCr\b|"
-    r"\bCourt\b|\bCt\b|\bDrive\b|\bDr\b|\bExpressway\b|\bExpy\b|\bFM\b|\bHighway\b|\bHwy\b|"
-    r"\bLane\b|\bLn\b|\bLoop\b|\bParkway\b|\bPkwy\b|\bPlace\b|\bPl\b|\bRoad\b|\bRd\b|\bRoute\b|\bRte\b|\bRt\b|\bSquare\b|"
-    r"\bSq\b|\bStreet\b|\bSt\b|\bTerrace\b|\bTer\b|\bTrail\b|\bTrl\b|\bTurnpike\b|\bTpke\b|\bWay\b|\bWy\b|"
-    r"\bCR\b|\bSR\b|\bFM\b|\bUS\b|\bInterstate\b|\bI-\b|"
-    r"\bAZ-\d+\b|\bCA-\d+\b|\bCT-\d+\b|\bDE-\d+\b|\bFL-\d+\b|\bGA-\d+\b|\bID-\d+\b|"
-    r"\bIL-\d+\b|\bIN-\d+\b|\bK-\d+\b|\bME-\d+\b|\bMD-\d+\b|\bMA-\d+\b|\bM-\d+\b|"
-    r"\bMN-\d+\b|\bMS-\d+\b|\bNH-\d+\b|\bNJ-\d+\b|\bNM-\d+\b|\bNY-\d+\b|\bNC-\d+\b|"
-    r"\bOH-\d+\b|\bOK-\d+\b|\bOR-\d+\b|\bPA-\d+\b|\bRI-\d+\b|\bSC-\d+\b|\bTN-\d+\b|"
-    r"\bUT-\d+\b|\bVT-\d+\b|\bVA-\d+\b|\bWA-\d+\b|\bWV-\d+\b|\bWI-\d+\b|\bWY-\d+\b|"
-    r"\bSH-\d+\b|\bC-\d+\b|\bCarr \d+\b|\bRoute \d+\b|\bCH \d+\b"
-)
-SPECIFIC_ROAD_PATTERN = r"(?i)(?:\d+\s+)?(?:County\s*(?:Road|Rd|CR)|Private\s*Road|Us\s*Hwy|Farm\s*to\s*Market|Farm\s*Road|Farm\s*to\s*Market\s*Road|FM\s*Rd|State\s*(?:Road|Rd|Route)|Old\s*State\s*(?:Road|Rd)|" \
-                        r"(?:AL|AK|AZ|AR|CA|CO|CT|DE|FL|GA|HI|ID|IL|IN|IA|KS|KY|LA|ME|MD|MA|MI|MN|MS|MO|MT|NE|NV|NH|NJ|NM|NY|NC|ND|OH|OK|OR|PA|RI|SC|SD|TN|TX|UT|VT|VA|WA|WV|WI|WY|DC|PR|VI|GU|AS|MP)-\d+|" \
-                        r"(?:Alabama|Alaska|Arizona|Arkansas|California|Colorado|Connecticut|Delaware|Florida|Georgia|Hawaii|Idaho|Illinois|Indiana|Iowa|Kansas|Kentucky|Louisiana|Maine|Maryland|Massachusetts|Michigan|Minnesota|Mississippi|Missouri|Montana|Nebraska|Nevada|New\sHampshire|New\sJersey|New\sMexico|New\sYork|North\sCarolina|North\sDakota|Ohio|Oklahoma|Oregon|Pennsylvania|Rhode\sIsland|South\sCarolina|South\sDakota|Tennessee|Texas|Utah|Vermont|Virginia|Washington|West\sVirginia|Wisconsin|Wyoming|District\sof\sColumbia|Puerto\sRico|Virgin\sIslands|Guam|American\sSamoa|Northern\sMariana\sIslands)\s*(?:Hwy|Highway|Route|Rte|Rt)\s*\d+)\s*(?:\d+(?:\s*(?:North|South|East|West|Northeast|Northwest|Southeast|Southwest|N|S|E|W|NE|NW|SE|SW))?)?\b"
-STREET_ENDINGS = f"({MULTI_WORD_ENDINGS})|({SINGLE_WORD_ENDINGS})"
-PO_BOX = r"\bPO Box\b|\bP\.O\. Box\b|\bPost Office Box\b"
-RURAL_ROUTES = r"\bRR \d+ Box \d+\b|\bRural Route \d+ Box \d+\b|\bR\.R\. \d+ Box \d+\b|\bHC \d+ Box \d+\b"
-FORBIDDEN_CHARS = r'[!@#$%^&*()+={}[\]|\"\'?/:;<,>]'
-
-STATE_LON_RANGES = {
-    "AL": (-88.473227, -84.889080), "AK": (-179.148909, 179.778470), "AZ": (-114.816510, -109.045223),
-    "AR": (-94.617919, -89.644395), "CA": (-124.409591, -114.131211), "CO": (-109.060253, -102.041524),
-    "CT": (-73.727775, -71.786994), "DE": (-75.788658, -75.048939), "FL": (-87.634896, -80.031056),
-    "GA": (-85.605165, -80.840141), "HI": (-178.334698, -154.806773), "ID": (-117.243027, -111.043564),
-    "IL": (-91.513079, -87.494756), "IN": (-88.097892, -84.787981), "IA": (-96.639704, -90.140061),
-    "KS": (-102.051744, -94.588413), "KY": (-89.571510, -81.964971), "LA": (-94.043147, -88.817017),
-    "ME": (-71.083924, -66.949895), "MD": (-79.487651, -75.048939), "MA": (-73.508142, -69.928393),
-    "MI": (-90.418136, -82.413474), "MN": (-97.239209, -89.483385), "MS": (-91.655009, -88.097892),
-    "MO": (-95.774704, -89.098843), "MT": (-116.050002, -104.039138), "NE": (-104.053514, -95.308290),
-    "NV": (-120.005746, -114.039648), "NH": (-72.557247, -70.610621), "NJ": (-75.559614, -73.893979),
-    "NM": (-109.050173, -103.001964), "NY": (-79.762152, -71.856214), "NC": (-84.321869, -75.460621),
-    "ND": (-104.048900, -96.554507), "OH": (-84.820159, -80.518693), "OK": (-103.002455, -94.430662),
-    "OR": (-124.566244, -116.463262), "PA": (-80.519891, -74.689516), "RI": (-71.886819, -71.120557),
-    "SC": (-83.353910, -78.541138), "SD": (-104.057698, -96.436589), "TN": (-90.310298, -81.646900),
-    "TX": (-106.645646, -93.508292), "UT": (-114.052998, -109.041058), "VT": (-73.437740, -71.464555),
-    "VA": (-83.675395, -75.242266), "WA": (-124.763068, -116.915989), "WV": (-82.644739, -77.719519),
-    "WI": (-92.889433, -86.763983), "WY": (-111.056888, -104.052160), "DC": (-77.119759, -76.909393),
-    "PR": (-67.945404, -65.220703), "VI": (-65.013029, -64.564907), "GU": (144.618068, 144.956706),
-    "AS": (-170.841600, -169.406622), "MP": (145.128345, 145.853700)
-}
-
-def generate_validation_report(start_time, stop_time, errors, flagged_cells, cleaned_df, input_csv, company_id):
-    """
-    Generate Excel and JSON validation reports in the company_id directory.
-    Excel report includes Summary, Errors, and Corrected Data sheets.
-    JSON report includes summary data and errors list.
-    """
-    base_filename = os.path.splitext(os.path.basename(input_csv))[0]
-    excel_path = os.path.join(company_id, f"{base_filename}_VR.xlsx")
-    json_path = os.path.join(company_id, f"{base_filename}_VR.json")
+import argparse
+import contextlib
+import csv
+import io
+import math
+import random
+from collections import defaultdict
+import compressed_io
+import regex_backend
+from cell_flags import FlaggedCells
+from checkpoint import Checkpoint, input_fingerprint
+from error_summary import summarize_errors, summary_records, summary_table
+from memory_budget import SAMPLE_ROWS, MemoryBudget, count_rows, format_size, parse_size
+from progress import Progress
+from standardize import standardize_column
+from rules import (CATEGORICAL_COLUMNS, EXPECTED_COLUMNS, RULES, compile_plan, cross_submission_rule, get_plan,
+                   point_in_state_rule, rule_columns, select_rules, validate_columns, with_options)
 
-    # Calculate metrics
+ARTIFACT_WORKERS = min(4, os.cpu_count() or 1)  # Output files written at once (Steps 8-11)
+EXCEL_MAX_ROWS = 1048576  # Rows per worksheet, header included
+
+def report_summary(start_time, stop_time, errors, flagged_cells, cleaned_df, input_csv, company_id):
+    """Summary section shared by the Excel and JSON validation reports."""
     total_rows = len(cleaned_df)
-    failed_rows = len(set(row_idx for (row_idx, col_name) in flagged_cells))
+    failed_rows = flagged_cells.failed_rows()
     duration = stop_time - start_time
     validation_status = "Pass" if not errors else "Failed"
     start_datetime = datetime.fromtimestamp(start_time).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
     stop_datetime = datetime.fromtimestamp(stop_time).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-
-    # Prepare summary data
-    summary_data = {
+    return {
         "Company Name": company_id,
         "Company ID": company_id,
         "Input File": os.path.basename(input_csv),
@@ -97,56 +48,387 @@ def generate_validation_report(start_time, stop_time, errors, flagged_cells, cle
         "Flagged Cells": len(flagged_cells)
     }
 
-    # Excel report
+def sorted_errors_df(errors):
+    """Errors as a DataFrame sorted by message, as written to _Errors.csv and the Errors sheet."""
+    import pandas as pd
+
+    df_errors = pd.DataFrame(errors)
+    if df_errors.empty:
+        return pd.DataFrame(columns=["Row", "Column", "Error", "Value"])
+    return df_errors.sort_values(by="Error")
+
+def write_excel_report(excel_path, summary_data, df_errors, flagged_cells, cleaned_df, error_table=None):
+    """
+    _VR.xlsx: Summary, Error Summary, Errors, and Corrected Data sheets with flagged_cells
+    (a FlaggedCells) highlighted yellow. The Error Summary sheet is error_table (see
+    error_summary.py); the Errors sheet is left out when df_errors is None and Corrected
+    Data when cleaned_df is.
+    """
+    import numpy as np
+    import pandas as pd
+    from openpyxl.styles import PatternFill
+
+    with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
+        # Summary sheet
+        pd.DataFrame([summary_data]).to_excel(writer, sheet_name="Summary", index=False)
+
+        # Error Summary sheet
+        if error_table is not None:
+            error_table.to_excel(writer, sheet_name="Error Summary", index=False)
+
+        # Errors sheet
+        if df_errors is not None:
+            df_errors.to_excel(writer, sheet_name="Errors", index=False)
+
+        if cleaned_df is None:
+            return
+
+        # Corrected Data sheet (mimics _Corrected_Subscribers.csv)
+        cleaned_df.to_excel(writer, sheet_name="Corrected Data", index=False)
+
+        # Apply yellow highlighting to flagged cells
+        wb = writer.book
+        ws = wb["Corrected Data"]
+        yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+        col_map = {col: idx + 1 for idx, col in enumerate(cleaned_df.columns)}
+        excel_cols = [col_map[col_name] for col_name in flagged_cells.columns]
+        for row_idx, i in zip(*np.nonzero(flagged_cells.matrix())):
+            excel_row = int(row_idx) + 2  # +1 for header, +1 for 1-based indexing
+            ws.cell(row=excel_row, column=excel_cols[i]).fill = yellow_fill
+
+def write_large_excel_report(excel_path, summary_data, df_errors, flagged_cells, cleaned_df, page_rows=EXCEL_MAX_ROWS - 1,
+                             error_table=None, chunk_rows=None):
+    """
+    Large-report _VR.xlsx, streamed with an openpyxl write-only workbook so memory does not
+    grow with the row count. Errors and data are paged across numbered sheets ("Errors",
+    "Errors 2", ..., "Corrected Data", "Corrected Data 2", ...) of at most page_rows rows
+    plus a header. An Index sheet lists the pages and the error counts per column and per
+    error message. error_table and a None df_errors or cleaned_df are handled as in
+    write_excel_report. Rows are formatted a chunk at a time; chunk_rows() gives the size of
+    the next chunk (a MemoryBudget can shrink it), by default a whole page.
+    """
+    from collections import Counter
+
+    import numpy as np
+    import openpyxl
+    import pandas as pd
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import PatternFill
+
+    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+
+    def cell_value(value):
+        return None if pd.isna(value) else value
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Summary")
+    ws.append(list(summary_data))
+    ws.append(list(summary_data.values()))
+    index_ws = wb.create_sheet("Index")
+    if error_table is not None:
+        ws = wb.create_sheet("Error Summary")
+        ws.append(list(error_table.columns))
+        for record in error_table.itertuples(index=False, name=None):
+            ws.append([cell_value(value) for value in record])
+
+    pages = []  # (sheet name, first row, last row)
+    sheets = [(title, df) for title, df in [("Errors", df_errors), ("Corrected Data", cleaned_df)] if df is not None]
+    for title, df in sheets:
+        for page, start in enumerate(range(0, max(len(df), 1), page_rows), start=1):
+            name = title if page == 1 else f"{title} {page}"
+            ws = wb.create_sheet(name)
+            ws.append(list(df.columns))
+            end = min(start + page_rows, len(df))
+            position = start
+            while position < end:
+                chunk = df.iloc[position:min(position + (chunk_rows() if chunk_rows else page_rows), end)]
+                if title == "Errors":
+                    for record in chunk.itertuples(index=False, name=None):
+                        ws.append([cell_value(value) for value in record])
+                else:
+                    # The chunk's flags, unpacked and lined up with the sheet's columns
+                    flags = flagged_cells.matrix(position, position + len(chunk))
+                    sheet_flags = np.zeros((len(chunk), len(df.columns)), dtype=bool)
+                    sheet_flags[:, [df.columns.get_loc(col_name) for col_name in flagged_cells.columns]] = flags
+                    for record, record_flags in zip(chunk.itertuples(index=False, name=None), sheet_flags.tolist()):
+                        if not any(record_flags):
+                            ws.append([cell_value(value) for value in record])
+                            continue
+                        row = []
+                        for value, flagged in zip(record, record_flags):
+                            if flagged:
+                                value = WriteOnlyCell(ws, value=cell_value(value))
+                                value.fill = yellow_fill
+                                row.append(value)
+                            else:
+                                row.append(cell_value(value))
+                        ws.append(row)
+                position += len(chunk)
+            pages.append((name, start + 1, end))
+
+    index_ws.append(["Sheet", "First Row", "Last Row"])
+    for page in pages:
+        index_ws.append(list(page))
+    index_ws.append([])
+    if df_errors is not None:
+        column_counts, error_counts = Counter(df_errors["Column"]), Counter(df_errors["Error"])
+    else:
+        column_counts, error_counts = Counter(), Counter()
+        for col_name, message, count in error_table[["Column", "Error", "Count"]].itertuples(index=False, name=None):
+            column_counts[col_name] += count
+            error_counts[message] += count
+    index_ws.append(["Column", "Errors"])
+    for col_name, count in column_counts.most_common():
+        index_ws.append([col_name, count])
+    index_ws.append([])
+    index_ws.append(["Error", "Count"])
+    for message, count in error_counts.most_common():
+        index_ws.append([message, count])
+    wb.save(excel_path)
+
+def write_json_report(json_path, summary_data, details, errors, error_summary=None, rule_errors=None):
+    """
+    _VR.json: summary data, any extra sections from the rules in details, the error summary
+    (a summarize_errors frame) when given, the per-rule error counts (rule_error_counts)
+    when given, and the errors list unless errors is None.
+    """
+    import json
+
+    report_data = summary_data.copy()
+    report_data.update(details or {})
+    if error_summary is not None:
+        report_data["Error Summary"] = summary_records(error_summary)
+    if rule_errors is not None:
+        report_data["Rule Errors"] = rule_errors
+    if errors is not None:
+        report_data["Errors"] = errors
+    with compressed_io.open_output_text(json_path) as f:
+        json.dump(report_data, f, indent=4, default=json_default)
+
+def rule_error_counts(plan, hits):
+    """
+    [{"Rule", "Column", "Errors"}] for every check validate_columns ran, in the order it
+    emitted their errors; hits is its hits_out. A later partial run uses these counts to
+    tell which of this run's errors each rule produced.
+    """
+    return [{"Rule": check["id"], "Column": col, "Errors": len(check_hits)}
+            for col, column_hits in hits.items() for check, check_hits in zip(plan[col], column_hits)]
+
+def estimate_row_bytes(input_csv, plan, sample_rows=SAMPLE_ROWS):
+    """
+    (rows, peak bytes, errors) of reading and validating the first sample_rows rows of
+    input_csv with plan, the peak measured with tracemalloc.
+    """
+    import tracemalloc
+
+    import pandas as pd
+
+    tracemalloc.start()
     try:
-        with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
-            # Summary sheet
-            pd.DataFrame([summary_data]).to_excel(writer, sheet_name="Summary", index=False)
-            
-            # Errors sheet
-            df_errors = pd.DataFrame(errors)
-            if not df_errors.empty:
-                df_errors = df_errors.sort_values(by="Error")
-                df_errors.to_excel(writer, sheet_name="Errors", index=False)
-            else:
-                pd.DataFrame(columns=["Row", "Column", "Error", "Value"]).to_excel(writer, sheet_name="Errors", index=False)
-            
-            # Corrected Data sheet (mimics _Corrected_Subscribers.csv)
-            cleaned_df.to_excel(writer, sheet_name="Corrected Data", index=False)
-            
-            # Apply yellow highlighting to flagged cells
-            wb = writer.book
-            ws = wb["Corrected Data"]
-            yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-            col_map = {col: idx + 1 for idx, col in enumerate(cleaned_df.columns)}
-            for (row_idx, col_name), _ in flagged_cells.items():
-                excel_col = openpyxl.utils.get_column_letter(col_map[col_name])
-                excel_row = row_idx + 2  # +1 for header, +1 for 1-based indexing
-                ws[f"{excel_col}{excel_row}"].fill = yellow_fill
-            
-        if not os.path.isfile(excel_path):
-            errors.append({
-                "Row": "N/A",
-                "Column": "N/A",
-                "Error": f"Failed to save {excel_path}. File does not exist.",
-                "Value": "N/A"
-            })
-            save_errors_and_exit(errors, company_id, os.path.basename(input_csv))
+        header = read_header(input_csv)
+        with compressed_io.open_binary(input_csv) as f:
+            df = pd.read_csv(f, dtype=ingest_dtypes(header), nrows=sample_rows)
+        df.insert(0, "OrigRowNum", range(1, len(df) + 1))
+        sample_df = df.rename(columns={col: col.lower() for col in df.columns if col.lower() in EXPECTED_COLUMNS})
+        sample_errors = []
+        validate_columns(sample_df, sample_errors, FlaggedCells(len(sample_df), EXPECTED_COLUMNS), plan)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return len(df), peak, len(sample_errors)
+
+def build_rules(company_id, geo_boundaries=None, rule_options=None, subscriber_index_path=None):
+    """RULES with rule_options applied and the optional geo and cross-submission rules added."""
+    rules = with_options(RULES, rule_options or {})
+    if geo_boundaries:
+        rules.append(point_in_state_rule(geo_boundaries))
+    if subscriber_index_path:
+        rules.append(cross_submission_rule(subscriber_index_path, company_id))
+    return rules
+
+def write_artifact(path, write, on_written=None):
+    """
+    Run write(path) and check the file exists. Returns (seconds, error) where error is
+    the error dict to report, or None on success. on_written(path) is called on success.
+    """
+    start = time.perf_counter()
+    try:
+        write(path)
+        if not os.path.isfile(path):
+            error = f"Failed to save {path}. File does not exist."
+        else:
+            error = None
+            if on_written:
+                on_written(path)
     except Exception as e:
-        errors.append({
-            "Row": "N/A",
-            "Column": "N/A",
-            "Error": f"Error saving {excel_path}: {str(e)}",
-            "Value": "N/A"
-        })
-        save_errors_and_exit(errors, company_id, os.path.basename(input_csv))
+        error = f"Error saving {path}: {str(e)}"
+    seconds = time.perf_counter() - start
+    if error:
+        return seconds, {"Row": "N/A", "Column": "N/A", "Error": error, "Value": "N/A"}
+    return seconds, None
+
+def write_artifacts(artifacts, errors, company_id, original_filename, on_written=None, workers=ARTIFACT_WORKERS):
+    """
+    Write independent output files concurrently. artifacts is a list of (path, write)
+    pairs; write(path) must only read shared data. Prints each file's write time. If any
+    file fails, its errors are added in artifact order and the run ends through
+    save_errors_and_exit, as when the files were written one after another.
+    on_written(path) is called from the writer thread as each file is finished. workers is
+    the number of files written at once.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(write_artifact, path, write, on_written) for path, write in artifacts]
+        results = [future.result() for future in futures]
+    failed = False
+    for (path, _), (seconds, error) in zip(artifacts, results):
+        if error:
+            errors.append(error)
+            failed = True
+        else:
+            print(f"Successfully saved: {path} ({seconds:.2f}s)")
+    if failed:
+        save_errors_and_exit(errors, company_id, original_filename)
+
+def read_sample_csv(input_csv, sample_size=None, sample_fraction=None, seed=None):
+    """
+    Stream input_csv once and draw a uniform random sample of its data rows.
+    sample_size keeps exactly N rows via reservoir sampling (Algorithm L);
+    sample_fraction keeps each row independently with probability f.
+    Returns (sample_df, orig_row_nums, total_rows). The sampled records are
+    re-parsed with pd.read_csv so values match a full read exactly.
+    """
+    import pandas as pd
+
+    rng = random.Random(seed)
+    sample = []  # List of (orig_row_num, record)
+    total_rows = 0
+    with compressed_io.open_text(input_csv) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("No columns to parse from file")
+        records = (record for record in reader if record)  # pd.read_csv skips blank lines
+        if sample_size is not None:
+            # Algorithm L: draw skip lengths instead of a random number per row
+            w = math.exp(math.log(rng.random() or 1e-300) / sample_size)
+            next_row = sample_size + math.floor(math.log(rng.random() or 1e-300) / math.log1p(-w)) + 1
+            for orig_row_num, record in enumerate(records, start=1):
+                total_rows = orig_row_num
+                if orig_row_num <= sample_size:
+                    sample.append((orig_row_num, record))
+                elif orig_row_num == next_row:
+                    sample[rng.randrange(sample_size)] = (orig_row_num, record)
+                    w *= math.exp(math.log(rng.random() or 1e-300) / sample_size)
+                    next_row += math.floor(math.log(rng.random() or 1e-300) / math.log1p(-w)) + 1
+        else:
+            for orig_row_num, record in enumerate(records, start=1):
+                total_rows = orig_row_num
+                if rng.random() < sample_fraction:
+                    sample.append((orig_row_num, record))
+    sample.sort(key=lambda item: item[0])
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    writer.writerows(record for _, record in sample)
+    buffer.seek(0)
+    sample_df = pd.read_csv(buffer, dtype=ingest_dtypes(header))
+    return sample_df, [orig_row_num for orig_row_num, _ in sample], total_rows
 
-    # JSON report
+def ingest_dtypes(header):
+    """
+    dtype map for pd.read_csv: "category" for the low-cardinality CATEGORICAL_COLUMNS
+    (matched case-insensitively against the header) and str for every other column.
+    """
+    return defaultdict(lambda: str, {col: "category" for col in header if col.lower() in CATEGORICAL_COLUMNS})
+
+def read_header(input_csv):
+    with compressed_io.open_text(input_csv) as f:
+        return next(csv.reader(f), [])
+
+def wilson_interval(successes, trials, population=None, z=1.96):
+    """
+    Wilson score interval for a proportion, with a finite population correction
+    when the sample was drawn without replacement from population rows.
+    """
+    if trials == 0:
+        return 0.0, 0.0
+    p = successes / trials
+    n = trials
+    if population:
+        if trials >= population:
+            return p, p
+        n = trials * (population - 1) / (population - trials)
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+def generate_sample_report(start_time, stop_time, errors, flagged_cells, plan, hits, sample_df, total_rows, sample_method,
+                           input_csv, company_id):
+    """
+    Generate the JSON pre-flight report for a sampled run in the company_id directory.
+    Reports estimated failed-row and per-rule error rates with 95% confidence intervals,
+    extrapolated to the full file. Rates are per rule id, counted from hits (validate_columns'
+    hits_out). cross_row rules only see the rows in the sample, so theirs are lower bounds
+    and are not extrapolated.
+    """
+    import json
+
+    base_filename = compressed_io.base_name(input_csv)
+    json_path = os.path.join(company_id, f"{base_filename}_VR.json")
+
+    sample_rows = len(sample_df)
+    failed_rows = flagged_cells.failed_rows()
+    failed_low, failed_high = wilson_interval(failed_rows, sample_rows, total_rows)
+    failed_rate = failed_rows / sample_rows if sample_rows else 0.0
+
+    # Sample rows failing each rule that ran
+    rule_rates = []
+    for col, column_hits in hits.items():
+        for check, check_hits in zip(plan[col], column_hits):
+            rows = len({idx for idx, _ in check_hits})
+            rate = rows / sample_rows if sample_rows else 0.0
+            rule_rate = {"Rule": check["id"], "Column": col, "Sample Rows": rows, "Estimated Error Rate": rate}
+            if check["cross_row"]:
+                rule_rate["Lower Bound"] = True
+            else:
+                low, high = wilson_interval(rows, sample_rows, total_rows)
+                rule_rate.update({"Error Rate CI": [low, high], "Estimated Rows": round(rate * total_rows)})
+            rule_rates.append(rule_rate)
+    rule_rates.sort(key=lambda rule: rule["Sample Rows"], reverse=True)
+    lower_bounds = [rule["Rule"] for rule in rule_rates if rule.get("Lower Bound")]
+
+    report_data = {
+        "Company Name": company_id,
+        "Company ID": company_id,
+        "Input File": os.path.basename(input_csv),
+        "Validation Status": "Sampled",
+        "Start Time": datetime.fromtimestamp(start_time).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+        "Stop Time": datetime.fromtimestamp(stop_time).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+        "Duration (seconds)": stop_time - start_time,
+        "Total Rows": total_rows,
+        "Sample": {
+            "Method": sample_method,
+            "Sample Rows": sample_rows,
+            "Sample Fraction": sample_rows / total_rows if total_rows else 0.0,
+            "Confidence Level": 0.95,
+            "Sample Failed Rows": failed_rows,
+            "Estimated Failed Row Rate": failed_rate,
+            "Failed Row Rate CI": [failed_low, failed_high],
+            "Estimated Failed Rows": round(failed_rate * total_rows),
+            "Estimated Failed Rows CI": [round(failed_low * total_rows), round(failed_high * total_rows)],
+            "Rule Error Rates": rule_rates,
+            "Note": (f"{', '.join(lower_bounds)} compare rows with each other and only see the sample, so their "
+                     "rates are lower bounds and are not extrapolated." if lower_bounds else None)
+        },
+        "Errors": errors
+    }
     try:
-        report_data = summary_data.copy()
-        report_data["Errors"] = errors
         with open(json_path, "w") as f:
-            json.dump(report_data, f, indent=4)
+            json.dump(report_data, f, indent=4, default=json_default)
         if not os.path.isfile(json_path):
             errors.append({
                 "Row": "N/A",
@@ -164,39 +446,15 @@ def generate_validation_report(start_time, stop_time, errors, flagged_cells, cle
         })
         save_errors_and_exit(errors, company_id, os.path.basename(input_csv))
 
-    return excel_path, json_path
+    return json_path
 
-def validate_subscriber_file(input_csv, company_id):
-    # Initialize error list and start time
+def check_header_columns(actual_columns):
+    """
+    Step 5 header checks. actual_columns includes the inserted OrigRowNum column.
+    Returns (errors, missing_columns).
+    """
     errors = []
-    start_time = time.time()  # Added for tracking processing time
-
-    # Step 1: Create or overwrite the company_id directory
-    if os.path.exists(company_id):
-        shutil.rmtree(company_id)
-    os.makedirs(company_id)
-
-    # Step 2: Copy input CSV to company_id with original filename
-    original_filename = os.path.basename(input_csv)
-    output_original_csv = os.path.join(company_id, original_filename)
-    shutil.copyfile(input_csv, output_original_csv)
-
-    # Step 3: Read the input CSV
-    try:
-        df = pd.read_csv(input_csv, dtype=str)
-        print(f"Read CSV successfully: {len(df)} rows")
-    except Exception as e:
-        errors.append({"Row": "N/A", "Column": "N/A", "Error": f"Failed to read CSV: {str(e)}", "Value": "N/A"})
-        save_errors_and_exit(errors, company_id, original_filename)
-        return
-
-    # Step 4: Insert OrigRowNum column
-    df.insert(0, "OrigRowNum", range(1, len(df) + 1))
-
-    # Step 5: Validate required columns and check for case-sensitive headers
-    required_columns = EXPECTED_COLUMNS
-    input_columns = df.columns.str.lower().tolist()
-    actual_columns = df.columns.tolist()
+    input_columns = [col.lower() for col in actual_columns]
     # Check for case-sensitive header mismatches
     uppercase_headers = [(col, expected) for col in actual_columns for expected in EXPECTED_COLUMNS 
                         if col.lower() == expected.lower() and col != expected]
@@ -207,7 +465,7 @@ def validate_subscriber_file(input_csv, company_id):
             "Error": f"Case-sensitive headers detected. Expected {EXPECTED_COLUMNS}, got {actual_columns}",
             "Value": "N/A"
         })
-    missing_columns = [col for col in required_columns if col not in input_columns]
+    missing_columns = [col for col in EXPECTED_COLUMNS if col not in input_columns]
     if missing_columns:
         errors.append({
             "Row": "N/A",
@@ -215,6 +473,162 @@ def validate_subscriber_file(input_csv, company_id):
             "Error": f"The following required columns are missing: {', '.join(missing_columns)}",
             "Value": "N/A"
         })
+    return errors, missing_columns
+
+def check_headers(input_csv):
+    """
+    Fast path for --check-headers: read only the first line of input_csv with the
+    standard library and return the same header errors Step 5 would report.
+    """
+    errors, _ = check_header_columns(["OrigRowNum"] + read_header(input_csv))
+    return errors
+
+def validate_subscriber_file(input_csv, company_id, sample_size=None, sample_fraction=None, seed=None, geo_boundaries=None,
+                             standardize_addresses=False, rule_options=None, subscriber_index_path=None,
+                             include_raw_lines=False, large_report=False, compress=None, progress=None, resume=False,
+                             summary_only=False, rule_patterns=None, columns=None, memory_budget=None,
+                             checkpointing=False):
+    """
+    progress is an optional progress.Progress that is told each phase as the run goes.
+    With checkpointing, a full run saves a checkpoint as it goes so it can be resumed.
+    With resume, a checkpoint left in company_id by an interrupted run of the same input
+    and options is continued instead of starting over; a new run is checkpointed.
+    With summary_only, errors are reported only as the aggregated error summary: no
+    _Errors.csv, Errors sheet or per-row "Errors" list in _VR.json.
+    With rule_patterns or columns, only the selected rules run and their errors are merged
+    into the previous run's (see validate_selected_rules).
+    memory_budget is an optional memory_budget.MemoryBudget; full runs estimate their memory
+    from a sample of the input and choose how the output files are written to stay under it.
+    """
+    import pandas as pd
+
+    if memory_budget and (rule_patterns is not None or columns is not None or sample_size is not None
+                          or sample_fraction is not None):
+        print("Note: --memory-budget applies to full runs; sample and partial runs ignore it")
+        memory_budget = None
+    if rule_patterns is not None or columns is not None:
+        validate_selected_rules(input_csv, company_id, rule_patterns, columns, geo_boundaries, standardize_addresses,
+                                rule_options, subscriber_index_path, large_report, compress, progress, summary_only)
+        return
+
+    # Initialize error list and start time
+    errors = []
+    start_time = time.time()  # Added for tracking processing time
+    sampling = sample_size is not None or sample_fraction is not None
+
+    # Step 1: Create or overwrite the company_id directory. Checkpointed full runs record each
+    # validated column and finished output file there (see checkpoint.py); with resume, the
+    # directory of an interrupted run with the same fingerprint is kept and continued.
+    checkpoint = None
+    checkpointing = (checkpointing or resume) and not sampling
+    if checkpointing:
+        fingerprint = input_fingerprint(input_csv, {
+            "Rules": [rule["id"] for rule in RULES],
+            "Geo Boundaries": geo_boundaries,
+            "Standardize Addresses": standardize_addresses,
+            "Rule Options": rule_options,
+            "Subscriber Index": subscriber_index_path,
+            "Raw Lines": include_raw_lines,
+            "Large Report": large_report,
+            "Compress": compress,
+            "Summary Only": summary_only,
+            "Memory Budget": memory_budget.budget if memory_budget else None,
+        })
+        if resume:
+            checkpoint = Checkpoint.load(company_id, fingerprint)
+            if checkpoint is None:
+                print(f"No checkpoint of this input and options in {company_id}/; starting a new run")
+    if checkpoint:
+        start_time = checkpoint.manifest["Start Time"]
+        print(f"Resuming: {len(checkpoint.manifest['Columns'])} columns validated and "
+              f"{len(checkpoint.manifest['Artifacts'])} output files written before the interruption")
+    else:
+        if os.path.exists(company_id):
+            shutil.rmtree(company_id)
+        os.makedirs(company_id)
+        if checkpointing:
+            checkpoint = Checkpoint(company_id, fingerprint, start_time)
+            checkpoint.start()
+
+    # Step 2: Copy input CSV to company_id with original filename (skipped for sample pre-flight runs).
+    # Compressed inputs (.gz, .zip, .zst) are kept compressed and decompressed while reading.
+    original_filename = os.path.basename(input_csv)
+    if not sampling:
+        output_original_csv = os.path.join(company_id, original_filename)
+        shutil.copyfile(input_csv, output_original_csv)
+
+    # Step 2a: Compile the rules. With a memory budget, read and validate the first rows under
+    # tracemalloc to estimate the memory per row, and plan the run to fit the budget.
+    plan = get_plan()
+    if geo_boundaries or rule_options or subscriber_index_path:
+        plan = compile_plan(build_rules(company_id, geo_boundaries, rule_options, subscriber_index_path))
+    header = read_header(input_csv)
+    if memory_budget and not check_header_columns(["OrigRowNum"] + header)[1]:
+        sample_rows, sample_peak, sample_errors = estimate_row_bytes(input_csv, plan)
+        rows = count_rows(input_csv)
+        # Files the writers can overlap on: _Mod_1, _Error_Summary, _Corrected_Subscribers and _VR.xlsx,
+        # plus _Errors and _Address_Corrections when written (_VR.json is written after them)
+        output_files = 4 + (not summary_only) + bool(standardize_addresses)
+        fits = memory_budget.plan(rows, len(EXPECTED_COLUMNS) + 1, sample_rows, sample_peak, sample_errors,
+                                  output_files, summary_only)
+        estimate = memory_budget.estimate
+        print(f"Memory budget {format_size(memory_budget.budget)}: about {estimate['Estimated Bytes Per Row']:,} bytes per row "
+              f"for {rows:,} rows, estimated peak {format_size(estimate['Estimated Peak Bytes'])}; "
+              f"{'streamed' if memory_budget.stream_excel else 'in-memory'} Excel report, "
+              f"{memory_budget.workers} output files at once ({memory_budget.workers_reason}), "
+              f"{memory_budget.chunk:,}-row chunks")
+        if not fits:
+            print("Warning: the data and its errors alone are estimated to exceed the budget; "
+                  "consider --summary-only or splitting the file with mapreduce.py")
+
+    # Step 3: Read the input CSV, or a uniform random sample of its rows
+    if progress:
+        progress.set_phase("read")
+    try:
+        if sampling:
+            df, orig_row_nums, total_rows = read_sample_csv(input_csv, sample_size, sample_fraction, seed)
+            print(f"Sampled CSV successfully: {len(df)} of {total_rows} rows")
+        else:
+            with compressed_io.open_binary(input_csv) as f:
+                df = pd.read_csv(f, dtype=ingest_dtypes(header))
+            orig_row_nums = range(1, len(df) + 1)
+            print(f"Read CSV successfully: {len(df)} rows")
+    except Exception as e:
+        errors.append({"Row": "N/A", "Column": "N/A", "Error": f"Failed to read CSV: {str(e)}", "Value": "N/A"})
+        save_errors_and_exit(errors, company_id, original_filename)
+        return
+
+    # Step 4: Insert OrigRowNum column (sampled rows keep their position in the full file)
+    df.insert(0, "OrigRowNum", orig_row_nums)
+
+    # Step 4a: Index the byte offset of every row in the original copy, so raw lines can be
+    # fetched by OrigRowNum without re-reading the file. Offsets into a compressed copy would
+    # not allow random access, so compressed inputs are not indexed. The index is a by-product:
+    # if it cannot be built, validation goes on without it.
+    base_filename = compressed_io.base_name(original_filename)
+    row_index_path = os.path.join(company_id, f"{base_filename}_RowIndex.npy")
+    indexed = not sampling and not compressed_io.codec_of(input_csv)
+    if include_raw_lines and not indexed and not sampling:
+        print("Note: --raw-lines needs an uncompressed input; raw lines are not included")
+        include_raw_lines = False
+    if indexed:
+        import row_index
+
+        if progress:
+            progress.set_phase("row index", total_rows=len(df))
+        try:
+            row_index.build_row_index(output_original_csv, row_index_path, len(df))
+        except Exception as e:
+            print(f"Note: could not build {row_index_path} ({e}); raw lines are not included")
+            if os.path.exists(row_index_path):
+                os.remove(row_index_path)
+            indexed = include_raw_lines = False
+
+    # Step 5: Validate required columns and check for case-sensitive headers
+    required_columns = EXPECTED_COLUMNS
+    header_errors, missing_columns = check_header_columns(df.columns.tolist())
+    errors.extend(header_errors)
+    if missing_columns:
         save_errors_and_exit(errors, company_id, original_filename)
         return
 
@@ -233,489 +647,425 @@ def validate_subscriber_file(input_csv, company_id):
         })
         save_errors_and_exit(errors, company_id, original_filename)
         return
+    del df  # cleaned_df is a copy; the raw frame is not needed from here on
+
+    # Step 6a: Optionally rewrite addresses into canonical USPS form before validation.
+    # Rules and the corrected outputs use corrected_df; _Mod_1.csv keeps the original values.
+    corrected_df = cleaned_df
+    if standardize_addresses:
+        corrected_address, address_changed = standardize_column(cleaned_df["address"])
+        corrected_df = cleaned_df.assign(address=corrected_address)
+        print(f"Standardized addresses: {int(address_changed.sum())} rows changed, {len(corrected_address.categories)} distinct addresses")
 
     # Step 7: Column-based validation
-    flagged_cells = {}  # Dictionary to track cells to highlight yellow: {(row, col): error_message}
-    for col in cleaned_df.columns:
-        if col == "OrigRowNum":
-            continue
-        values = cleaned_df[col].fillna("").astype(str).str.strip()
-
-        if col == "customer":
-            # Check for commas
-            has_comma = values.str.contains(",", na=False)
-            for idx, (val, has) in enumerate(zip(values, has_comma)):
-                if has:
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": "Customer ID contains a comma",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = "Customer ID contains a comma"
-            # Check for duplicates
-            duplicates = values[values.duplicated(keep=False)]
-            for val in duplicates.unique():
-                dup_indices = values[values == val].index
-                for idx in dup_indices:
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": "Duplicate customer ID",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = "Duplicate customer ID"
-
-        elif col in ["lat", "lon"]:
-            # Check for numeric or blank
-            is_numeric = values.apply(lambda x: x == "" or pd.isna(x) or is_float(x))
-            for idx, (val, valid) in enumerate(zip(values, is_numeric)):
-                if val and not valid:
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": f"{col.capitalize()} must be a number or blank",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = f"{col.capitalize()} must be a number or blank"
-                elif val:
-                    try:
-                        float_val = float(val)
-                        if col == "lat" and not (-90 <= float_val <= 90):
-                            errors.append({
-                                "Row": cleaned_df["OrigRowNum"][idx],
-                                "Column": col,
-                                "Error": "Latitude must be between -90 and 90",
-                                "Value": val
-                            })
-                            flagged_cells[(idx, col)] = "Latitude must be between -90 and 90"
-                        elif col == "lon":
-                            state = cleaned_df["state"].iloc[idx].strip().upper() if "state" in cleaned_df else ""
-                            if state in STATE_LON_RANGES:
-                                lon_min, lon_max = STATE_LON_RANGES[state]
-                                if state in ["GU", "MP"]:
-                                    if not (lon_min <= float_val <= lon_max):
-                                        errors.append({
-                                            "Row": cleaned_df["OrigRowNum"][idx],
-                                            "Column": col,
-                                            "Error": f"Longitude for {state} must be between {lon_min} and {lon_max}",
-                                            "Value": val
-                                        })
-                                        flagged_cells[(idx, col)] = f"Longitude for {state} must be between {lon_min} and {lon_max}"
-                                else:
-                                    if float_val > 0:
-                                        errors.append({
-                                            "Row": cleaned_df["OrigRowNum"][idx],
-                                            "Column": col,
-                                            "Error": f"Longitude for {state} must be negative",
-                                            "Value": val
-                                        })
-                                        flagged_cells[(idx, col)] = f"Longitude for {state} must be negative"
-                                    elif not (lon_min <= float_val <= lon_max):
-                                        errors.append({
-                                            "Row": cleaned_df["OrigRowNum"][idx],
-                                            "Column": col,
-                                            "Error": f"Longitude for {state} must be between {lon_min} and {lon_max}",
-                                            "Value": val
-                                        })
-                                        flagged_cells[(idx, col)] = f"Longitude for {state} must be between {lon_min} and {lon_max}"
-                    except ValueError:
-                        pass  # Already caught by is_numeric check
-
-        elif col == "address":
-            # Check for blank or whitespace
-            is_blank = values == ""
-            for idx, (val, blank) in enumerate(zip(values, is_blank)):
-                if blank:
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": "Blank or whitespace-only value",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = "Blank or whitespace-only value"
-
-            # Check for PO Box
-            has_po_box = values.str.contains(PO_BOX, case=False, na=False, regex=True)
-            for idx, (val, has) in enumerate(zip(values, has_po_box)):
-                if has:
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": "Address must be a physical address, PO Boxes are not allowed",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = "Address must be a physical address, PO Boxes are not allowed"
-
-            # Check for rural routes
-            has_rural_route = values.str.contains(RURAL_ROUTES, case=False, na=False, regex=True)
-            for idx, (val, has) in enumerate(zip(values, has_rural_route)):
-                if has:
-                    forbidden = re.search(FORBIDDEN_CHARS, val)
-                    if forbidden:
-                        errors.append({
-                            "Row": cleaned_df["OrigRowNum"][idx],
-                            "Column": col,
-                            "Error": f"Address contains forbidden character: {forbidden.group()}",
-                            "Value": val
-                        })
-                        flagged_cells[(idx, col)] = f"Address contains forbidden character: {forbidden.group()}"
-                    continue  # Skip further checks for rural routes
-
-            # Check for forbidden characters
-            for idx, val in enumerate(values):
-                forbidden = re.search(FORBIDDEN_CHARS, val)
-                if forbidden:
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": f"Address contains forbidden character: {forbidden.group()}",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = f"Address contains forbidden character: {forbidden.group()}"
-
-            # Check for void/_Diamond
-            has_void_diamond = values.str.contains(r"void\s+_upload|void\s+_Diamond", case=False, na=False, regex=True)
-            for idx, (val, has) in enumerate(zip(values, has_void_diamond)):
-                if has:
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": "Contains invalid void/_Diamond code block",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = "Contains invalid void/_Diamond code block"
-
-            # Check for specific road patterns
-            has_specific_road = values.str.contains(SPECIFIC_ROAD_PATTERN, case=False, na=False, regex=True)
-            # Check for street endings and house numbers
-            for idx, val in enumerate(values):
-                if has_specific_road.iloc[idx]:
-                    continue
-                street_ending_match = re.search(rf"\s+(?:{STREET_ENDINGS})\.?\s*(\S.*)?$", val, re.IGNORECASE)
-                if not street_ending_match:
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": "Address does not match expected road or street format",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = "Address does not match expected road or street format"
-                    continue
-                ending = None
-                for multi_word in MULTI_WORD_ENDINGS.split("|"):
-                    if re.search(rf"\s+{multi_word}\.?\s*(\S.*)?$", val, re.IGNORECASE):
-                        ending = re.search(rf"\s+({multi_word})\.?\s*(\S.*)?$", val, re.IGNORECASE).group(1)
-                        break
-                if not ending:
-                    for single_word in SINGLE_WORD_ENDINGS.split("|"):
-                        if re.search(rf"\s+{single_word}\.?\s*(\S.*)?$", val, re.IGNORECASE):
-                            ending = re.search(rf"\s+({single_word})\.?\s*(\S.*)?$", val, re.IGNORECASE).group(1)
-                            break
-                if not re.search(r"^\d+", val.split(ending)[0].strip()):
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": f"Address must include a house number before ending: {ending}",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = f"Address must include a house number before ending: {ending}"
-                    continue
-                extra = street_ending_match.group(1).strip() if street_ending_match.group(1) else ""
-                if extra:
-                    is_special_ending = (
-                        ending.lower() in ["highway", "hwy", "county road", "county rd", "co rd", "state route", "sr",
-                                           "interstate", "i-", "farm to market", "farm road", "fm", "us", "us hwy", "pvt", "private road",
-                                           "county hwy", "ch", "county fm", "fm road", "fire district", "road", "rd",
-                                           "route c-", "c-", "route", "rs", "ky rs", "state hwy",
-                                           "az-", "ca-", "ct-", "de-", "fl-", "ga-", "id-", "il-", "in-", "k-",
-                                           "me-", "md-", "ma-", "m-", "mn-", "ms-", "nh-", "nj-", "nm-", "ny-",
-                                           "nc-", "oh-", "ok-", "or-", "pa-", "ri-", "sc-", "tn-", "ut-", "vt-",
-                                           "va-", "wa-", "wv-", "wi-", "wy-", "sh-", "carr", "pr", "cr"] or
-                        ending.lower().startswith(("route ", "county hwy ", "county fm ", "fm road ", "fire district ", "state hwy ", "ky rs ")) or
-                        ending == "CR"
-                    )
-                    if is_special_ending:
-                        if not re.match(
-                            r"^(?:[0-9]+(?:\s+(?:N|S|E|W|NE|NW|SE|SW|North|South|East|West|Northeast|Northwest|Southeast|Southwest))?$|^[0-9]+$|"
-                            r"[A-Za-z0-9\-]+(?:\s+(?:N|S|E|W|NE|NW|SE|SW|North|South|East|West|Northeast|Northwest|Southeast|Southwest))?|"
-                            r"[A-Za-z0-9\-]+[NSEW]{1,2}|"
-                            r"(?:Avenue|Ave|Av|Boulevard|Blvd|Circle|Cir|Cr|Court|Ct|Drive|Dr|Expressway|Expy|"
-                            r"Highway|Hwy|Lane|Ln|Parkway|Pkwy|Place|Pl|Road|Rd|Square|Sq|Street|St|Terrace|Ter|"
-                            r"Trail|Trl|Way|Wy|CR|SR|FM|US|Interstate|I-))$",
-                            extra, re.IGNORECASE
-                        ):
-                            errors.append({
-                                "Row": cleaned_df["OrigRowNum"][idx],
-                                "Column": col,
-                                "Error": f"Address may contain non-standard components after ending: {extra}",
-                                "Value": val
-                            })
-                            flagged_cells[(idx, col)] = f"Address may contain non-standard components after ending: {extra}"
-                    else:
-                        if not re.match(r"^(?:N|S|E|W|NE|NW|SE|SW|North|South|East|West|Northeast|Northwest|Southeast|Southwest|(?:N|S|E|W)\s+(?:N|S|E|W))$", extra, re.IGNORECASE):
-                            errors.append({
-                                "Row": cleaned_df["OrigRowNum"][idx],
-                                "Column": col,
-                                "Error": f"Address may contain non-standard components after ending: {extra}",
-                                "Value": val
-                            })
-                            flagged_cells[(idx, col)] = f"Address may contain non-standard components after ending: {extra}"
-
-        elif col in ["city", "state", "zip", "download", "upload", "voip_lines_quantity", "business_customer", "technology"]:
-            is_blank = values == ""
-            for idx, (val, blank) in enumerate(zip(values, is_blank)):
-                if blank and col not in ["lat", "lon"]:
-                    errors.append({
-                        "Row": cleaned_df["OrigRowNum"][idx],
-                        "Column": col,
-                        "Error": "Blank or whitespace-only value",
-                        "Value": val
-                    })
-                    flagged_cells[(idx, col)] = "Blank or whitespace-only value"
-
-            if col == "city":
-                has_digits = values.str.contains(r"[0-9]", na=False, regex=True)
-                for idx, (val, has) in enumerate(zip(values, has_digits)):
-                    if has:
-                        errors.append({
-                            "Row": cleaned_df["OrigRowNum"][idx],
-                            "Column": col,
-                            "Error": "City name contains digits",
-                            "Value": val
-                        })
-                        flagged_cells[(idx, col)] = "City name contains digits"
-
-            elif col == "state":
-                invalid_states = ~values.str.upper().isin(VALID_STATES)
-                for idx, (val, invalid) in enumerate(zip(values, invalid_states)):
-                    if invalid:
-                        errors.append({
-                            "Row": cleaned_df["OrigRowNum"][idx],
-                            "Column": col,
-                            "Error": f"Invalid state. Must be one of {VALID_STATES}",
-                            "Value": val
-                        })
-                        flagged_cells[(idx, col)] = f"Invalid state. Must be one of {VALID_STATES}"
-
-            elif col == "zip":
-                valid_zip = values.str.match(r"^\d{5}(-\d{4})?$")
-                for idx, (val, valid) in enumerate(zip(values, valid_zip)):
-                    if not valid and val:
-                        errors.append({
-                            "Row": cleaned_df["OrigRowNum"][idx],
-                            "Column": col,
-                            "Error": "Invalid ZIP code format. Must be 12345 or 12345-6789",
-                            "Value": val
-                        })
-                        flagged_cells[(idx, col)] = "Invalid ZIP code format. Must be 12345 or 12345-6789"
-
-            elif col in ["download", "upload"]:
-                is_numeric = values.apply(lambda x: x == "" or pd.isna(x) or is_float(x))
-                for idx, (val, valid) in enumerate(zip(values, is_numeric)):
-                    if not valid and val:
-                        errors.append({
-                            "Row": cleaned_df["OrigRowNum"][idx],
-                            "Column": col,
-                            "Error": f"{col.capitalize()} speed must be a number",
-                            "Value": val
-                        })
-                        flagged_cells[(idx, col)] = f"{col.capitalize()} speed must be a number"
-                    elif val:
-                        try:
-                            speed = float(val)
-                            if speed <= 0:
-                                errors.append({
-                                    "Row": cleaned_df["OrigRowNum"][idx],
-                                    "Column": col,
-                                    "Error": f"{col.capitalize()} speed must be greater than 0",
-                                    "Value": val
-                                })
-                                flagged_cells[(idx, col)] = f"{col.capitalize()} speed must be greater than 0"
-                            if speed > 3000:
-                                errors.append({
-                                    "Row": cleaned_df["OrigRowNum"][idx],
-                                    "Column": col,
-                                    "Error": f"{col.capitalize()} speed cannot exceed 3000 Mbps",
-                                    "Value": val
-                                })
-                                flagged_cells[(idx, col)] = f"{col.capitalize()} speed cannot exceed 3000 Mbps"
-                        except ValueError:
-                            pass  # Already caught by is_numeric
-
-            elif col == "voip_lines_quantity":
-                is_valid_integer = values.apply(lambda x: x == "" or pd.isna(x) or is_integer(x))
-                for idx, (val, valid) in enumerate(zip(values, is_valid_integer)):
-                    if not valid and val:
-                        errors.append({
-                            "Row": cleaned_df["OrigRowNum"][idx],
-                            "Column": col,
-                            "Error": "VOIP lines quantity must be an integer",
-                            "Value": val
-                        })
-                        flagged_cells[(idx, col)] = "VOIP lines quantity must be an integer"
-                    elif val:
-                        try:
-                            qty = int(val)
-                            if qty < 0:
-                                errors.append({
-                                    "Row": cleaned_df["OrigRowNum"][idx],
-                                    "Column": col,
-                                    "Error": "VOIP lines quantity must be non-negative",
-                                    "Value": val
-                                })
-                                flagged_cells[(idx, col)] = "VOIP lines quantity must be non-negative"
-                        except ValueError:
-                            pass  # Already caught by is_valid_integer
-
-            elif col == "business_customer":
-                valid_business = values.isin(["0", "1"])
-                for idx, (val, valid) in enumerate(zip(values, valid_business)):
-                    if not valid and val:
-                        errors.append({
-                            "Row": cleaned_df["OrigRowNum"][idx],
-                            "Column": col,
-                            "Error": "Business customer must be 0 or 1",
-                            "Value": val
-                        })
-                        flagged_cells[(idx, col)] = "Business customer must be 0 or 1"
-
-            elif col == "technology":
-                valid_tech = values.str.lower().isin(VALID_TECHNOLOGIES)
-                for idx, (val, valid) in enumerate(zip(values, valid_tech)):
-                    if not valid and val:
-                        errors.append({
-                            "Row": cleaned_df["OrigRowNum"][idx],
-                            "Column": col,
-                            "Error": f"Invalid technology. Must be one of {VALID_TECHNOLOGIES}",
-                            "Value": val
-                        })
-                        flagged_cells[(idx, col)] = f"Invalid technology. Must be one of {VALID_TECHNOLOGIES}"
+    flagged_cells = FlaggedCells(len(corrected_df), EXPECTED_COLUMNS)  # Cells to highlight yellow and the message of each
+    details = {}  # Extra report sections from the rules, e.g. "Stacked Locations"
+    hits = {}
+    validate_columns(corrected_df, errors, flagged_cells, plan, details, progress, checkpoint, hits)
+    rule_errors = rule_error_counts(plan, hits)
+
+    if sampling:
+        sample_method = "reservoir" if sample_size is not None else "bernoulli"
+        json_path = generate_sample_report(start_time, time.time(), errors, flagged_cells, plan, hits, corrected_df, total_rows,
+                                           sample_method, input_csv, company_id)
+        print(f"Sample report saved: JSON={json_path}")
+        print(f"Sample rows: {len(cleaned_df)} of {total_rows}, Failed sample rows: {flagged_cells.failed_rows()}")
+        return
 
     # Calculate failed_rows for reporting
-    failed_rows = len(set(row_idx for (row_idx, col_name) in flagged_cells))
+    if progress:
+        progress.set_phase("write")
+    failed_rows = flagged_cells.failed_rows()
 
-    # Step 8: Save cleaned DataFrame
-    base_filename = os.path.splitext(original_filename)[0]
-    output_cleantitles_csv = os.path.join(company_id, f"{base_filename}_Mod_1.csv")
-    try:
-        cleaned_df.to_csv(output_cleantitles_csv, index=False)
-        if os.path.isfile(output_cleantitles_csv):
-            print(f"Successfully saved: {output_cleantitles_csv}")
-        else:
-            errors.append({
-                "Row": "N/A",
-                "Column": "N/A",
-                "Error": f"Failed to save {output_cleantitles_csv}. File does not exist.",
-                "Value": "N/A"
-            })
-            save_errors_and_exit(errors, company_id, original_filename)
-            return
-    except Exception as e:
-        errors.append({
-            "Row": "N/A",
-            "Column": "N/A",
-            "Error": f"Error saving {output_cleantitles_csv}: {str(e)}",
-            "Value": "N/A"
-        })
-        save_errors_and_exit(errors, company_id, original_filename)
-        return
+    # Steps 8-11: Write the output files. They only read the validation results, so they
+    # are written concurrently; any failure is reported through save_errors_and_exit.
+    # With compress, the CSV and JSON outputs get the codec's extension and pandas compresses them.
+    output_cleantitles_csv = compressed_io.output_path(os.path.join(company_id, f"{base_filename}_Mod_1.csv"), compress)
+    errors_csv_path = compressed_io.output_path(os.path.join(company_id, f"{base_filename}_Errors.csv"), compress)
+    error_summary_csv_path = compressed_io.output_path(os.path.join(company_id, f"{base_filename}_Error_Summary.csv"), compress)
+    corrected_csv_path = compressed_io.output_path(os.path.join(company_id, f"{base_filename}_Corrected_Subscribers.csv"), compress)
+    corrections_csv_path = compressed_io.output_path(os.path.join(company_id, f"{base_filename}_Address_Corrections.csv"), compress)
+    excel_path = os.path.join(company_id, f"{base_filename}_VR.xlsx")
+    json_path = compressed_io.output_path(os.path.join(company_id, f"{base_filename}_VR.json"), compress)
+    summary_data = report_summary(start_time, time.time(), errors, flagged_cells, corrected_df, input_csv, company_id)
+    # Errors grouped by column, message and normalized value, with counts, row ranges and
+    # exemplar rows. With summary_only this replaces the per-row errors in every output.
+    error_summary = summarize_errors(errors)
+    error_table = summary_table(error_summary)
+    df_errors = None if summary_only else sorted_errors_df(errors)
+    if include_raw_lines:
+        # Raw source line of each error's row; file-level errors ("N/A") get an empty string
+        rows = pd.to_numeric(df_errors["Row"], errors="coerce")
+        raw = pd.Series("", index=df_errors.index, dtype=object)
+        raw[rows.notna()] = row_index.raw_lines(output_original_csv, row_index_path, rows.dropna().astype(int).tolist())
+        df_errors = df_errors.assign(**{"Raw Line": raw})
 
-    # Step 9: Save errors to CSV
-    errors_csv_path = os.path.join(company_id, f"{base_filename}_Errors.csv")
-    df_errors = pd.DataFrame(errors)
-    if not df_errors.empty:
-        df_errors = df_errors.sort_values(by="Error")
-        df_errors.to_csv(errors_csv_path, index=False)
+    def write_address_corrections(path):
+        pd.DataFrame({
+            "OrigRowNum": cleaned_df["OrigRowNum"][address_changed],
+            "Original Address": cleaned_df["address"][address_changed],
+            "Corrected Address": corrected_df["address"][address_changed]
+        }).to_csv(path, index=False)
+
+    artifacts = [
+        # Step 8: Save cleaned DataFrame
+        (output_cleantitles_csv, lambda path: cleaned_df.to_csv(path, index=False)),
+        # Step 9: Save the error summary, and the errors to CSV unless only the summary is wanted
+        (error_summary_csv_path, lambda path: error_table.to_csv(path, index=False)),
+    ]
+    if not summary_only:
+        artifacts.append((errors_csv_path, lambda path: df_errors.to_csv(path, index=False)))
+    artifacts += [
+        # Step 10: Save Corrected_Subscribers.csv. A CSV cannot carry cell colors, so flagged
+        # cells are highlighted in the "Corrected Data" sheet of _VR.xlsx instead.
+        (corrected_csv_path, lambda path: corrected_df.to_csv(path, index=False)),
+    ]
+    # Step 10a: Save the original and standardized value of every address that changed
+    if standardize_addresses:
+        artifacts.append((corrections_csv_path, write_address_corrections))
+    # Step 11: Generate validation reports (Excel and JSON)
+    # Past one worksheet's rows, on request, or when a memory budget leaves no room for the
+    # workbook in memory, the workbook is streamed and paged instead
+    excel_options = {"error_table": error_table}
+    if (large_report or (memory_budget and memory_budget.stream_excel)
+            or max(len(corrected_df), len(error_table if summary_only else df_errors)) >= EXCEL_MAX_ROWS):
+        write_excel = write_large_excel_report
+        if memory_budget:
+            excel_options["chunk_rows"] = memory_budget.chunk_rows
     else:
-        pd.DataFrame(columns=["Row", "Column", "Error", "Value"]).to_csv(errors_csv_path, index=False)
-    print(f"Errors CSV saved: {errors_csv_path}")
+        write_excel = write_excel_report
 
-    # Step 10: Save Corrected_Subscribers.csv with cell coloring
-    corrected_csv_path = os.path.join(company_id, f"{base_filename}_Corrected_Subscribers.csv")
-    try:
-        # Save DataFrame to CSV first
-        cleaned_df.to_csv(corrected_csv_path, index=False)
-        # Load with openpyxl to apply cell colors
-        wb = openpyxl.load_workbook(corrected_csv_path)
-        ws = wb.active
-        # Define fill colors
-        yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-        # Map column names to Excel columns (A=1, B=2, etc.)
-        col_map = {col: idx + 1 for idx, col in enumerate(cleaned_df.columns)}
-        # Apply yellow fill to flagged cells
-        for (row_idx, col_name), _ in flagged_cells.items():
-            excel_col = openpyxl.utils.get_column_letter(col_map[col_name])
-            excel_row = row_idx + 2  # +1 for header, +1 for 1-based indexing
-            ws[f"{excel_col}{excel_row}"].fill = yellow_fill
-        wb.save(corrected_csv_path)
-        if os.path.isfile(corrected_csv_path):
-            print(f"Successfully saved: {corrected_csv_path}")
-        else:
-            errors.append({
-                "Row": "N/A",
-                "Column": "N/A",
-                "Error": f"Failed to save {corrected_csv_path}. File does not exist.",
-                "Value": "N/A"
-            })
-            save_errors_and_exit(errors, company_id, original_filename)
-            return
-    except Exception as e:
-        errors.append({
-            "Row": "N/A",
-            "Column": "N/A",
-            "Error": f"Error saving {corrected_csv_path}: {str(e)}",
-            "Value": "N/A"
-        })
-        save_errors_and_exit(errors, company_id, original_filename)
-        return
+    def write_json(path):
+        # Written last under a memory budget, so the peak it reports covers the other files
+        report_details = {**details, "Memory Budget": memory_budget.report()} if memory_budget else details
+        write_json_report(path, summary_data, report_details, None if summary_only else errors, error_summary, rule_errors)
 
-    # Step 11: Generate validation reports (Excel and JSON)
-    excel_path, json_path = generate_validation_report(start_time, time.time(), errors, flagged_cells, cleaned_df, input_csv, company_id)
+    artifacts.append((excel_path, lambda path: write_excel(path, summary_data, df_errors, flagged_cells, corrected_df,
+                                                           **excel_options)))
+    artifacts.append((json_path, write_json))
+    # Files finished before an interruption are kept
+    on_written = None
+    if checkpoint:
+        for path, _ in artifacts:
+            if checkpoint.artifact_done(path):
+                print(f"Kept from the interrupted run: {path}")
+        artifacts = [(path, write) for path, write in artifacts if not checkpoint.artifact_done(path)]
+        on_written = checkpoint.save_artifact
+    if memory_budget:
+        for batch in [[artifact for artifact in artifacts if artifact[0] != json_path],
+                      [artifact for artifact in artifacts if artifact[0] == json_path]]:
+            write_artifacts(batch, errors, company_id, original_filename, on_written, memory_budget.workers)
+    else:
+        write_artifacts(artifacts, errors, company_id, original_filename, on_written)
     print(f"Validation reports saved: Excel={excel_path}, JSON={json_path}")
 
+    # Step 11a: Record this file's subscribers in the cross-submission index, replacing any
+    # earlier submission under the same company_id
+    if subscriber_index_path:
+        import subscriber_index
+
+        if progress:
+            progress.set_phase("subscriber index")
+        normalized = {col: corrected_df[col].astype(object).fillna("").astype(str).str.strip()
+                      for col in ["customer", "address", "lat", "lon"]}
+        keys = subscriber_index.subscriber_keys(normalized["customer"], normalized["address"], normalized["lat"], normalized["lon"])
+        subscriber_index.update_index(subscriber_index_path, company_id, keys)
+        print(f"Subscriber index updated: {len(keys)} locations recorded for {company_id} in {subscriber_index_path}")
+
+    # The run is complete, so the checkpoint is no longer needed
+    if checkpoint:
+        checkpoint.remove()
+
     # Step 12: Print summary
     print(f"Processing complete. Files saved in {company_id}/:")
     print(f"- {original_filename} (original copy)")
-    print(f"- {base_filename}_Mod_1.csv (cleaned column titles with OrigRowNum)")
-    print(f"- {base_filename}_Errors.csv (validation errors)")
-    print(f"- {base_filename}_Corrected_Subscribers.csv (data with flagged cells in yellow)")
-    print(f"- {base_filename}_VR.xlsx (validation report with Summary, Errors, and Corrected Data)")
-    print(f"- {base_filename}_VR.json (validation report in JSON format)")
+    if indexed:
+        print(f"- {base_filename}_RowIndex.npy (byte offset of each row in the original copy)")
+    print(f"- {os.path.basename(output_cleantitles_csv)} (cleaned column titles with OrigRowNum)")
+    print(f"- {os.path.basename(error_summary_csv_path)} (validation errors grouped by column, message and value)")
+    if not summary_only:
+        print(f"- {os.path.basename(errors_csv_path)} (validation errors{', with raw source lines' if include_raw_lines else ''})")
+    print(f"- {os.path.basename(corrected_csv_path)} (data, with standardized addresses if requested)")
+    if standardize_addresses:
+        print(f"- {os.path.basename(corrections_csv_path)} (original and standardized addresses)")
+    print(f"- {base_filename}_VR.xlsx (validation report with Summary, Error Summary, {'' if summary_only else 'Errors, '}and Corrected Data)")
+    print(f"- {os.path.basename(json_path)} (validation report in JSON format)")
     print(f"Total rows: {len(cleaned_df)}, Failed rows: {failed_rows}, Flagged cells: {len(flagged_cells)}")
+    if memory_budget:
+        report = memory_budget.report()
+        print(f"Peak memory: {format_size(report['Peak RSS Bytes'])} of the {format_size(memory_budget.budget)} budget"
+              f"{'' if report['Peak Within Budget'] else ' (over budget)'}, {report['Chunk Shrinks']} chunk shrinks")
+
+def load_previous_report(company_id, base_filename):
+    """
+    The newest _VR.json (plain or compressed) in company_id, checked to hold what a partial
+    run merges into: the per-row errors and their per-rule counts.
+    """
+    import json
+
+    candidates = [os.path.join(company_id, f"{base_filename}_VR.json{extension}")
+                  for extension in [""] + list(compressed_io.OUTPUT_EXTENSIONS.values())]
+    existing = [path for path in candidates if os.path.isfile(path)]
+    if not existing:
+        raise ValueError(f"No previous run of {base_filename} in {company_id}/; run the full validation first")
+    json_path = max(existing, key=os.path.getmtime)
+    with compressed_io.open_text(json_path) as f:
+        previous = json.load(f)
+    if "Errors" not in previous or "Rule Errors" not in previous:
+        raise ValueError(f"{json_path} has no per-row errors by rule (a --summary-only, sample or older run); "
+                         "run the full validation first")
+    return previous
+
+def validate_selected_rules(input_csv, company_id, rule_patterns=None, columns=None, geo_boundaries=None,
+                            standardize_addresses=False, rule_options=None, subscriber_index_path=None,
+                            large_report=False, compress=None, progress=None, summary_only=False):
+    """
+    Partial run: validate only the rules selected by rule_patterns and columns (see
+    rules.select_rules), reading only the columns they need, and keep the previous run's
+    errors in company_id for every other rule. The error reports (_Errors.csv,
+    _Error_Summary.csv, _VR.xlsx without the Corrected Data sheet, _VR.json) are rewritten
+    with the merged errors; the previous run's data files are left as they are.
+    """
+    import pandas as pd
+
+    start_time = time.time()
+    original_filename = os.path.basename(input_csv)
+    base_filename = compressed_io.base_name(original_filename)
+
+    # Step 1: Load the previous run's report
+    try:
+        previous = load_previous_report(company_id, base_filename)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    # Step 2: Select the rules among those a full run with these options would run
+    rules = build_rules(company_id, geo_boundaries, rule_options, subscriber_index_path)
+    selected = select_rules(rules, rule_patterns, columns)
+    if not selected:
+        print(f"Error: No rule matches --rules {','.join(rule_patterns or ['*'])} --columns {','.join(columns or ['*'])}")
+        sys.exit(1)
+    selected_ids = {rule["id"] for rule in selected}
+    needed_columns = rule_columns(selected)
+    print(f"Partial run: {len(selected)} of {len(rules)} rules, reading columns {', '.join(needed_columns)}")
+
+    # Step 3: Check the header and read only the needed columns
+    if progress:
+        progress.set_phase("read")
+    header = read_header(input_csv)
+    errors, missing_columns = check_header_columns(["OrigRowNum"] + header)
+    if missing_columns:
+        save_errors_and_exit(errors, company_id, original_filename)
+        return
+    try:
+        with compressed_io.open_binary(input_csv) as f:
+            df = pd.read_csv(f, dtype=ingest_dtypes(header), usecols=lambda col: col.lower() in needed_columns)
+        print(f"Read CSV successfully: {len(df)} rows, {len(df.columns)} columns")
+    except Exception as e:
+        errors.append({"Row": "N/A", "Column": "N/A", "Error": f"Failed to read CSV: {str(e)}", "Value": "N/A"})
+        save_errors_and_exit(errors, company_id, original_filename)
+        return
+    if len(df) != previous["Total Rows"]:
+        print(f"Error: {input_csv} has {len(df)} rows but the previous run had {previous['Total Rows']}; run the full validation")
+        sys.exit(1)
+    df.insert(0, "OrigRowNum", range(1, len(df) + 1))
+    column_mapping = {col: col.lower() for col in df.columns if col.lower() in needed_columns}
+    column_mapping["OrigRowNum"] = "OrigRowNum"
+    cleaned_df = df[list(column_mapping.keys())].rename(columns=column_mapping)[["OrigRowNum"] + needed_columns]
+    if standardize_addresses and "address" in cleaned_df:
+        cleaned_df = cleaned_df.assign(address=standardize_column(cleaned_df["address"])[0])
+
+    # Step 4: Validate the selected rules
+    plan = compile_plan(selected)
+    selected_errors, hits, details = [], {}, {}
+    validate_columns(cleaned_df, selected_errors, FlaggedCells(len(cleaned_df), EXPECTED_COLUMNS), plan, details, progress,
+                     hits_out=hits)
+
+    # Step 5: Merge. Errors of each rule come from this run if it was selected, else from the
+    # previous one, in the order a full run emits them (column by column, in rule order);
+    # rules only the previous run had follow. Its file-level errors are replaced by this
+    # run's header errors.
+    errors_by_rule = {}
+    position = len(previous["Errors"]) - sum(entry["Errors"] for entry in previous["Rule Errors"])
+    for entry in previous["Rule Errors"]:
+        errors_by_rule[entry["Rule"]] = (entry["Column"], previous["Errors"][position:position + entry["Errors"]])
+        position += entry["Errors"]
+    position = 0
+    for entry in rule_error_counts(plan, hits):
+        errors_by_rule[entry["Rule"]] = (entry["Column"], selected_errors[position:position + entry["Errors"]])
+        position += entry["Errors"]
+    order = [rule["id"] for col in EXPECTED_COLUMNS for rule in rules if rule["column"] == col]
+    order += [rule_id for rule_id in errors_by_rule if rule_id not in order]
+    rule_errors = []
+    for rule_id in order:
+        if rule_id in errors_by_rule:
+            col, found = errors_by_rule[rule_id]
+            errors.extend(found)
+            rule_errors.append({"Rule": rule_id, "Column": col, "Errors": len(found)})
+    flagged_cells = FlaggedCells.from_errors(errors, len(cleaned_df), EXPECTED_COLUMNS)
+    # Report sections of unselected rules are kept from the previous run
+    for rule in rules:
+        if rule["id"] not in selected_ids:
+            details.update({name: previous[name] for name in rule.get("sections", []) if name in previous})
+
+    # Step 6: Rewrite the error reports
+    if progress:
+        progress.set_phase("write")
+    errors_csv_path = compressed_io.output_path(os.path.join(company_id, f"{base_filename}_Errors.csv"), compress)
+    error_summary_csv_path = compressed_io.output_path(os.path.join(company_id, f"{base_filename}_Error_Summary.csv"), compress)
+    excel_path = os.path.join(company_id, f"{base_filename}_VR.xlsx")
+    json_path = compressed_io.output_path(os.path.join(company_id, f"{base_filename}_VR.json"), compress)
+    summary_data = report_summary(start_time, time.time(), errors, flagged_cells, cleaned_df, input_csv, company_id)
+    summary_data["Validated Rules"] = ", ".join(rule["id"] for rule in selected)
+    error_summary = summarize_errors(errors)
+    error_table = summary_table(error_summary)
+    df_errors = None if summary_only else sorted_errors_df(errors)
+    artifacts = [(error_summary_csv_path, lambda path: error_table.to_csv(path, index=False))]
+    if not summary_only:
+        artifacts.append((errors_csv_path, lambda path: df_errors.to_csv(path, index=False)))
+    if large_report or len(error_table if summary_only else df_errors) >= EXCEL_MAX_ROWS:
+        write_excel = write_large_excel_report
+    else:
+        write_excel = write_excel_report
+    artifacts.append((excel_path, lambda path: write_excel(path, summary_data, df_errors, flagged_cells, None,
+                                                           error_table=error_table)))
+    artifacts.append((json_path, lambda path: write_json_report(path, summary_data, details, None if summary_only else errors,
+                                                                error_summary, rule_errors)))
+    write_artifacts(artifacts, errors, company_id, original_filename)
+    print(f"Validation reports saved: Excel={excel_path}, JSON={json_path}")
+    print(f"Total rows: {len(cleaned_df)}, Failed rows: {summary_data['Failed Rows']}, Flagged cells: {len(flagged_cells)} "
+          f"({len(selected_errors)} errors from the selected rules)")
 
 def save_errors_and_exit(errors, company_id, original_filename):
-    base_filename = os.path.splitext(original_filename)[0]
+    import pandas as pd
+
+    base_filename = compressed_io.base_name(original_filename)
     errors_csv_path = os.path.join(company_id, f"{base_filename}_Errors.csv")
     pd.DataFrame(errors).to_csv(errors_csv_path, index=False)
     print(f"Errors CSV saved: {errors_csv_path}")
     print("Processing terminated due to errors.")
     sys.exit(1)
 
-def is_float(value):
-    try:
-        float(value)
-        return True
-    except ValueError:
-        return False
+def json_default(value):
+    # NumPy scalars (e.g. OrigRowNum values taken from cleaned_df) are not JSON serializable
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
 
-def is_integer(value):
+def memory_size(text):
+    # argparse type for --memory-budget
     try:
-        int(value)
-        return float(value).is_integer()
-    except ValueError:
-        return False
+        return parse_size(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python3 vs4.py <input_csv> <company_id>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(usage="python3 vs4.py <input_csv> <company_id> [options]")
+    parser.add_argument("input_csv")
+    parser.add_argument("company_id")
+    sample_group = parser.add_mutually_exclusive_group()
+    sample_group.add_argument("--sample", type=int, metavar="N",
+                              help="Pre-flight: validate a uniform random sample of N rows and report estimated error rates")
+    sample_group.add_argument("--sample-fraction", type=float, metavar="F",
+                              help="Pre-flight: validate each row with probability F and report estimated error rates")
+    parser.add_argument("--seed", type=int, help="Random seed for --sample/--sample-fraction")
+    parser.add_argument("--geo-boundaries", metavar="GEOJSON",
+                        help="Also check each coordinate falls inside its state, using state polygons from GEOJSON")
+    parser.add_argument("--stack-cell-size", type=float, metavar="DEGREES",
+                        help="Grid cell size for the stacked-geocode rule (default 0.0001)")
+    parser.add_argument("--stack-threshold", type=int, metavar="N",
+                        help="Flag grid cells holding more than N subscribers at different addresses (default 25)")
+    parser.add_argument("--standardize-addresses", action="store_true",
+                        help="Rewrite addresses into canonical USPS form (suffixes, directionals, spacing) before validation")
+    parser.add_argument("--subscriber-index", metavar="DB",
+                        help="Check locations against other companies' submissions in SQLite file DB, then record this file in it")
+    parser.add_argument("--raw-lines", action="store_true",
+                        help="Add each error's raw source line to _Errors.csv and the Errors sheet")
+    parser.add_argument("--rules", metavar="PATTERNS",
+                        help="Partial run: only the rules whose id matches one of these comma-separated patterns "
+                             "(e.g. 'address.*'); the other rules' errors are kept from the previous run in <company_id>/")
+    parser.add_argument("--columns", metavar="COLUMNS",
+                        help="Partial run: only the rules on these comma-separated columns (e.g. 'lat,lon'); "
+                             "with --rules, rules matching both")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="Report errors only as the error summary (counts, row ranges and exemplar rows per "
+                             "column, message and value): no _Errors.csv, Errors sheet or per-row errors in _VR.json")
+    parser.add_argument("--large-report", action="store_true",
+                        help="Stream _VR.xlsx with errors and data paged across numbered sheets and an Index sheet "
+                             "(automatic past 1,048,575 rows)")
+    parser.add_argument("--compress", nargs="?", const="gzip", choices=compressed_io.OUTPUT_EXTENSIONS,
+                        help="Compress the CSV and JSON outputs (gzip by default, or zstd if zstandard is installed)")
+    parser.add_argument("--regex-backend", choices=regex_backend.BACKENDS,
+                        help="Regex engine for the address rules: re (default) or re2 (linear time, needs google-re2)")
+    parser.add_argument("--progress-interval", type=float, default=10.0, metavar="SECONDS",
+                        help="Seconds between progress lines on stderr (default 10, 0 for none)")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="Keep PATH updated with run progress in Prometheus text format")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="Checkpoint the run in <company_id>/ as it goes, so an interruption can be continued with --resume")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted --checkpoint run of the same input and options from its checkpoint "
+                             "in <company_id>/, or start a checkpointed run")
+    parser.add_argument("--memory-budget", metavar="SIZE", type=memory_size,
+                        help="Plan the run to stay under SIZE of memory (e.g. 2G, 512M; 'auto' for the cgroup limit) "
+                             "and report the observed peak in _VR.json")
+    parser.add_argument("--check-headers", action="store_true",
+                        help="Only check the header line for missing or case-mismatched columns, then exit")
+    args = parser.parse_args()
 
-    input_csv = sys.argv[1]
-    company_id = sys.argv[2]
+    if args.sample is not None and args.sample <= 0:
+        parser.error("--sample must be a positive integer")
+    if args.sample_fraction is not None and not (0 < args.sample_fraction <= 1):
+        parser.error("--sample-fraction must be in (0, 1]")
+    rule_patterns = args.rules.split(",") if args.rules is not None else None
+    columns = args.columns.split(",") if args.columns is not None else None
+    if columns is not None and not set(columns) <= set(EXPECTED_COLUMNS):
+        parser.error(f"--columns must be among {', '.join(EXPECTED_COLUMNS)}")
+    if (rule_patterns is not None or columns is not None) and (args.sample is not None or args.sample_fraction is not None
+                                                            or args.resume or args.checkpoint or args.raw_lines):
+        parser.error("--rules/--columns cannot be combined with --sample, --sample-fraction, --checkpoint, --resume "
+                     "or --raw-lines")
+    if args.raw_lines and args.summary_only:
+        parser.error("--raw-lines adds to the per-row errors, which --summary-only leaves out")
+    if args.progress_interval < 0:
+        parser.error("--progress-interval must not be negative")
+    if args.stack_cell_size is not None and not 0 < args.stack_cell_size < float("inf"):
+        parser.error("--stack-cell-size must be a positive number of degrees")
+    if args.stack_threshold is not None and args.stack_threshold < 0:
+        parser.error("--stack-threshold must not be negative")
+
+    input_csv = args.input_csv
+    company_id = args.company_id
+    if args.compress and args.compress not in compressed_io.available_codecs():
+        parser.error(f"--compress {args.compress} needs the zstandard package")
+    if args.regex_backend:
+        if args.regex_backend not in regex_backend.available_backends():
+            parser.error(f"--regex-backend {args.regex_backend} needs the google-re2 package")
+        regex_backend.set_backend(args.regex_backend)
 
     if not os.path.isfile(input_csv):
         print(f"Error: Input file '{input_csv}' does not exist.")
         sys.exit(1)
 
-    validate_subscriber_file(input_csv, company_id)
\ No newline at end of file
+    if args.check_headers:
+        header_errors = check_headers(input_csv)
+        for error in header_errors:
+            print(f"Error: {error['Error']}")
+        if header_errors:
+            sys.exit(1)
+        print("Headers OK")
+        sys.exit(0)
+
+    stacked_options = {}
+    if args.stack_cell_size is not None:
+        stacked_options["cell_size"] = args.stack_cell_size
+    if args.stack_threshold is not None:
+        stacked_options["threshold"] = args.stack_threshold
+    rule_options = {"lat.stacked_location": stacked_options} if stacked_options else None
+
+    with Progress(args.progress_interval, args.metrics_file, company_id) as progress, \
+            (MemoryBudget(args.memory_budget) if args.memory_budget else contextlib.nullcontext()) as memory_budget:
+        validate_subscriber_file(input_csv, company_id, args.sample, args.sample_fraction, args.seed, args.geo_boundaries,
+                                 args.standardize_addresses, rule_options, args.subscriber_index, args.raw_lines,
+                                 args.large_report, args.compress, progress, args.resume, args.summary_only,
+                                 rule_patterns, columns, memory_budget, args.checkpoint)
\ No newline at end of file
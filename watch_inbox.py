@@ -0,0 +1,273 @@
+# watch_inbox.py - Drop-folder ingestion daemon for vs4.py
+# Usage: python3 watch_inbox.py <inbox> <outbox> [--workers N] [--poll SECONDS] [--metrics FILE] [--once]
+# The inbox is polled for subscriber CSVs (plain, .csv.gz, .zip or .csv.zst). A file is
+# queued once its size and mtime are unchanged between two polls (the upload has finished).
+# company_id comes from a sidecar <file>.company, else from the subdirectory the file was
+# dropped in (<inbox>/<company_id>/file.csv), else from the file name. It names directories
+# that are replaced, so it must match COMPANY_ID_PATTERN; a file whose company_id does not is
+# moved to <outbox>/_failed with a <file>.reason.txt instead of being validated. Queued jobs run
+# smallest file first in a pool of long-lived worker processes that keep vs4 and the
+# compiled rule plan loaded between jobs.
+# Each job's output directory, with a _run.log of its console output, is moved to
+# <outbox>/<company_id>; the input (and sidecar) is then removed from the inbox. A job that
+# crashes or cannot be delivered moves its input to <outbox>/_failed with a reason file
+# instead. Either way the input is only touched if its size and mtime are still those it was
+# queued with, so a file uploaded again under the same name during the run is left to be
+# queued afresh. A worker that dies breaks the pool, which is then replaced.
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+INPUT_EXTENSIONS = (".csv", ".csv.gz", ".zip", ".csv.zst")
+SIDECAR_EXTENSION = ".company"
+COMPANY_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]+")
+FAILED_DIR = "_failed"  # Under the outbox: inputs rejected or whose job failed, with the reason
+LATENCY_WINDOW = 100  # Completed jobs kept for the latency figures
+
+def warm_worker(repo_dir):
+    """Worker process initializer: import vs4 and compile the default rule plan once."""
+    sys.path.insert(0, repo_dir)
+    import vs4  # Loads pandas and the rule modules
+    from rules import get_plan
+
+    get_plan()
+
+def run_job(input_path, company_id, work_dir):
+    """
+    Validate one file inside work_dir (in a worker process). Returns (status, output_dir)
+    where status is "Pass", "Failed" (validation errors) or "Error" (the run stopped early).
+    """
+    import compressed_io
+    import vs4
+
+    # vs4 replaces <work_dir>/<company_id> before writing to it
+    check_inside(os.path.join(work_dir, company_id), work_dir)
+    os.chdir(work_dir)
+    log = io.StringIO()
+    status = "Pass"
+    with contextlib.redirect_stdout(log):
+        try:
+            vs4.validate_subscriber_file(input_path, company_id)
+        except SystemExit:
+            status = "Error"  # save_errors_and_exit; _Errors.csv holds the reason
+        except Exception as e:
+            print(f"Unhandled error: {e}")
+            status = "Error"
+    output_dir = os.path.join(work_dir, company_id)
+    os.makedirs(output_dir, exist_ok=True)
+    base_filename = compressed_io.base_name(input_path)
+    json_path = os.path.join(output_dir, f"{base_filename}_VR.json")
+    if status == "Pass" and os.path.isfile(json_path):
+        with open(json_path) as f:
+            status = json.load(f)["Validation Status"]
+    with open(os.path.join(output_dir, f"{base_filename}_run.log"), "w") as f:
+        f.write(log.getvalue())
+    return status, output_dir
+
+def check_company_id(company_id):
+    """Raise ValueError unless company_id is safe to use as one directory name."""
+    if (not COMPANY_ID_PATTERN.fullmatch(company_id) or company_id in (".", "..", FAILED_DIR)
+            or os.sep in company_id or (os.altsep and os.altsep in company_id)):
+        raise ValueError(f"Invalid company ID {company_id!r}: use letters, digits, '.', '_' and '-' only")
+    return company_id
+
+def check_inside(path, root):
+    """Raise ValueError unless path resolves to somewhere below root."""
+    real_path, real_root = os.path.realpath(path), os.path.realpath(root)
+    if real_path == real_root or os.path.commonpath([real_path, real_root]) != real_root:
+        raise ValueError(f"{path} is outside {root}")
+
+def derive_company_id(inbox, path):
+    """company_id for an input file; raises ValueError if it is not a safe directory name."""
+    import compressed_io
+
+    sidecar = path + SIDECAR_EXTENSION
+    if os.path.isfile(sidecar):
+        with open(sidecar) as f:
+            company_id = f.read().strip()
+        if company_id:
+            return check_company_id(company_id)
+    relative = os.path.relpath(os.path.dirname(path), inbox)
+    if relative != ".":
+        return check_company_id(relative.split(os.sep)[0])
+    return check_company_id(compressed_io.base_name(path))
+
+def unchanged(path, signature):
+    """True if path still has the (size, mtime_ns) it was queued with."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return (stat.st_size, stat.st_mtime_ns) == signature
+
+def scan_inbox(inbox):
+    """{path: (size, mtime_ns)} for every input file under inbox."""
+    found = {}
+    for root, dirs, files in os.walk(inbox):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name.startswith(".") or not name.lower().endswith(INPUT_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            found[path] = (stat.st_size, stat.st_mtime_ns)
+    return found
+
+def deliver(output_dir, outbox, company_id):
+    """Move a finished job's output directory to <outbox>/<company_id>, replacing an older one."""
+    target = os.path.join(outbox, company_id)
+    check_inside(target, outbox)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    shutil.move(output_dir, target)
+    return target
+
+def reject(path, outbox, reason):
+    """Move an input (and its sidecar) to <outbox>/_failed with a <file>.reason.txt; returns the new path."""
+    failed_dir = os.path.join(outbox, FAILED_DIR)
+    os.makedirs(failed_dir, exist_ok=True)
+    target = os.path.join(failed_dir, os.path.basename(path))
+    for source, destination in ((path, target), (path + SIDECAR_EXTENSION, target + SIDECAR_EXTENSION)):
+        if os.path.isfile(source):
+            shutil.move(source, destination)
+    with open(target + ".reason.txt", "w") as f:
+        f.write(reason + "\n")
+    return target
+
+def write_metrics(path, metrics):
+    """Atomically replace the metrics file so readers never see a partial write."""
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as f:
+        json.dump(metrics, f, indent=4)
+    os.replace(f.name, path)
+
+def watch(inbox, outbox, workers=2, poll=5.0, metrics_path=None, once=False):
+    inbox = os.path.abspath(inbox)
+    outbox = os.path.abspath(outbox)
+    os.makedirs(outbox, exist_ok=True)
+    work_root = tempfile.mkdtemp(prefix="vs4_jobs_")
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+
+    last_seen = {}  # path -> (size, mtime_ns) at the previous poll
+    known = set()  # Paths queued or running
+    queue = []  # Heap of (size, queued_at, sequence, path, company_id, signature)
+    running = {}  # future -> (path, company_id, job_dir, signature, queued_at, started_at, pool)
+    latencies, waits = [], []  # Seconds from queued to finished / to started
+    counts = {"Pass": 0, "Failed": 0, "Error": 0}
+    sequence = 0
+
+    def start_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=warm_worker, initargs=(repo_dir,))
+
+    pool = start_pool()
+    print(f"Watching {inbox} -> {outbox} with {workers} workers")
+    try:
+        while True:
+            # Queue files whose size and mtime held still since the last poll
+            current = scan_inbox(inbox)
+            for path, signature in current.items():
+                if path not in known and last_seen.get(path) == signature:
+                    try:
+                        company_id = derive_company_id(inbox, path)
+                    except ValueError as e:
+                        counts["Error"] += 1
+                        print(f"Error: {path} ({signature[0]} bytes) -> {reject(path, outbox, str(e))}: {e}")
+                        continue
+                    heapq.heappush(queue, (signature[0], time.time(), sequence, path, company_id, signature))
+                    sequence += 1
+                    known.add(path)
+                    print(f"Queued {path} ({signature[0]} bytes) as {company_id}")
+            last_seen = current
+
+            # Dispatch smallest files first, only as workers free up
+            while queue and len(running) < workers:
+                _, queued_at, _, path, company_id, signature = heapq.heappop(queue)
+                job_dir = tempfile.mkdtemp(dir=work_root)
+                future = pool.submit(run_job, path, company_id, job_dir)
+                running[future] = (path, company_id, job_dir, signature, queued_at, time.time(), pool)
+
+            if metrics_path:
+                write_metrics(metrics_path, {
+                    "Time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "Queue Depth": len(queue),
+                    "Queued Bytes": sum(item[0] for item in queue),
+                    "Running": len(running),
+                    "Completed": counts,
+                    "Job Latency Mean (seconds)": statistics.mean(latencies) if latencies else None,
+                    "Job Latency Max (seconds)": max(latencies) if latencies else None,
+                    "Queue Wait Mean (seconds)": statistics.mean(waits) if waits else None,
+                })
+
+            if once and not queue and not running and not current:
+                break
+
+            if running:
+                done, _ = wait(list(running), timeout=poll, return_when=FIRST_COMPLETED)
+            else:
+                done = set()
+                time.sleep(poll)
+            for future in done:
+                path, company_id, job_dir, signature, queued_at, started_at, job_pool = running.pop(future)
+                try:
+                    status, output_dir = future.result()
+                    target = deliver(output_dir, outbox, company_id)
+                except Exception as e:
+                    status, target = "Error", None
+                    reason = f"Job failed: {type(e).__name__}: {e}"
+                    print(f"Job for {path} failed: {e}")
+                    if isinstance(e, BrokenProcessPool) and job_pool is pool:
+                        # Every job on the broken pool fails the same way; start a new one
+                        pool.shutdown(wait=False)
+                        pool = start_pool()
+                shutil.rmtree(job_dir, ignore_errors=True)
+                finished_at = time.time()
+                counts[status] += 1
+                latencies = (latencies + [finished_at - queued_at])[-LATENCY_WINDOW:]
+                waits = (waits + [started_at - queued_at])[-LATENCY_WINDOW:]
+                if not unchanged(path, signature):
+                    print(f"{path} changed during the run; left in the inbox")
+                elif target:
+                    for finished in (path, path + SIDECAR_EXTENSION):
+                        if os.path.isfile(finished):
+                            os.remove(finished)
+                else:
+                    target = reject(path, outbox, reason)
+                known.discard(path)
+                print(f"{status}: {path} ({signature[0]} bytes) -> {target} "
+                      f"in {finished_at - started_at:.1f}s, waited {started_at - queued_at:.1f}s; queue depth {len(queue)}")
+    except KeyboardInterrupt:
+        print("Stopping; waiting for running jobs")
+    finally:
+        pool.shutdown(wait=True)
+        shutil.rmtree(work_root, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="python3 watch_inbox.py <inbox> <outbox> [options]")
+    parser.add_argument("inbox")
+    parser.add_argument("outbox")
+    parser.add_argument("--workers", type=int, default=2, help="Files validated at once (default 2)")
+    parser.add_argument("--poll", type=float, default=5.0, help="Seconds between inbox scans (default 5)")
+    parser.add_argument("--metrics", metavar="FILE", help="Rewrite FILE with queue depth and job latency as JSON after every scan")
+    parser.add_argument("--once", action="store_true", help="Exit once the inbox is empty and all jobs have finished")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.inbox):
+        print(f"Error: Inbox directory '{args.inbox}' does not exist.")
+        sys.exit(1)
+    if args.workers <= 0:
+        parser.error("--workers must be a positive integer")
+    watch(args.inbox, args.outbox, args.workers, args.poll, args.metrics, args.once)
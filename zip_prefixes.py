@@ -0,0 +1,47 @@
+# zip_prefixes.py - 3-digit ZIP prefix to state table for the zip.state rule
+# Ranges follow the USPS sectional center (first three digits) assignments. Prefixes that are
+# unassigned or military-only (APO/FPO AA/AE/AP) are absent and are not checked.
+from rules import VALID_STATES
+
+# (first prefix, last prefix, states) — inclusive ranges
+ZIP3_STATE_RANGES = [
+    (5, 5, ["NY"]), (6, 7, ["PR"]), (8, 8, ["VI"]), (9, 9, ["PR"]),
+    (10, 27, ["MA"]), (28, 29, ["RI"]), (30, 38, ["NH"]), (39, 49, ["ME"]),
+    (50, 54, ["VT"]), (55, 55, ["MA"]), (56, 59, ["VT"]), (60, 69, ["CT"]),
+    (70, 89, ["NJ"]), (100, 149, ["NY"]), (150, 196, ["PA"]), (197, 199, ["DE"]),
+    (200, 200, ["DC"]), (201, 201, ["VA"]), (202, 205, ["DC"]), (206, 219, ["MD"]),
+    (220, 246, ["VA"]), (247, 268, ["WV"]), (270, 289, ["NC"]), (290, 299, ["SC"]),
+    (300, 319, ["GA"]), (320, 339, ["FL"]), (341, 349, ["FL"]), (350, 369, ["AL"]),
+    (370, 385, ["TN"]), (386, 397, ["MS"]), (398, 399, ["GA"]), (400, 427, ["KY"]),
+    (430, 459, ["OH"]), (460, 479, ["IN"]), (480, 499, ["MI"]), (500, 528, ["IA"]),
+    (530, 549, ["WI"]), (550, 567, ["MN"]), (569, 569, ["DC"]), (570, 577, ["SD"]),
+    (580, 588, ["ND"]), (590, 599, ["MT"]), (600, 629, ["IL"]), (630, 658, ["MO"]),
+    (660, 679, ["KS"]), (680, 693, ["NE"]), (700, 714, ["LA"]), (716, 729, ["AR"]),
+    (730, 732, ["OK"]), (733, 733, ["TX"]), (734, 749, ["OK"]), (750, 799, ["TX"]),
+    (800, 816, ["CO"]), (820, 831, ["WY"]), (832, 838, ["ID"]), (840, 847, ["UT"]),
+    (850, 865, ["AZ"]), (870, 884, ["NM"]), (885, 885, ["TX"]), (889, 898, ["NV"]),
+    (900, 961, ["CA"]), (967, 967, ["HI", "AS"]), (968, 968, ["HI"]), (969, 969, ["GU", "MP"]),
+    (970, 979, ["OR"]), (980, 994, ["WA"]), (995, 999, ["AK"]),
+]
+
+_table = None
+
+def zip3_table():
+    """
+    1000-entry uint64 array indexed by ZIP prefix; bit i is set when VALID_STATES[i] is
+    valid for that prefix. Built on first use.
+    """
+    global _table
+    if _table is None:
+        import numpy as np
+
+        table = np.zeros(1000, dtype=np.uint64)
+        for first, last, states in ZIP3_STATE_RANGES:
+            for state in states:
+                table[first:last + 1] |= np.uint64(1 << VALID_STATES.index(state))
+        _table = table
+    return _table
+
+def expected_states(mask):
+    """State codes whose bits are set in a table entry."""
+    return [state for i, state in enumerate(VALID_STATES) if int(mask) >> i & 1]